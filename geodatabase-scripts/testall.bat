@@ -8,3 +8,28 @@ if exist "%PYTHON1%" (
 ) 
 call %PROPY% .\src\test_filegeodatabase_manager.py
 call %PROPY% .\src\test_xlsx_manager.py 
+call %PROPY% .\src\test_gdbtable.py
+call %PROPY% .\src\test_gdbcatalog.py
+call %PROPY% .\src\test_projection.py
+call %PROPY% .\src\test_gdbgeometry.py
+call %PROPY% .\src\test_resolution_audit.py
+call %PROPY% .\src\test_xlsx_patcher.py
+call %PROPY% .\src\test_xlsx_schema.py
+call %PROPY% .\src\test_gdbfingerprint.py
+call %PROPY% .\src\test_filecache.py
+call %PROPY% .\src\test_reprojection_manifest.py
+call %PROPY% .\src\test_gdbcopy.py
+call %PROPY% .\src\test_gdbtrash.py
+call %PROPY% .\src\test_gdblocks.py
+call %PROPY% .\src\test_table_loader.py
+call %PROPY% .\src\test_gdbbackend.py
+call %PROPY% .\src\test_benchmark.py
+call %PROPY% .\src\test_tracing.py
+call %PROPY% .\src\test_memory_budget.py
+call %PROPY% .\src\test_relclass_plan.py
+call %PROPY% .\src\test_workflow.py
+call %PROPY% .\src\test_shard_loader.py
+call %PROPY% .\src\test_stream_loader.py
+call %PROPY% .\src\test_batch_runner.py
+call %PROPY% .\src\test_content_verifier.py
+call %PROPY% .\src\test_gdbscan.py
@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import time
+import queue
+import logging
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import gdbbackend
+import tracing
+import workflow
+
+# reproject a list of geodatabases, several at once
+# every job is the checkpointed workflow (see workflow.py) in its own
+# process, a rerun of the batch resumes each job where it stopped
+# a job needs a Foundation license for as long as it runs. The pool
+# hands out as many seats as we own and the scheduler starts a job
+# only with a seat in hand, the rest wait in line. A job that finds no
+# license on the server anyway (someone else took it) goes back in
+# line instead of failing
+
+logger = logging.getLogger(__name__)
+
+EXTENSION = 'Foundation'
+
+Job = namedtuple('Job'
+                ,['name'
+                 ,'gdbin'
+                 ,'gdbout'
+                 ,'workdir'
+                 ,'srid'])
+
+JobResult = namedtuple('JobResult'
+                      ,['name'
+                       ,'seat'
+                       ,'started'
+                       ,'finished'
+                       ,'attempts'
+                       ,'error'])
+
+_UNAVAILABLE = '{0} license not available'.format(EXTENSION)
+
+
+class LicensePool(object):
+
+    def __init__(self
+                ,size):
+
+        # size is the number of licenses this batch may hold at once
+        if size < 1:
+            raise ValueError('a license pool needs at least one seat')
+        self.size  = size
+        self._free = queue.Queue()
+        for seat in range(size):
+            self._free.put(seat)
+
+    def available(self):
+        return self._free.qsize()
+
+    def acquire(self
+               ,timeout=None):
+
+        # a seat number, None when none freed up before timeout
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self
+               ,seat):
+        self._free.put(seat)
+
+
+def _init_worker(backend):
+    gdbbackend.use(backend)
+
+
+def run_job(job
+           ,seat):
+
+    # one geodatabase start to finish holding one license
+    # a JobResult, error is _UNAVAILABLE when the server had no license
+    started = time.time()
+    backend = gdbbackend.get()
+    if not backend.check_extension(EXTENSION):
+        return JobResult(job.name, seat, started, time.time(), 1, _UNAVAILABLE)
+    backend.check_out_extension(EXTENSION)
+    try:
+        os.makedirs(job.workdir, exist_ok=True)
+        workflow.reprojection(job.gdbin
+                             ,job.gdbout
+                             ,job.workdir
+                             ,job.srid
+                             ,workers=1).run()
+        return JobResult(job.name, seat, started, time.time(), 1, None)
+    except Exception as e:
+        return JobResult(job.name
+                        ,seat
+                        ,started
+                        ,time.time()
+                        ,1
+                        ,'{0}: {1}'.format(type(e).__name__, e))
+    finally:
+        backend.check_in_extension(EXTENSION)
+
+
+@tracing.traced('batch')
+def run_batch(jobs
+             ,licenses
+             ,retry_wait=60.0
+             ,max_attempts=None):
+
+    # JobResults in the order jobs finished
+    # licenses is a LicensePool. A job bounced for want of a license
+    # waits retry_wait seconds and tries again, up to max_attempts
+    # (None, forever)
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError('job names must be unique')
+
+    waiting = [(job, 1, 0.0) for job in jobs]
+    running = {}
+    results = []
+    with ProcessPoolExecutor(max_workers=licenses.size
+                            ,initializer=_init_worker
+                            ,initargs=(gdbbackend.get().name,)) as pool:
+        while waiting or running:
+            now = time.time()
+            ready = [entry for entry in waiting if entry[2] <= now]
+            while ready:
+                seat = licenses.acquire(timeout=0)
+                if seat is None:
+                    break
+                entry = ready.pop(0)
+                waiting.remove(entry)
+                logger.info('{0} starts on license {1}'.format(entry[0].name, seat))
+                running[pool.submit(run_job, entry[0], seat)] = entry
+
+            if not running:
+                # everything left is backing off
+                time.sleep(max(0.0, min(entry[2] for entry in waiting) - now))
+                continue
+
+            done, _ = wait(running, timeout=retry_wait, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, attempts, _ = running.pop(future)
+                result = future.result()._replace(attempts=attempts)
+                licenses.release(result.seat)
+                if (result.error == _UNAVAILABLE
+                and (max_attempts is None or attempts < max_attempts)):
+                    logger.info('{0} waits for a license'.format(job.name))
+                    waiting.append((job, attempts + 1, time.time() + retry_wait))
+                    continue
+                logger.info('{0} {1}'.format(job.name, result.error or 'done'))
+                results.append(result)
+
+    tracing.count(items=len(results))
+    return results
+
+
+def failures(results):
+    return [result for result in results if result.error is not None]
+
+
+def format_results(results):
+
+    lines = ['{0:<40} {1:>5} {2:>10} {3:>8}'.format(
+        'job', 'seat', 'seconds', 'attempts')]
+    for result in results:
+        line = '{0:<40} {1:>5} {2:>10.1f} {3:>8}'.format(
+            result.name
+           ,result.seat
+           ,result.finished - result.started
+           ,result.attempts)
+        if result.error is not None:
+            line += '  failed: {0}'.format(result.error)
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def load_jobs(path):
+
+    # a json list of {name, gdbin, gdbout, workdir, srid}
+    # workdir defaults to <gdbout>.work and srid to 2263
+    with open(path) as f:
+        entries = json.load(f)
+    jobs = []
+    for entry in entries:
+        jobs.append(Job(entry['name']
+                       ,entry['gdbin']
+                       ,entry['gdbout']
+                       ,entry.get('workdir'
+                                 ,os.path.splitext(entry['gdbout'])[0] + '.work')
+                       ,entry.get('srid', 2263)))
+    return jobs
+
+
+if __name__ == '__main__':
+
+    pjobs     = sys.argv[1]
+    plicenses = 1
+    if len(sys.argv) == 3:
+        plicenses = int(sys.argv[2])
+
+    logging.basicConfig(level=logging.INFO
+                       ,format='%(asctime)s - %(levelname)s - %(message)s')
+
+    results = run_batch(load_jobs(pjobs)
+                       ,LicensePool(plicenses))
+    print(format_results(results))
+    sys.exit(1 if failures(results) else 0)
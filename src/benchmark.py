@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+
+import filegeodatabase_manager
+import gdbbackend
+import gdbcatalog
+import gdbfingerprint
+import gdbtable
+import xlsx_manager
+
+# time every stage of the workflow on synthetic geodatabases of growing
+# size. A synthetic gdb is the sample with each user table's rows
+# repeated factor times. Results are appended as json lines, one per
+# stage and size, and compared against a baseline results file
+#
+#   python benchmark.py <workdir> <results.jsonl> [baseline.jsonl]
+#
+# exits 1 when a stage got slower than the baseline by more than
+# THRESHOLD. GDB_BACKEND picks the backend, local when unset
+
+SIZES     = (1, 8, 64)
+REPEAT    = 3
+SRID      = 2263
+THRESHOLD = 0.25
+# below this many seconds of slowdown is noise, not a regression
+MIN_SLOWDOWN = 0.05
+
+_SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                      ,'testdata'
+                      ,'sample.gdb')
+
+
+def synthesize(source
+              ,target
+              ,factor):
+
+    # copy of source with every user table holding its rows factor times
+    # returns the total row count
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    filegeodatabase_manager.LocalGDB(source).copy(target)
+    total = 0
+    catalog = gdbcatalog.CatalogIndex.from_gdb(target)
+    for item in catalog.of_type('FeatureClass', 'Table'):
+        if item.table is None:
+            continue
+        path = os.path.join(target, item.table + '.gdbtable')
+        with gdbtable.GDBTable(path) as table:
+            section = bytes(table.field_section())
+            version = table.header.version
+            rows = [bytes(table.row_bytes(objectid))
+                    for objectid in table.objectids()]
+        rows = rows * factor
+        gdbtable.write_table(path
+                            ,section
+                            ,[(objectid, data) for objectid, data in enumerate(rows, 1)]
+                            ,version)
+        # indexes describe the original rows
+        for name in os.listdir(target):
+            if (name.startswith(item.table + '.')
+            and not name.endswith(('.gdbtable', '.gdbtablx'))):
+                os.remove(os.path.join(target, name))
+        total += len(rows)
+    return total
+
+
+def _stages(gdbin
+           ,workdir):
+
+    # (stage, callable) in workflow order, each runs after the last
+    xlsx = os.path.join(workdir, 'schema.xlsx')
+    gdbcopy = os.path.join(workdir, 'copy.gdb')
+    gdbout = os.path.join(workdir, 'out.gdb')
+    excel = xlsx_manager.ExcelFile(xlsx)
+
+    return [('copy', lambda: filegeodatabase_manager.LocalGDB(gdbin).copy(gdbcopy))
+           ,('catalog', lambda: gdbcatalog.CatalogIndex.from_gdb(gdbin))
+           ,('fingerprint', lambda: gdbfingerprint.table_fingerprints(gdbin))
+           ,('generate_xlsx', lambda: excel.generate_from_geodatabase(gdbin))
+           ,('update_sr', lambda: excel.update_all_spatial_reference(SRID))
+           ,('update_sr_streaming'
+            ,lambda: excel.update_all_spatial_reference(SRID, streaming=True))
+           ,('audit', lambda: excel.audit_resolution(gdbin, SRID))
+           ,('copygeodatabase', lambda: excel.copygeodatabase(gdbin, gdbout))
+           ,('clean', lambda: (filegeodatabase_manager.LocalGDB(gdbout).clean()
+                              ,filegeodatabase_manager.LocalGDB(gdbcopy).clean()
+                              ,excel.delete()))]
+
+
+def run(workdir
+       ,sizes=SIZES
+       ,repeat=REPEAT):
+
+    # one result dict per stage and size, the best of repeat passes
+    backend = gdbbackend.get().name
+    results = []
+    for factor in sizes:
+        gdbin = os.path.join(workdir, 'synthetic{0}.gdb'.format(factor))
+        rows = synthesize(_SAMPLE, gdbin, factor)
+        best = {}
+        for _ in range(repeat):
+            for stage, call in _stages(gdbin, workdir):
+                start = time.perf_counter()
+                call()
+                seconds = time.perf_counter() - start
+                best[stage] = min(seconds, best.get(stage, seconds))
+        for stage, _ in _stages(gdbin, workdir):
+            results.append({'stage': stage
+                           ,'size': factor
+                           ,'rows': rows
+                           ,'seconds': round(best[stage], 6)
+                           ,'backend': backend
+                           ,'python': platform.python_version()
+                           ,'time': time.strftime('%Y-%m-%dT%H:%M:%S')})
+        shutil.rmtree(gdbin)
+    return results
+
+
+def save(results
+        ,path):
+
+    with open(path, 'a') as f:
+        for result in results:
+            f.write(json.dumps(result, sort_keys=True) + '\n')
+
+
+def load(path):
+
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def regressions(results
+               ,baseline
+               ,threshold=THRESHOLD
+               ,min_slowdown=MIN_SLOWDOWN):
+
+    # (stage, size, baseline seconds, seconds) slower than the fastest
+    # baseline run of the same stage, size and backend by more than
+    # threshold (a fraction) and min_slowdown seconds
+    fastest = {}
+    for result in baseline:
+        key = (result['stage'], result['size'], result['backend'])
+        fastest[key] = min(result['seconds'], fastest.get(key, result['seconds']))
+
+    slower = []
+    for result in results:
+        key = (result['stage'], result['size'], result['backend'])
+        if key not in fastest:
+            continue
+        before = fastest[key]
+        if (result['seconds'] > before * (1 + threshold)
+        and result['seconds'] - before > min_slowdown):
+            slower.append((result['stage']
+                          ,result['size']
+                          ,before
+                          ,result['seconds']))
+    return slower
+
+
+def format_results(results):
+
+    lines = ['{0:<22} {1:>6} {2:>10} {3:>10}'.format(
+        'stage', 'size', 'rows', 'seconds')]
+    for result in results:
+        lines.append('{0:<22} {1:>6} {2:>10} {3:>10.3f}'.format(
+            result['stage']
+           ,result['size']
+           ,result['rows']
+           ,result['seconds']))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+
+    pworkdir  = sys.argv[1]
+    presults  = sys.argv[2]
+    pbaseline = None
+    if len(sys.argv) == 4:
+        pbaseline = sys.argv[3]
+
+    gdbbackend.use(os.environ.get('GDB_BACKEND', 'local'))
+
+    workdir = tempfile.mkdtemp(dir=pworkdir)
+    try:
+        results = run(workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(format_results(results))
+    save(results, presults)
+
+    if pbaseline is not None:
+        slower = regressions(results, load(pbaseline))
+        for stage, size, before, seconds in slower:
+            print('regression: {0} size {1} {2:.3f}s -> {3:.3f}s'.format(
+                stage, size, before, seconds))
+        if slower:
+            sys.exit(1)
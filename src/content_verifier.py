@@ -0,0 +1,428 @@
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import filegeodatabase_manager
+import gdbcatalog
+import gdbgeometry
+import gdbscan
+import gdbtable
+import projection
+import tracing
+
+# did the load carry every row over intact, not just the right number
+# of them. Every row of a table hashes its attributes to 64 bits. A
+# table digest is the sum of its row hashes, so it does not care about
+# row order or OBJECTIDs, which LoadData renumbers
+#
+# shapes are not hashed. The target holds coordinates another library
+# projected and snapped, and a hash of exact grid cells would flip on
+# vertices that land either side of a cell edge. Rows are matched up on
+# their attribute hash instead and the shapes of each matched pair are
+# compared, the source reprojected when the spatial references differ,
+# within the target XY tolerance (at least one grid cell). The
+# OBJECTIDs left over on either side are reported
+#
+# attributes are read from the .gdbtable files in balanced OBJECTID
+# ranges (see gdbscan), source and target at the same time. Workers
+# send back two arrays per range (objectids, hashes) and never the rows.
+# The shapes of matched rows are compared in chunks of pairs, workers
+# send back the objectids that did not match
+
+VerifyResult = namedtuple('VerifyResult'
+                         ,['name'
+                          ,'source_rows'
+                          ,'target_rows'
+                          ,'source_digest'
+                          ,'target_digest'
+                          ,'missing'
+                          ,'unexpected'
+                          ,'error'])
+
+# computed by the target from its own shapes, they move with the
+# projection
+IGNORE = ('shape_length'
+         ,'shape_area')
+
+_SKIP_TYPES = (gdbtable.FIELD_OBJECTID
+              ,gdbtable.FIELD_GEOMETRY
+              ,gdbtable.FIELD_GLOBALID)
+
+
+def columns(source
+           ,target
+           ,ignore=IGNORE):
+
+    # attribute fields in both GDBTables, in target order
+    # objectids, shapes, globalids and ignore are left out
+    ignore = {name.lower() for name in ignore}
+    names = {field.name.lower() for field in source.fields
+             if field.type not in _SKIP_TYPES}
+    return [field.name for field in target.fields
+            if field.type not in _SKIP_TYPES
+            and field.name.lower() in names
+            and field.name.lower() not in ignore]
+
+
+def row_hashes(table
+              ,start
+              ,stop
+              ,names):
+
+    # (objectids, hashes) of the GDBTable rows in [start, stop) as int64
+    # and uint64 arrays. names are the attribute columns
+    oid = [field.name for field in table.fields
+           if field.type == gdbtable.FIELD_OBJECTID][0]
+    objectids = []
+    hashes = []
+    for row in table.rows([oid] + list(names), start, stop):
+        objectids.append(row[0])
+        data = repr(tuple(bytes(value) if isinstance(value, memoryview) else value
+                          for value in row[1:])).encode('utf-8')
+        hashes.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest()
+                                    ,'little'))
+    return (np.asarray(objectids, dtype=np.int64)
+           ,np.asarray(hashes, dtype=np.uint64))
+
+
+def tolerance(field):
+
+    # how far apart two vertices of a GDBField shape may be and still
+    # match, the XY tolerance and never less than one grid cell
+    return max(field.xytolerance or 0.0, 1.0 / field.xyscale)
+
+
+def _shapes(table
+           ,objectids
+           ,transform=None):
+
+    # {objectid: (part sizes, coords)} of the GDBTable shapes
+    shape = table.geometry_field
+    geometry = gdbgeometry.decode([(objectid, table.row(objectid, [shape.name])[0])
+                                   for objectid in objectids]
+                                 ,shape)
+    coords = geometry.coords
+    if transform is not None and len(coords):
+        coords = transform(coords)
+    shapes = {}
+    for i, objectid in enumerate(geometry.objectids.tolist()):
+        offsets = geometry.part_offsets[geometry.feature_offsets[i]:
+                                        geometry.feature_offsets[i + 1] + 1]
+        first, last = geometry.feature_vertices(i)
+        shapes[objectid] = (np.diff(offsets), coords[first:last])
+    return shapes
+
+
+def _same(source
+         ,target
+         ,tolerance):
+
+    # same parts and every vertex within tolerance
+    return (np.array_equal(source[0], target[0])
+            and (len(target[1]) == 0
+                 or float(np.max(np.abs(source[1] - target[1]))) <= tolerance))
+
+
+def _cell(shape
+         ,tolerance):
+
+    # part sizes and the tolerance cell of the first vertex, a shape
+    # within tolerance of another is in the same or a neighbouring cell
+    parts, coords = shape
+    if not len(coords):
+        return parts.tobytes(), None
+    return parts.tobytes(), tuple(int(value)
+                                  for value in np.floor(coords[0] / tolerance))
+
+
+def _neighbours(key):
+
+    parts, cell = key
+    if cell is None:
+        return [key]
+    return [(parts, (cell[0] + dx, cell[1] + dy))
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def shape_leftovers(sourcepath
+                   ,targetpath
+                   ,groups
+                   ,targetwkt
+                   ,tolerance):
+
+    # (source objectids, target objectids) left without a match when the
+    # shapes of groups are compared. groups are pairs of (source
+    # objectids, target objectids) with the same attribute hash. Runs in
+    # a worker, targetwkt reprojects the source shapes first
+    source = gdbscan.open_table(sourcepath)
+    target = gdbscan.open_table(targetpath)
+    transform = None
+    if targetwkt is not None:
+        transform = projection.between(source.geometry_field.wkt, targetwkt)
+    sourceshapes = _shapes(source
+                          ,[objectid for sourceids, _ in groups for objectid in sourceids]
+                          ,transform)
+    targetshapes = _shapes(target
+                          ,[objectid for _, targetids in groups for objectid in targetids])
+
+    missing = []
+    unexpected = []
+    for sourceids, targetids in groups:
+        cells = {}
+        for objectid in sourceids:
+            cells.setdefault(_cell(sourceshapes[objectid], tolerance), []).append(objectid)
+        for objectid in targetids:
+            shape = targetshapes[objectid]
+            match = None
+            for key in _neighbours(_cell(shape, tolerance)):
+                for candidate in cells.get(key, ()):
+                    if _same(sourceshapes[candidate], shape, tolerance):
+                        match = key, candidate
+                        break
+                if match is not None:
+                    break
+            if match is None:
+                unexpected.append(objectid)
+            else:
+                cells[match[0]].remove(match[1])
+        missing.extend(objectid for objectids in cells.values() for objectid in objectids)
+    return missing, unexpected
+
+
+def _digest(hashes):
+
+    # order free, the sum wraps at 64 bits
+    return '{0:016x}'.format(int(np.sum(hashes, dtype=np.uint64)))
+
+
+def _groups(sourceids
+            ,sourcehashes
+            ,targetids
+            ,targethashes):
+
+    # ([(source objectids, target objectids)] of the hashes on both sides
+    # in target objectid order, source objectids with a hash the target
+    # lacks, target objectids with a hash the source lacks)
+    bysource = {}
+    for objectid, value in zip(sourceids.tolist(), sourcehashes.tolist()):
+        bysource.setdefault(value, []).append(objectid)
+    bytarget = {}
+    for objectid, value in zip(targetids.tolist(), targethashes.tolist()):
+        bytarget.setdefault(value, []).append(objectid)
+    groups = []
+    missing = []
+    for value, objectids in bysource.items():
+        if value in bytarget:
+            groups.append((objectids, bytarget.pop(value)))
+        else:
+            missing.extend(objectids)
+    unexpected = [objectid for objectids in bytarget.values() for objectid in objectids]
+    return sorted(groups, key=lambda group: group[1][0]), missing, unexpected
+
+
+def _leftovers(sourceids
+              ,sourcehashes
+              ,targetids
+              ,targethashes):
+
+    # (source objectids with no matching target row, target objectids
+    # with no matching source row), duplicates match one for one
+    groups, missing, unexpected = _groups(sourceids
+                                         ,sourcehashes
+                                         ,targetids
+                                         ,targethashes)
+    for sourcegroup, targetgroup in groups:
+        missing.extend(sourcegroup[len(targetgroup):])
+        unexpected.extend(targetgroup[len(sourcegroup):])
+    return sorted(missing), sorted(unexpected)
+
+
+def _chunks(groups
+           ,rows):
+
+    # groups in lists of about rows rows, a group is never split
+    chunk = []
+    size = 0
+    for group in groups:
+        chunk.append(group)
+        size += len(group[0]) + len(group[1])
+        if size >= rows:
+            yield chunk
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk
+
+
+def _error(name
+          ,e):
+
+    return VerifyResult(name, None, None, None, None, [], []
+                       ,'{0}: {1}'.format(type(e).__name__, e))
+
+
+@tracing.traced('verify')
+def verify(gdbin
+          ,gdbout
+          ,names=None
+          ,ignore=IGNORE
+          ,geometry=True
+          ,workers=None
+          ,parts=None
+          ,min_rows=gdbscan.MIN_ROWS):
+
+    # a VerifyResult per table or feature class in names, by default
+    # every one in both gdbs. parts and min_rows split each table (see
+    # gdbscan.partitions), min_rows also sizes the chunks of shapes
+    source = filegeodatabase_manager.LocalGDB(gdbin)
+    target = filegeodatabase_manager.LocalGDB(gdbout)
+    if names is None:
+        incatalog = gdbcatalog.CatalogIndex.from_gdb(gdbin)
+        outcatalog = gdbcatalog.CatalogIndex.from_gdb(gdbout)
+        names = sorted(item.name for item in incatalog.of_type('FeatureClass', 'Table')
+                       if item.name in outcatalog)
+
+    results = []
+    submitted = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name in names:
+            try:
+                sourcepath = source.tablepath(name)
+                targetpath = target.tablepath(name)
+                with gdbtable.GDBTable(sourcepath) as s, \
+                     gdbtable.GDBTable(targetpath) as t:
+                    attributes = columns(s, t, ignore)
+                    shapes = None
+                    if (geometry and s.geometry_field is not None
+                    and t.geometry_field is not None):
+                        targetwkt = None
+                        if s.geometry_field.wkt != t.geometry_field.wkt:
+                            # fail here, not in every worker
+                            projection.between(s.geometry_field.wkt
+                                              ,t.geometry_field.wkt)
+                            targetwkt = t.geometry_field.wkt
+                        shapes = (sourcepath
+                                 ,targetpath
+                                 ,targetwkt
+                                 ,tolerance(t.geometry_field))
+            except Exception as e:
+                results.append(_error(name, e))
+                continue
+            futures = {}
+            for side, path in (('source', sourcepath)
+                              ,('target', targetpath)):
+                futures[side] = gdbscan.submit(pool
+                                              ,path
+                                              ,row_hashes
+                                              ,(attributes,)
+                                              ,parts
+                                              ,min_rows)
+            submitted.append((name, futures, shapes))
+
+        # attributes of every table, then the shapes of the rows whose
+        # attributes match, the pool stays busy with both
+        compared = []
+        for name, futures, shapes in submitted:
+            try:
+                sides = {}
+                for side, parts in futures.items():
+                    parts = [future.result() for future in parts]
+                    sides[side] = (np.concatenate([part[0] for part in parts])
+                                  ,np.concatenate([part[1] for part in parts]))
+            except Exception as e:
+                results.append(_error(name, e))
+                continue
+            sourceids, sourcehashes = sides['source']
+            targetids, targethashes = sides['target']
+            result = VerifyResult(name
+                                 ,len(sourceids)
+                                 ,len(targetids)
+                                 ,_digest(sourcehashes)
+                                 ,_digest(targethashes)
+                                 ,[]
+                                 ,[]
+                                 ,None)
+            if shapes is None:
+                if (result.source_digest != result.target_digest
+                or len(sourceids) != len(targetids)):
+                    missing, unexpected = _leftovers(sourceids
+                                                    ,sourcehashes
+                                                    ,targetids
+                                                    ,targethashes)
+                    result = result._replace(missing=missing, unexpected=unexpected)
+                results.append(result)
+                continue
+            groups, missing, unexpected = _groups(sourceids
+                                                 ,sourcehashes
+                                                 ,targetids
+                                                 ,targethashes)
+            sourcepath, targetpath, targetwkt, within = shapes
+            chunks = [pool.submit(shape_leftovers
+                                 ,sourcepath
+                                 ,targetpath
+                                 ,chunk
+                                 ,targetwkt
+                                 ,within)
+                      for chunk in _chunks(groups, max(min_rows, 1))]
+            compared.append((result, missing, unexpected, chunks))
+
+        for result, missing, unexpected, chunks in compared:
+            try:
+                for chunk in chunks:
+                    leftover = chunk.result()
+                    missing.extend(leftover[0])
+                    unexpected.extend(leftover[1])
+            except Exception as e:
+                results.append(_error(result.name, e))
+                continue
+            results.append(result._replace(missing=sorted(missing)
+                                          ,unexpected=sorted(unexpected)))
+
+    tracing.count(rows=sum(result.source_rows or 0 for result in results)
+                 ,items=len(results))
+    return sorted(results, key=lambda result: result.name)
+
+
+def failures(results):
+
+    # tables that were read and differ
+    return [result for result in results
+            if result.error is None and (result.missing or result.unexpected)]
+
+
+def errors(results):
+
+    # tables that could not be read, shapes gdbgeometry cannot decode
+    # (curves, M values) among them. Unverified, not known to differ
+    return [result for result in results if result.error is not None]
+
+
+def format_results(results
+                  ,limit=10):
+
+    # limit objectids listed per table and side
+    def listed(objectids):
+        more = len(objectids) - limit
+        text = ', '.join(str(objectid) for objectid in objectids[:limit])
+        return text + (' and {0} more'.format(more) if more > 0 else '')
+
+    lines = ['{0:<40} {1:>12} {2:>12}  {3}'.format('table', 'source', 'target', 'digest')]
+    for result in results:
+        if result.error is not None:
+            lines.append('{0:<40} not verified: {1}'.format(result.name, result.error))
+            continue
+        lines.append('{0:<40} {1:>12} {2:>12}  {3}'.format(
+            result.name
+           ,result.source_rows
+           ,result.target_rows
+           ,result.source_digest if result.source_digest == result.target_digest
+            else '{0} != {1}'.format(result.source_digest, result.target_digest)))
+        if result.missing:
+            lines.append('    not in target, source OBJECTIDs {0}'.format(
+                listed(result.missing)))
+        if result.unexpected:
+            lines.append('    not in source, target OBJECTIDs {0}'.format(
+                listed(result.unexpected)))
+    return '\n'.join(lines)
@@ -0,0 +1,147 @@
+import os
+import time
+import shutil
+import uuid
+
+# a directory of cached files (or directories, a .gdb is a directory)
+# one entry per key. An entry's mtime is its last use, eviction removes
+# entries unused for longer than max_age and then the least recently
+# used until the cache fits in max_bytes
+
+
+class FileCache(object):
+
+    def __init__(self
+                ,directory
+                ,max_bytes=None
+                ,max_age=None):
+
+        # max_age in seconds, None means no limit
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age   = max_age
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self
+            ,key
+            ,suffix=''):
+
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self
+           ,key
+           ,suffix=''):
+
+        # path of the cached entry or None, a hit counts as a use
+        path = self.path(key, suffix)
+        if not os.path.exists(path):
+            return None
+        if self.max_age is not None and self._age(path) > self.max_age:
+            self._remove(path)
+            return None
+        os.utime(path)
+        return path
+
+    def put(self
+           ,key
+           ,source
+           ,suffix=''):
+
+        # copy source in under key, readers never see a partial entry
+        path = self.path(key, suffix)
+        temp = os.path.join(self.directory
+                           ,'.{0}.tmp'.format(uuid.uuid4().hex))
+        try:
+            if os.path.isdir(source):
+                shutil.copytree(source, temp)
+            else:
+                shutil.copyfile(source, temp)
+            if os.path.isdir(path):
+                # another process won, directories cannot be replaced
+                self._remove(temp)
+            else:
+                os.replace(temp, path)
+        except BaseException:
+            self._remove(temp)
+            raise
+        os.utime(path)
+        self.evict()
+        return path
+
+    def entries(self):
+
+        # [(path, bytes, last use)] oldest use first, no temp entries
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith('.'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((path
+                               ,_size(path)
+                               ,os.path.getmtime(path)))
+            except FileNotFoundError:
+                # evicted by someone else while we looked
+                continue
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+
+        return sum(entry[1] for entry in self.entries())
+
+    def evict(self):
+
+        # returns the removed paths
+        removed = []
+        entries = self.entries()
+
+        if self.max_age is not None:
+            now = time.time()
+            for entry in list(entries):
+                if now - entry[2] > self.max_age:
+                    self._remove(entry[0])
+                    removed.append(entry[0])
+                    entries.remove(entry)
+
+        if self.max_bytes is not None:
+            total = sum(entry[1] for entry in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                removed.append(path)
+                total -= size
+
+        return removed
+
+    def clear(self):
+
+        for name in os.listdir(self.directory):
+            self._remove(os.path.join(self.directory, name))
+
+    def _age(self
+            ,path):
+
+        return time.time() - os.path.getmtime(path)
+
+    def _remove(self
+               ,path):
+
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _size(path):
+
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
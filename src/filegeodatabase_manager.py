@@ -1,10 +1,19 @@
-import arcpy
 import os
 import stat
 import shutil
 import glob
 from pathlib import Path
 
+import gdbcopy
+import gdbscan
+import gdbbackend
+import gdblocks
+import gdbtable
+import gdbtrash
+import gdbcatalog
+import gdbgeometry
+import tracing
+
 class LocalGDB(object):
 
     def __init__(self
@@ -16,11 +25,16 @@ class LocalGDB(object):
         self.name     = os.path.basename(self.gdb)
         self.path     = os.path.dirname(self.gdb)
         self.basename = self.name.split('.')[0]
+        self._catalog = None
+
+        # finish deletes a previous process left in the trash
+        gdbtrash.purge_once(self.path)
 
+    @tracing.traced('gdb')
     def create(self):
 
-        arcpy.management.CreateFileGDB(self.path
-                                      ,self.name)
+        gdbbackend.get().create_file_gdb(self.path
+                                        ,self.name)
 
     def _remove_readonly(self
                        ,func
@@ -32,16 +46,28 @@ class LocalGDB(object):
 
     def exists(self):
 
-        if arcpy.Exists(self.gdb) and os.path.isdir(self.gdb):
+        if gdbbackend.get().exists(self.gdb) and os.path.isdir(self.gdb):
             return True
         else:
             return False
 
-    def clean(self):
+    @tracing.traced('gdb')
+    def clean(self
+             ,fast=True):
+
+        # by default skips Compact, moves the gdb into the trash and
+        # returns while a background thread deletes it
+        # a refused move (open handles on windows) falls back to the slow
+        # way, fast=False asks for it: Compact and delete before returning
+        if os.path.isdir(self.gdb) and gdbbackend.get().exists(self.gdb):
 
-        if os.path.isdir(self.gdb) and arcpy.Exists(self.gdb):
-            
-            arcpy.Compact_management(self.gdb)
+            if fast:
+                try:
+                    return gdbtrash.discard(self.gdb)
+                except OSError:
+                    pass
+
+            gdbbackend.get().compact(self.gdb)
             shutil.rmtree(self.gdb, onerror=self._remove_readonly)   
     
     def has_locks(self):
@@ -56,8 +82,115 @@ class LocalGDB(object):
         else:
             return False
 
+    def locks(self):
+
+        # gdblocks.LockInfo (item, type, machine, pid, age) per lock file
+        return gdblocks.locks(self.gdb)
+
+    def wait_until_unlocked(self
+                           ,timeout=None
+                           ,ignore_stale=False):
+
+        # True once no lock files remain, False at the timeout
+        return gdblocks.wait_until_unlocked(self.gdb
+                                           ,timeout
+                                           ,ignore_stale)
+
+    @tracing.traced('gdb')
     def copy(self
-            ,out_gdb):
+            ,out_gdb
+            ,workers=None
+            ,mode='auto'
+            ,skip_freelists=False):
+
+        # parallel copy that leaves *.lock files behind
+        # mode='hardlink' only for copies that will never be edited
+        skip = gdbcopy.SKIP_LOCKS
+        if skip_freelists:
+            skip = skip + gdbcopy.SKIP_FREELISTS
+        result = gdbcopy.copy_gdb(self.gdb
+                                 ,out_gdb
+                                 ,workers=workers
+                                 ,mode=mode
+                                 ,skip=skip)
+        tracing.count(items=result.files)
+        return result
+
+    def tablepath(self
+                 ,name):
+
+        # resolved through GDB_SystemCatalog, no arcpy required
+        tableids = gdbtable.table_ids(self.gdb)
+        if name.lower() not in tableids:
+            raise ValueError('{0} not found in {1}'.format(name, self.gdb))
+
+        return gdbtable.table_path(self.gdb
+                                  ,tableids[name.lower()])
+
+    def table(self
+             ,name):
+
+        # memory mapped reader, caller should close() or use with
+        return gdbtable.GDBTable(self.tablepath(name))
+
+    @tracing.traced('gdb')
+    def geometries(self
+                  ,name):
+
+        # every shape of a feature class as flat NumPy buffers
+        with self.table(name) as table:
+            geometry = gdbgeometry.decode_table(table)
+        tracing.count(rows=len(geometry))
+        return geometry
+
+    def scan(self
+            ,name
+            ,func
+            ,args=()
+            ,parts=None
+            ,workers=None
+            ,min_rows=gdbscan.MIN_ROWS):
+
+        # func(table, start, stop, *args) over balanced objectid ranges
+        # of name in parallel processes, results in objectid order
+        # (see gdbscan)
+        return gdbscan.scan(self.tablepath(name)
+                           ,func
+                           ,args
+                           ,parts
+                           ,workers
+                           ,min_rows)
+
+    @tracing.traced('count')
+    def count(self
+             ,name):
+
+        with self.table(name) as table:
+            rows = len(table)
+        tracing.count(rows=rows, items=1)
+        return rows
+
+    def size(self):
+
+        # (rows, items) over feature classes, tables and the tables of
+        # attributed relationship classes
+        rows = 0
+        items = 0
+        for item in self.catalog(refresh=True).of_type('FeatureClass'
+                                                       ,'Table'
+                                                       ,'RelationshipClass'):
+            if item.table is not None:
+                with gdbtable.GDBTable(os.path.join(self.gdb
+                                                   ,item.table + '.gdbtable')) as table:
+                    rows += len(table)
+            items += 1
+        return rows, items
+
+    def catalog(self
+               ,refresh=False):
 
-        shutil.copytree(self.gdb
-                       ,out_gdb)
+        # GDB_Items index built in one pass and kept for later stages
+        # use refresh after schema changes
+        if refresh or self._catalog is None:
+            self._catalog = gdbcatalog.CatalogIndex.from_gdb(self.gdb)
+        return self._catalog
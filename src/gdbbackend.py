@@ -0,0 +1,875 @@
+import os
+import re
+import json
+import shutil
+import openpyxl
+
+import gdbcatalog
+import gdbcopy
+import gdbgeometry
+import gdbtable
+import xlsx_patcher
+import xlsx_schema
+
+# every geoprocessing call the pipeline makes goes through a backend
+#   ArcpyBackend  the real thing, needs ArcGIS Pro and its licenses
+#   LocalBackend  file backed stand-in, pure Python, runs anywhere
+# GDB_BACKEND=local (or use('local')) picks the stand-in, arcpy is the
+# default
+#
+# the stand-in keeps real .gdbtable files that gdbtable and friends
+# read: appends copy row bytes (geometry reencoded to the target
+# resolution), truncate and compact rewrite tables. It is faithful
+# enough to run and time the workflow, it is not a geodatabase engine.
+# No indexes, no domains, relationship classes are recorded not enforced
+
+
+class Backend(object):
+
+    name = None
+
+    def exists(self
+              ,path):
+        raise NotImplementedError
+
+    def create_file_gdb(self
+                       ,folder
+                       ,name):
+        raise NotImplementedError
+
+    def compact(self
+               ,gdb):
+        raise NotImplementedError
+
+    def get_count(self
+                 ,path):
+        raise NotImplementedError
+
+    def append(self
+              ,source
+              ,target
+              ,schema_type='TEST'):
+        raise NotImplementedError
+
+    def truncate_table(self
+                      ,path):
+        raise NotImplementedError
+
+    def create_relationship_class(self
+                                 ,**kwargs):
+        # keyword arguments of arcpy.management.CreateRelationshipClass
+        raise NotImplementedError
+
+    def relationship_classes(self
+                            ,gdb):
+
+        # {name: CreateRelationshipClass keywords} of those in gdb
+        catalog = gdbcatalog.CatalogIndex.from_gdb(gdb)
+        return {item.name: catalog.relclass_arguments(gdb, item.name)
+                for item in catalog.of_type('RelationshipClass')}
+
+    def delete(self
+              ,path):
+        raise NotImplementedError
+
+    def generate_excel_from_geodatabase(self
+                                       ,gdb
+                                       ,xlsx):
+        raise NotImplementedError
+
+    def generate_geodatabase_from_excel(self
+                                       ,xlsx
+                                       ,gdb):
+        raise NotImplementedError
+
+    def stamp_excel(self
+                   ,xlsx
+                   ,gdb=None):
+
+        # record in a generated xlsx what only this machine knows about
+        # its source gdb, gdb None clears it from a workbook that is
+        # cached or shared. The real tool records nothing
+        pass
+
+    def create_cross_reference_geodatabase(self
+                                          ,gdbin
+                                          ,gdbout
+                                          ,xref):
+        raise NotImplementedError
+
+    def load_data(self
+                 ,xref
+                 ,gdbin
+                 ,gdbout):
+        raise NotImplementedError
+
+    def cross_reference(self
+                       ,xref):
+
+        # {source name: (target name, {target field: source field})}
+        # from the DatasetMapping and FieldMapping tables of a cross
+        # reference geodatabase, an empty field map means match by name
+        ids = gdbtable.table_ids(xref)
+        for name in ('datasetmapping', 'fieldmapping'):
+            if name not in ids:
+                raise RuntimeError('{0} has no {1} table'.format(xref, name))
+
+        def rows(name, columns):
+            with gdbtable.GDBTable(gdbtable.table_path(xref, ids[name])) as table:
+                for row in table.rows(columns):
+                    yield [_dataset_name(value) if i < 2 else value
+                           for i, value in enumerate(row)]
+
+        mapping = {}
+        for source, target in rows('datasetmapping'
+                                  ,['SourceDataset', 'TargetDataset']):
+            if source and target:
+                mapping[source] = (target, {})
+        for source, target, sourcefield, targetfield in rows(
+                'fieldmapping'
+               ,['SourceDataset', 'TargetDataset', 'SourceField', 'TargetField']):
+            if source in mapping and mapping[source][0] == target and targetfield:
+                mapping[source][1][targetfield] = sourcefield
+        return mapping
+
+    def inserter(self
+                ,target
+                ,fields):
+
+        # an object with insert(rows, geometry) and close() that adds
+        # rows to the target table. fields are the target GDBFields
+        # without the objectid, rows follow them with None where the
+        # shape goes, geometry is a gdbgeometry.GeometryBuffer or None
+        raise NotImplementedError
+
+    def check_extension(self
+                       ,extension):
+        # True when the extension license is available
+        raise NotImplementedError
+
+    def check_out_extension(self
+                           ,extension):
+        raise NotImplementedError
+
+    def check_in_extension(self
+                          ,extension):
+        raise NotImplementedError
+
+    def set_workspace(self
+                     ,path):
+        # scratch workspace for this process
+        raise NotImplementedError
+
+
+class ArcpyBackend(Backend):
+
+    name = 'arcpy'
+
+    def __init__(self):
+
+        # imported here so the module loads where ArcGIS is not installed
+        import arcpy
+        self.arcpy = arcpy
+
+    def exists(self
+              ,path):
+        return bool(self.arcpy.Exists(path))
+
+    def create_file_gdb(self
+                       ,folder
+                       ,name):
+        self.arcpy.management.CreateFileGDB(folder
+                                           ,name)
+
+    def compact(self
+               ,gdb):
+        self.arcpy.Compact_management(gdb)
+
+    def get_count(self
+                 ,path):
+        return int(self.arcpy.management.GetCount(path)[0])
+
+    def append(self
+              ,source
+              ,target
+              ,schema_type='TEST'):
+        self.arcpy.management.Append(source
+                                    ,target
+                                    ,schema_type=schema_type)
+
+    def truncate_table(self
+                      ,path):
+        self.arcpy.management.TruncateTable(path)
+
+    def create_relationship_class(self
+                                 ,**kwargs):
+        self.arcpy.management.CreateRelationshipClass(**kwargs)
+
+    def delete(self
+              ,path):
+        self.arcpy.management.Delete(path)
+
+    def generate_excel_from_geodatabase(self
+                                       ,gdb
+                                       ,xlsx):
+        self.arcpy.topographic.GenerateExcelFromGeodatabase(gdb
+                                                           ,xlsx)
+
+    def generate_geodatabase_from_excel(self
+                                       ,xlsx
+                                       ,gdb):
+        self.arcpy.topographic.GenerateGeodatabaseFromExcel(xlsx
+                                                           ,gdb)
+
+    def create_cross_reference_geodatabase(self
+                                          ,gdbin
+                                          ,gdbout
+                                          ,xref):
+        self.arcpy.topographic.CreateCrossReferenceGeodatabase(gdbin
+                                                              ,gdbout
+                                                              ,xref)
+
+    def load_data(self
+                 ,xref
+                 ,gdbin
+                 ,gdbout):
+        self.arcpy.topographic.LoadData(xref
+                                       ,gdbin
+                                       ,gdbout)
+
+    def inserter(self
+                ,target
+                ,fields):
+        return _ArcpyInserter(self.arcpy, target, fields)
+
+    def check_extension(self
+                       ,extension):
+        return self.arcpy.CheckExtension(extension) == "Available"
+
+    def check_out_extension(self
+                           ,extension):
+        self.arcpy.CheckOutExtension(extension)
+
+    def check_in_extension(self
+                          ,extension):
+        self.arcpy.CheckInExtension(extension)
+
+    def set_workspace(self
+                     ,path):
+        self.arcpy.env.scratchWorkspace = path
+        self.arcpy.env.workspace = path
+
+
+def _dataset_name(value):
+
+    # cross reference datasets may carry their feature dataset
+    if value is None:
+        return None
+    return str(value).replace('/', '\\').split('\\')[-1]
+
+
+class _ArcpyInserter(object):
+
+    def __init__(self
+                ,arcpy
+                ,target
+                ,fields):
+
+        # globalids belong to the target, arcpy makes them
+        self.arcpy = arcpy
+        self.keep = [i for i, field in enumerate(fields)
+                     if field.type not in (gdbtable.FIELD_GEOMETRY
+                                          ,gdbtable.FIELD_GLOBALID)]
+        names = [fields[i].name for i in self.keep]
+        self.hasshape = any(field.type == gdbtable.FIELD_GEOMETRY for field in fields)
+        if self.hasshape:
+            names.append('SHAPE@')
+        self.cursor = arcpy.da.InsertCursor(target, names)
+
+    def insert(self
+              ,rows
+              ,geometry=None):
+
+        shapes = None
+        if self.hasshape and geometry is not None:
+            shapes = gdbgeometry.esri_json(geometry)
+        for i, row in enumerate(rows):
+            values = [row[j] for j in self.keep]
+            if self.hasshape:
+                shape = shapes[i] if shapes is not None else None
+                values.append(self.arcpy.AsShape(shape, True)
+                              if shape is not None else None)
+            self.cursor.insertRow(values)
+
+    def close(self):
+        del self.cursor
+
+
+# the stand-in records what only arcpy would know in these files
+_RELCLASSES = 'localbackend.relationshipclasses'
+_XREF       = 'localbackend.crossreference.json'
+_TEMPLATE   = '_LocalTemplate'
+
+_SYSTEM_TABLES = 8
+_PROJCS = re.compile(r'^\w+\["([^"]+)"')
+_AUTHORITY = re.compile(r'AUTHORITY\["EPSG",\s*(\d+)\]\]$')
+
+
+def _template_gdb():
+
+    # an existing file geodatabase to take the system tables from
+    return os.environ.get('GDB_LOCAL_TEMPLATE'
+                         ,os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                      ,'testdata'
+                                      ,'sample.gdb'))
+
+
+def _rewrite(path
+            ,keep=None
+            ,field_section=None
+            ,extra=()):
+
+    # rewrite a table with the live rows keep() accepts, then extra rows
+    # indexes and the freelist describe the old file, they go
+    with gdbtable.GDBTable(path) as table:
+        section = field_section or bytes(table.field_section())
+        version = table.header.version
+        rows = [(objectid, bytes(table.row_bytes(objectid)))
+                for objectid in table.objectids()
+                if keep is None or keep(table, objectid)]
+    gdbtable.write_table(path, section, list(rows) + list(extra), version)
+
+    base = os.path.splitext(path)[0]
+    directory = os.path.dirname(path)
+    for name in os.listdir(directory):
+        sidecar = os.path.join(directory, name)
+        if (sidecar.startswith(base + '.')
+        and not name.endswith(('.gdbtable', '.gdbtablx'))):
+            os.remove(sidecar)
+
+
+def _drop_items(gdb
+               ,items):
+
+    # remove catalog items, their GDB_Items and GDB_SystemCatalog rows
+    # and their table files
+    if not items:
+        return
+    names = {item.name.lower() for item in items}
+    physicalnames = {item.physicalname.lower() for item in items
+                     if item.physicalname}
+    _rewrite(gdbtable.table_path(gdb, 4)
+            ,keep=lambda table, oid: str(table.row(oid, ['Name'])[0]).lower() not in names)
+    _rewrite(gdbtable.table_path(gdb, 1)
+            ,keep=lambda table, oid: str(table.row(oid, ['Name'])[0]).lower() not in physicalnames)
+    for item in items:
+        if item.table is None:
+            continue
+        for name in os.listdir(gdb):
+            if name.startswith(item.table + '.'):
+                os.remove(os.path.join(gdb, name))
+
+
+class LocalBackend(Backend):
+
+    name = 'local'
+
+    def __init__(self
+                ,template=None):
+
+        self.template = template or _template_gdb()
+        self.checked_out = {}
+
+    def _split(self
+              ,path):
+
+        # (gdb, item name) for gdb\item or gdb\featuredataset\item
+        path = os.path.normpath(path)
+        parent = os.path.dirname(path)
+        while parent and parent != os.path.dirname(parent):
+            if parent.lower().endswith('.gdb') and os.path.isdir(parent):
+                return parent, os.path.basename(path)
+            parent = os.path.dirname(parent)
+        return None, None
+
+    def _relclasses(self
+                   ,gdb):
+
+        # one json file each so parallel creates never share a file
+        directory = os.path.join(gdb, _RELCLASSES)
+        if not os.path.isdir(directory):
+            return {}
+        relclasses = {}
+        for filename in os.listdir(directory):
+            name, extension = os.path.splitext(filename)
+            if extension != '.json':
+                continue
+            with open(os.path.join(directory, filename)) as f:
+                relclasses[name] = json.load(f)
+        return relclasses
+
+    def _table(self
+              ,path):
+
+        gdb, name = self._split(path)
+        if gdb is None:
+            raise ValueError('{0} is not in a file geodatabase'.format(path))
+        tableids = gdbtable.table_ids(gdb)
+        if name.lower() not in tableids:
+            raise ValueError('{0} not found in {1}'.format(name, gdb))
+        return gdbtable.table_path(gdb, tableids[name.lower()])
+
+    def exists(self
+              ,path):
+
+        if os.path.isdir(path):
+            return True
+        gdb, name = self._split(path)
+        if gdb is None:
+            return os.path.exists(path)
+        if name.lower() in (n.lower() for n in self._relclasses(gdb)):
+            return True
+        return name in gdbcatalog.CatalogIndex.from_gdb(gdb)
+
+    def create_file_gdb(self
+                       ,folder
+                       ,name):
+
+        # the system tables of the template, emptied of user items
+        gdb = os.path.join(folder, name)
+        if not gdb.lower().endswith('.gdb'):
+            gdb += '.gdb'
+        os.makedirs(gdb)
+        for tableid in range(1, _SYSTEM_TABLES + 1):
+            source = gdbtable.table_path(self.template, tableid)
+            if not os.path.exists(source):
+                continue
+            for extension in ('.gdbtable', '.gdbtablx'):
+                shutil.copyfile(os.path.splitext(source)[0] + extension
+                               ,os.path.splitext(gdbtable.table_path(gdb, tableid))[0]
+                                + extension)
+
+        _rewrite(gdbtable.table_path(gdb, 1)
+                ,keep=lambda table, oid: oid <= _SYSTEM_TABLES)
+        # the root folder and the workspace, nothing that hangs off them
+        _rewrite(gdbtable.table_path(gdb, 4)
+                ,keep=lambda table, oid: table.row(oid, ['Path'])[0] in ('', '\\'))
+        _rewrite(gdbtable.table_path(gdb, 6)
+                ,keep=lambda table, oid: False)
+
+    def compact(self
+               ,gdb):
+
+        for name in os.listdir(gdb):
+            if name.endswith('.gdbtable'):
+                _rewrite(os.path.join(gdb, name))
+
+    def get_count(self
+                 ,path):
+
+        with gdbtable.GDBTable(self._table(path)) as table:
+            return len(table)
+
+    def truncate_table(self
+                      ,path):
+
+        _rewrite(self._table(path)
+                ,keep=lambda table, oid: False)
+
+    def append(self
+              ,source
+              ,target
+              ,schema_type='TEST'):
+
+        sourcepath = self._table(source)
+        targetpath = self._table(target)
+
+        with gdbtable.GDBTable(sourcepath) as sourcetable, \
+             gdbtable.GDBTable(targetpath) as targettable:
+            if schema_type == 'TEST':
+                _test_schema(sourcetable, targettable)
+            rows = _reencoded_rows(sourcetable, targettable)
+            start = targettable.total_rows
+
+        _rewrite(targetpath
+                ,extra=[(start + i + 1, data) for i, data in enumerate(rows)])
+
+    def create_relationship_class(self
+                                 ,**kwargs):
+
+        # recorded beside the gdb tables, nothing is enforced
+        for table in ('origin_table', 'destination_table'):
+            if not self.exists(kwargs[table]):
+                raise ValueError('{0} does not exist'.format(kwargs[table]))
+        # only its own file is read or written, another process may be
+        # writing the one beside it
+        gdb, name = self._split(kwargs['out_relationship_class'])
+        directory = os.path.join(gdb, _RELCLASSES)
+        path = os.path.join(directory, name + '.json')
+        if os.path.exists(path):
+            raise ValueError('{0} already exists'.format(kwargs['out_relationship_class']))
+        os.makedirs(directory, exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(kwargs, f, indent=1, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+    def relationship_classes(self
+                            ,gdb):
+
+        relclasses = super().relationship_classes(gdb)
+        relclasses.update(self._relclasses(gdb))
+        return relclasses
+
+    def delete(self
+              ,path):
+
+        # recorded relationship classes only
+        gdb, name = self._split(path)
+        if gdb is None or name not in self._relclasses(gdb):
+            raise NotImplementedError('local delete of {0}'.format(path))
+        os.remove(os.path.join(gdb, _RELCLASSES, name + '.json'))
+
+    def generate_excel_from_geodatabase(self
+                                       ,gdb
+                                       ,xlsx):
+
+        _write_workbook(gdb, xlsx)
+
+    def stamp_excel(self
+                   ,xlsx
+                   ,gdb=None):
+
+        # the source path on the way back, rewrites the template sheet only
+        rows = {}
+        if gdb is not None:
+            rows['A2'] = os.path.abspath(gdb)
+        xlsx_patcher.patch_workbook(xlsx
+                                   ,{_TEMPLATE: xlsx_patcher.SheetPatch(rows=rows)})
+
+    def generate_geodatabase_from_excel(self
+                                       ,xlsx
+                                       ,gdb):
+
+        # the source schema the workbook came from, empty, with the
+        # spatial references the workbook now says
+        wb = openpyxl.load_workbook(xlsx, read_only=True)
+        try:
+            if _TEMPLATE not in wb.sheetnames:
+                raise RuntimeError('{0} was not written by the local backend'.format(xlsx))
+            template = wb[_TEMPLATE]['A2'].value
+        finally:
+            wb.close()
+        if not template:
+            raise RuntimeError('{0} does not say its source geodatabase, '
+                               'see stamp_excel'.format(xlsx))
+
+        schema = xlsx_schema.SchemaModel.from_xlsx(xlsx)
+        gdbcopy.copy_gdb(template, gdb)
+        for name in os.listdir(gdb):
+            if name.endswith('.freelist'):
+                os.remove(os.path.join(gdb, name))
+
+        catalog = gdbcatalog.CatalogIndex.from_gdb(gdb)
+        for item in catalog.of_type('FeatureClass', 'Table', 'RelationshipClass'):
+            if item.table is None:
+                continue
+            path = os.path.join(gdb, item.table + '.gdbtable')
+            section = None
+            objectclass = schema.objectclasses.named(item.name)
+            if item.type == 'FeatureClass' and objectclass:
+                srid = objectclass[0].spatialreference_id
+                if srid not in (None, -1):
+                    sr = schema.spatialreferences.get(srid)
+                    with gdbtable.GDBTable(path) as table:
+                        section = table.field_section_with(
+                            wkt=sr.wkt
+                           ,xyscale=float(sr.xyscale))
+            _rewrite(path
+                    ,keep=lambda table, oid: False
+                    ,field_section=section)
+
+        # only what the workbook lists, it may be cut down to a shard
+        classes = {str(record.name).lower() for record in schema.objectclasses}
+        datasets = {str(record.name).lower() for record in schema.datasetcontainers}
+
+        def listed(item):
+            if item.type == 'FeatureDataset':
+                return item.name.lower() in datasets
+            if item.type == 'RelationshipClass':
+                return (item.relclass is None
+                        or all(name.lower() in classes
+                               for name in item.relclass.origin + item.relclass.destination))
+            return item.name.lower() in classes
+
+        _drop_items(gdb
+                   ,[item for item in catalog.of_type('FeatureDataset'
+                                                     ,'FeatureClass'
+                                                     ,'Table'
+                                                     ,'RelationshipClass')
+                     if not listed(item)])
+
+    def create_cross_reference_geodatabase(self
+                                          ,gdbin
+                                          ,gdbout
+                                          ,xref):
+
+        # source to target of every item in both, relative to their gdbs
+        # like the dataset names the real tool records, so a cross
+        # reference is good for any copy of the same two schemas
+        incatalog = gdbcatalog.CatalogIndex.from_gdb(gdbin)
+        outcatalog = gdbcatalog.CatalogIndex.from_gdb(gdbout)
+        mapping = {}
+        for item in incatalog.of_type('FeatureClass', 'Table'):
+            if item.name in outcatalog:
+                mapping[item.name] = [
+                    os.path.relpath(os.path.join(incatalog.container(gdbin, item.name)
+                                                ,item.name)
+                                   ,gdbin)
+                   ,os.path.relpath(os.path.join(outcatalog.container(gdbout, item.name)
+                                                ,item.name)
+                                   ,gdbout)]
+        os.makedirs(xref)
+        with open(os.path.join(xref, _XREF), 'w') as f:
+            json.dump(mapping, f, indent=1, sort_keys=True)
+
+    def load_data(self
+                 ,xref
+                 ,gdbin
+                 ,gdbout):
+
+        with open(os.path.join(xref, _XREF)) as f:
+            mapping = json.load(f)
+        for name in sorted(mapping):
+            source, target = mapping[name]
+            self.append(os.path.join(gdbin, source)
+                       ,os.path.join(gdbout, target)
+                       ,schema_type='NO_TEST')
+
+    def cross_reference(self
+                       ,xref):
+
+        with open(os.path.join(xref, _XREF)) as f:
+            mapping = json.load(f)
+        return {name: (os.path.basename(target), {})
+                for name, (source, target) in mapping.items()}
+
+    def inserter(self
+                ,target
+                ,fields):
+        return _LocalInserter(self._table(target))
+
+    def check_extension(self
+                       ,extension):
+        return True
+
+    def check_out_extension(self
+                           ,extension):
+        self.checked_out[extension] = self.checked_out.get(extension, 0) + 1
+
+    def check_in_extension(self
+                          ,extension):
+        if self.checked_out.get(extension):
+            self.checked_out[extension] -= 1
+
+    def set_workspace(self
+                     ,path):
+        pass
+
+
+class _LocalInserter(object):
+
+    def __init__(self
+                ,path):
+
+        self.writer = gdbtable.TableWriter(path)
+        self.fields = self.writer.fields
+        self.shape  = None
+        values = [field for field in self.fields
+                  if field.type != gdbtable.FIELD_OBJECTID]
+        for i, field in enumerate(values):
+            if field.type == gdbtable.FIELD_GEOMETRY:
+                self.shape = i
+                self.shapefield = field
+
+    def insert(self
+              ,rows
+              ,geometry=None):
+
+        blobs = None
+        if self.shape is not None and geometry is not None:
+            blobs = gdbgeometry.encode(geometry, self.shapefield)
+        encoded = []
+        for i, row in enumerate(rows):
+            if blobs is not None:
+                row = list(row)
+                row[self.shape] = blobs[i]
+            encoded.append(gdbtable.encode_row(self.fields
+                                              ,row
+                                              ,self.writer.utf8))
+        self.writer.append(encoded)
+
+    def close(self):
+        self.writer.close()
+
+
+def _fieldlist(table):
+
+    return [(f.name.lower(), f.type) for f in table.fields
+            if f.type != gdbtable.FIELD_OBJECTID]
+
+
+def _test_schema(source
+                ,target):
+
+    if _fieldlist(source) != _fieldlist(target):
+        raise RuntimeError('{0} and {1} do not have the same fields'.format(
+            source.gdbtable, target.gdbtable))
+
+
+def _reencoded_rows(source
+                   ,target):
+
+    # source row bytes, geometry reencoded when the target geometry
+    # field has another origin or resolution
+    objectids = list(source.objectids())
+    rows = [bytes(source.row_bytes(objectid)) for objectid in objectids]
+    if _fieldlist(source) != _fieldlist(target):
+        raise NotImplementedError(
+            'local append needs matching fields, {0} and {1} differ'.format(
+                source.gdbtable, target.gdbtable))
+
+    sourcefield = source.geometry_field
+    targetfield = target.geometry_field
+    if (sourcefield is None
+    or (sourcefield.xorigin, sourcefield.yorigin, sourcefield.xyscale)
+    == (targetfield.xorigin, targetfield.yorigin, targetfield.xyscale)):
+        return rows
+
+    index = source.fields.index(sourcefield)
+    blobs = [(objectid, source.row(objectid, [sourcefield.name])[0])
+             for objectid in objectids]
+    try:
+        geometry = gdbgeometry.decode(blobs, sourcefield)
+    except NotImplementedError:
+        # curves or m values, copied as they are
+        return rows
+    encoded = dict(zip(geometry.objectids.tolist()
+                      ,gdbgeometry.encode(geometry, targetfield)))
+
+    for i, objectid in enumerate(objectids):
+        span = source.value_spans(objectid)[index]
+        blob = encoded.get(objectid)
+        if span is None or blob is None:
+            continue
+        row = rows[i]
+        rows[i] = (row[:span[0]]
+                   + gdbgeometry._varuint(len(blob))
+                   + blob
+                   + row[span[1]:])
+    return rows
+
+
+def _write_workbook(gdb
+                   ,xlsx):
+
+    # the sheets and columns GenerateExcelFromGeodatabase writes that
+    # the pipeline reads, plus the source path for the way back
+    catalog = gdbcatalog.CatalogIndex.from_gdb(gdb)
+    wb = openpyxl.Workbook()
+
+    srs = wb.active
+    srs.title = 'SpatialReferences'
+    srs.append(['ID', 'Name', 'WKID', 'WKT', None, 'VCSWKID'
+               ,None, None, None, None, 'XYScale', None, None, 'ZScale'
+               ,None, None, 'MScale'])
+    containers = wb.create_sheet('DatasetContainers')
+    containers.append(['ID', 'Name', 'Type', 'Alias', 'SpatialReferenceID'])
+    objectclasses = wb.create_sheet('ObjectClasses')
+    objectclasses.append(['ID', 'Name', 'Type', 'Alias', 'DatasetContainerID'
+                         ,None, None, None, None, 'SpatialReferenceID'])
+    fields = wb.create_sheet('Fields')
+    fields.append(['ID', 'ObjectClassID', 'FieldName', 'FieldType'
+                  ,'FieldLength', 'IsNullable'])
+    domains = wb.create_sheet('Domains')
+    domains.append(['ID', 'Name'])
+
+    srids = {}
+    datasetsrid = {}
+    datasetids = {}
+    for dataset in catalog.of_type('FeatureDataset'):
+        datasetids[dataset.name] = len(datasetids) + 1
+
+    fieldid = 0
+    for objectid, item in enumerate(catalog.of_type('FeatureClass', 'Table'), 1):
+        if item.table is None:
+            continue
+        with gdbtable.GDBTable(os.path.join(gdb, item.table + '.gdbtable')) as table:
+            srid = -1
+            shape = table.geometry_field
+            if shape is not None:
+                if shape.wkt not in srids:
+                    srids[shape.wkt] = len(srids) + 1
+                    name = _PROJCS.match(shape.wkt)
+                    wkid = _AUTHORITY.search(shape.wkt)
+                    srs.append([srids[shape.wkt]
+                               ,name.group(1) if name else None
+                               ,int(wkid.group(1)) if wkid else None
+                               ,shape.wkt
+                               ,None, -1, None, None, None, None
+                               ,repr(shape.xyscale)])
+                srid = srids[shape.wkt]
+                if item.dataset:
+                    datasetsrid.setdefault(item.dataset, srid)
+            objectclasses.append([objectid
+                                 ,item.name
+                                 ,item.type
+                                 ,item.name
+                                 ,datasetids.get(item.dataset)
+                                 ,None, None, None, None
+                                 ,srid])
+            for field in table.fields:
+                fieldid += 1
+                fields.append([fieldid
+                              ,objectid
+                              ,field.name
+                              ,'esriFieldType' + field.typename
+                              ,field.width
+                              ,field.nullable])
+
+    for name, datasetid in datasetids.items():
+        containers.append([datasetid
+                          ,name
+                          ,'FeatureDataset'
+                          ,name
+                          ,datasetsrid.get(name, -1)])
+
+    template = wb.create_sheet(_TEMPLATE)
+    template.append(['SourceGeodatabase'])
+    template.append([os.path.abspath(gdb)])
+    template.sheet_state = 'hidden'
+    wb.save(xlsx)
+
+
+_BACKENDS = {'arcpy': ArcpyBackend
+            ,'local': LocalBackend}
+
+_current = None
+
+
+def use(backend):
+
+    # backend is a Backend or a name in _BACKENDS, returns it
+    global _current
+    if isinstance(backend, str):
+        if backend not in _BACKENDS:
+            raise ValueError('unknown backend {0}'.format(backend))
+        backend = _BACKENDS[backend]()
+    _current = backend
+    return _current
+
+
+def get():
+
+    if _current is None:
+        use(os.environ.get('GDB_BACKEND', 'arcpy'))
+    return _current
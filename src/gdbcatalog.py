@@ -0,0 +1,273 @@
+import json
+import os
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+import gdbtable
+
+# one pass over the geodatabase system catalog
+#   GDB_Items             every dataset, its type, path and XML definition
+#   GDB_ItemTypes         type uuid to type name
+#   GDB_ItemRelationships which feature dataset holds which dataset
+# replaces arcpy.da.Walk plus a Describe per item
+
+# ItemRelationshipType uuid, origin is the feature dataset
+DATASET_IN_FEATURE_DATASET = '{A1633A59-46BA-4448-8706-D8ABE2B2B02E}'
+
+CatalogItem = namedtuple('CatalogItem'
+                        ,['name'
+                         ,'type'
+                         ,'dataset'
+                         ,'path'
+                         ,'physicalname'
+                         ,'table'
+                         ,'relclass'])
+
+RelClassDefinition = namedtuple('RelClassDefinition'
+                               ,['origin'
+                                ,'destination'
+                                ,'cardinality'
+                                ,'composite'
+                                ,'attributed'
+                                ,'forward_label'
+                                ,'backward_label'
+                                ,'notification'
+                                ,'origin_primary'
+                                ,'origin_foreign'
+                                ,'destination_primary'
+                                ,'destination_foreign'])
+
+# esri enumerations to arcpy.management.CreateRelationshipClass keywords
+_CARDINALITY = {'esriRelCardinalityOneToOne': 'ONE_TO_ONE'
+               ,'esriRelCardinalityOneToMany': 'ONE_TO_MANY'
+               ,'esriRelCardinalityManyToMany': 'MANY_TO_MANY'}
+
+_NOTIFICATION = {'esriRelNotificationNone': 'NONE'
+                ,'esriRelNotificationForward': 'FORWARD'
+                ,'esriRelNotificationBackward': 'BACKWARD'
+                ,'esriRelNotificationBoth': 'BOTH'}
+
+
+def _text(element
+         ,tag):
+
+    child = element.find(tag)
+    if child is None or child.text is None:
+        return ''
+    return child.text
+
+
+def _keys(element
+         ,tag):
+
+    # {KeyRole: ObjectKeyName} eg {'OriginPrimary': 'GlobalID'}
+    keys = {}
+    parent = element.find(tag)
+    if parent is not None:
+        for key in parent.findall('RelationshipClassKey'):
+            role = _text(key, 'KeyRole').replace('esriRelKeyRole', '')
+            keys[role] = _text(key, 'ObjectKeyName')
+    return keys
+
+
+def parse_relclass(definition):
+
+    # definition is the DERelationshipClassInfo xml from GDB_Items
+    root = ET.fromstring(definition)
+
+    cardinality = _text(root, 'Cardinality')
+    if cardinality not in _CARDINALITY:
+        raise RuntimeError('Unexpected Cardinality encountered - {0}'.format(
+            cardinality))
+
+    originkeys      = _keys(root, 'OriginClassKeys')
+    destinationkeys = _keys(root, 'DestinationClassKeys')
+
+    return RelClassDefinition(
+        [n.text for n in root.findall('OriginClassNames/Name')]
+       ,[n.text for n in root.findall('DestinationClassNames/Name')]
+       ,_CARDINALITY[cardinality]
+       ,_text(root, 'IsComposite') == 'true'
+       ,_text(root, 'IsAttributed') == 'true'
+       ,_text(root, 'ForwardPathLabel')
+       ,_text(root, 'BackwardPathLabel')
+       ,_NOTIFICATION.get(_text(root, 'Notification'), 'NONE')
+       ,originkeys.get('OriginPrimary', '')
+       ,originkeys.get('OriginForeign', '')
+       ,destinationkeys.get('DestinationPrimary')
+       ,destinationkeys.get('DestinationForeign'))
+
+
+class CatalogIndex(object):
+
+    def __init__(self
+                ,items):
+
+        # items is an iterable of CatalogItem
+        self.items = {item.name.lower(): item for item in items}
+
+    @classmethod
+    def from_gdb(cls
+                ,gdb):
+
+        tableids = gdbtable.table_ids(gdb)
+
+        def systemtable(name):
+            return gdbtable.GDBTable(gdbtable.table_path(gdb
+                                                        ,tableids[name.lower()]))
+
+        with systemtable('GDB_ItemTypes') as itemtypes:
+            # 'Feature Class' -> 'FeatureClass' like Describe.datasetType
+            typenames = {uuid: name.replace(' ', '')
+                         for uuid, name in itemtypes.rows(['UUID', 'Name'])}
+
+        with systemtable('GDB_ItemRelationships') as relationships:
+            datasetof = {destid: originid
+                         for originid, destid, reltype
+                         in relationships.rows(['OriginID', 'DestID', 'Type'])
+                         if reltype == DATASET_IN_FEATURE_DATASET}
+
+        with systemtable('GDB_Items') as gdbitems:
+            rows = list(gdbitems.rows(['UUID'
+                                      ,'Type'
+                                      ,'Name'
+                                      ,'PhysicalName'
+                                      ,'Path'
+                                      ,'Definition']))
+
+        names = {row[0]: row[2] for row in rows}
+
+        items = []
+        for uuid, typeid, name, physicalname, path, definition in rows:
+
+            if not name:
+                continue
+
+            itemtype = typenames.get(typeid, typeid)
+
+            dataset = None
+            if uuid in datasetof:
+                dataset = names.get(datasetof[uuid])
+
+            table = None
+            if physicalname and physicalname.lower() in tableids:
+                table = 'a{0:08x}'.format(tableids[physicalname.lower()])
+
+            relclass = None
+            if itemtype == 'RelationshipClass' and definition:
+                relclass = parse_relclass(definition)
+
+            items.append(CatalogItem(name
+                                    ,itemtype
+                                    ,dataset
+                                    ,path
+                                    ,physicalname
+                                    ,table
+                                    ,relclass))
+
+        return cls(items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items.values())
+
+    def __contains__(self
+                    ,name):
+        return name.lower() in self.items
+
+    def get(self
+           ,name):
+
+        try:
+            return self.items[name.lower()]
+        except KeyError:
+            raise KeyError('{0} not found in catalog'.format(name))
+
+    def of_type(self
+               ,*itemtypes):
+
+        return [item for item in self if item.type in itemtypes]
+
+    def container(self
+                 ,gdb
+                 ,name):
+
+        # the workspace an item lives in: the gdb or gdb\featuredataset
+        item = self.get(name)
+        if item.dataset:
+            return os.path.join(gdb, item.dataset)
+        return gdb
+
+    def relclass_arguments(self
+                          ,gdb
+                          ,name):
+
+        # arcpy.management.CreateRelationshipClass keywords that build
+        # relationship class name in gdb, any gdb with this schema
+        desc = self.get(name).relclass
+        if desc is None:
+            raise ValueError('{0} is not a relationship class'.format(name))
+
+        if len(desc.origin) > 1:
+            raise RuntimeError(
+                'Multiple ORIGIN TABLES encountered - Fix Processing - Assumes 1 - {0}'.format(
+                    desc.origin))
+        if len(desc.destination) > 1:
+            raise RuntimeError(
+                'Multiple DESTINATION TABLES encountered - Fix Processing - Assumes 1 - {0}'.format(
+                    desc.destination))
+        for table in desc.origin + desc.destination:
+            if table not in self:
+                raise RuntimeError('{0} of {1} not found in GDB'.format(table, name))
+
+        return {'origin_table': os.path.join(self.container(gdb, desc.origin[0])
+                                            ,desc.origin[0])
+               ,'destination_table': os.path.join(self.container(gdb, desc.destination[0])
+                                                 ,desc.destination[0])
+               ,'out_relationship_class': os.path.join(self.container(gdb, name)
+                                                      ,self.get(name).name)
+               ,'relationship_type': 'COMPOSITE' if desc.composite else 'SIMPLE'
+               ,'forward_label': desc.forward_label
+               ,'backward_label': desc.backward_label
+               ,'message_direction': desc.notification
+               ,'cardinality': desc.cardinality
+               ,'attributed': 'ATTRIBUTED' if desc.attributed else 'NONE'
+               ,'origin_primary_key': desc.origin_primary
+               ,'origin_foreign_key': desc.origin_foreign
+               ,'destination_primary_key': desc.destination_primary
+               ,'destination_foreign_key': desc.destination_foreign}
+
+    def counts(self):
+
+        counts = {}
+        for item in self:
+            counts[item.type] = counts.get(item.type, 0) + 1
+        return counts
+
+    def save(self
+            ,path):
+
+        items = []
+        for item in self:
+            item = item._asdict()
+            if item['relclass'] is not None:
+                item['relclass'] = item['relclass']._asdict()
+            items.append(item)
+
+        with open(path, 'w') as f:
+            json.dump(items, f, indent=1)
+
+    @classmethod
+    def load(cls
+            ,path):
+
+        with open(path) as f:
+            items = json.load(f)
+
+        for item in items:
+            if item['relclass'] is not None:
+                item['relclass'] = RelClassDefinition(**item['relclass'])
+
+        return cls(CatalogItem(**item) for item in items)
@@ -0,0 +1,98 @@
+import os
+import hashlib
+
+import gdbtable
+import gdbcatalog
+
+# fingerprints of file geodatabase content read straight from the
+# .gdbtable files, no arcpy
+# catalog_fingerprint hashes the rows and field definitions of the
+# schema tables, free space and deleted rows left behind do not count
+# table_fingerprint hashes whole files, cheap to recheck by size and mtime
+
+# the system tables that hold the schema
+# GDB_DBTune (storage keywords) and GDB_ReplicaLog are not schema
+CATALOG_TABLES = ('GDB_SystemCatalog'
+                 ,'GDB_SpatialRefs'
+                 ,'GDB_Items'
+                 ,'GDB_ItemTypes'
+                 ,'GDB_ItemRelationships'
+                 ,'GDB_ItemRelationshipTypes')
+
+_CHUNK = 1 << 20
+
+
+def _update(digest
+           ,table):
+
+    # field definitions, then every live row with its objectid
+    digest.update(table.field_section())
+    for objectid in table.objectids():
+        digest.update(objectid.to_bytes(4, 'little'))
+        digest.update(table.row_bytes(objectid))
+
+
+def catalog_fingerprint(gdb):
+
+    # changes only when the schema of gdb changes
+    ids = gdbtable.table_ids(gdb)
+    digest = hashlib.blake2b(digest_size=16)
+    for name in CATALOG_TABLES:
+        digest.update(name.encode('ascii'))
+        tableid = ids.get(name.lower())
+        if tableid is None:
+            continue
+        with gdbtable.GDBTable(gdbtable.table_path(gdb, tableid)) as table:
+            _update(digest, table)
+    return digest.hexdigest()
+
+
+def _stat(path):
+
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def table_fingerprint(gdbtablepath
+                     ,previous=None):
+
+    # {'size', 'mtime', 'hash'} of a .gdbtable and its .gdbtablx
+    # an unchanged size and mtime reuses the hash in previous, anything
+    # else rehashes both files
+    paths = (gdbtablepath
+            ,os.path.splitext(gdbtablepath)[0] + '.gdbtablx')
+    stats = [_stat(path) for path in paths]
+    fingerprint = {'size': [stat[0] for stat in stats]
+                  ,'mtime': [stat[1] for stat in stats]
+                  ,'hash': None}
+
+    if (previous is not None
+    and previous['size'] == fingerprint['size']
+    and previous['mtime'] == fingerprint['mtime']):
+        fingerprint['hash'] = previous['hash']
+        return fingerprint
+
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_CHUNK), b''):
+                digest.update(chunk)
+    fingerprint['hash'] = digest.hexdigest()
+    return fingerprint
+
+
+def table_fingerprints(gdb
+                      ,previous=None):
+
+    # {item name: table_fingerprint} for every feature class, table and
+    # attributed relationship class (the ones with rows of their own)
+    previous = previous or {}
+    catalog = gdbcatalog.CatalogIndex.from_gdb(gdb)
+    fingerprints = {}
+    for item in catalog.of_type('FeatureClass', 'Table', 'RelationshipClass'):
+        if item.table is None:
+            continue
+        fingerprints[item.name] = table_fingerprint(
+            os.path.join(gdb, item.table + '.gdbtable')
+           ,previous.get(item.name))
+    return fingerprints
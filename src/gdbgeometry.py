@@ -0,0 +1,461 @@
+import numpy as np
+
+import gdbtable
+
+# batched codec for file geodatabase shape blobs
+# a whole feature class decodes into flat NumPy buffers
+#   coords          float64 (V, 2) every vertex of every feature
+#   z               float64 (V,) or None
+#   part_offsets    int64 (P + 1,) first vertex of each part
+#   feature_offsets int64 (F + 1,) first part of each feature
+# headers are parsed per feature, the delta encoded vertex varints of
+# all features are decoded together in one vectorized pass
+
+POINT_TYPES      = {1, 9, 11, 21, 52}
+MULTIPOINT_TYPES = {8, 18, 20, 28, 53}
+POLYLINE_TYPES   = {3, 10, 13, 23, 50}
+POLYGON_TYPES    = {5, 15, 19, 25, 51}
+
+_Z_TYPES = {9, 11, 18, 20, 10, 13, 15, 19}
+_M_TYPES = {11, 13, 15, 18, 21, 23, 25, 28}
+
+_HAS_Z      = 0x80000000
+_HAS_M      = 0x40000000
+_HAS_CURVES = 0x20000000
+
+
+def _flags(shapetype):
+
+    basetype = shapetype & 0xFF
+    hasz = basetype in _Z_TYPES or bool(shapetype & _HAS_Z)
+    hasm = basetype in _M_TYPES or bool(shapetype & _HAS_M)
+    return basetype, hasz, hasm, bool(shapetype & _HAS_CURVES)
+
+
+def decode_varints(buf):
+
+    # every signed varint in a uint8 buffer, vectorized
+    # first byte: continuation bit, sign bit, 6 value bits
+    # later bytes: continuation bit, 7 value bits
+    buf = np.frombuffer(buf, dtype=np.uint8)
+    ends = np.flatnonzero(buf < 0x80)
+    if len(ends) == 0:
+        return np.zeros(0, dtype=np.int64)
+    buf = buf[:ends[-1] + 1]
+
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+
+    # position of each byte within its varint
+    position = np.arange(len(buf)) - np.repeat(starts, ends - starts + 1)
+    first = position == 0
+    shift = np.where(first, 0, 7 * position - 1).astype(np.uint64)
+    bits = np.where(first, buf & 0x3F, buf & 0x7F).astype(np.uint64)
+
+    magnitude = np.add.reduceat(bits << shift, starts).astype(np.int64)
+    return np.where(buf[starts] & 0x40, -magnitude, magnitude)
+
+
+def encode_varints(values):
+
+    # inverse of decode_varints, returns (bytes, byte length per value)
+    values = np.asarray(values, dtype=np.int64)
+    magnitude = np.abs(values).astype(np.uint64)
+
+    # 6 bits in the first byte, 7 in each of the rest
+    nbytes = np.ones(len(values), dtype=np.int64)
+    remaining = magnitude >> np.uint64(6)
+    while remaining.any():
+        more = remaining > 0
+        nbytes += more
+        remaining = remaining >> np.uint64(7)
+
+    width = int(nbytes.max()) if len(values) else 1
+    column = np.arange(width)
+    shift = np.where(column == 0, 0, 7 * column - 1).astype(np.uint64)
+    out = ((magnitude[:, None] >> shift[None, :])
+           & np.where(column == 0, 0x3F, 0x7F).astype(np.uint64))
+    out[:, 0] |= np.where(values < 0, 0x40, 0).astype(np.uint64)
+    out |= np.where(column[None, :] < (nbytes - 1)[:, None], 0x80, 0).astype(np.uint64)
+
+    keep = column[None, :] < nbytes[:, None]
+    return out.astype(np.uint8)[keep].tobytes(), nbytes
+
+
+def _varuint(value):
+
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+class GeometryBuffer(object):
+
+    def __init__(self
+                ,objectids
+                ,shapetypes
+                ,coords
+                ,part_offsets
+                ,feature_offsets
+                ,z=None):
+
+        self.objectids       = np.asarray(objectids, dtype=np.int64)
+        self.shapetypes      = np.asarray(shapetypes, dtype=np.uint32)
+        self.coords          = coords
+        self.part_offsets    = part_offsets
+        self.feature_offsets = feature_offsets
+        self.z               = z
+
+    def __len__(self):
+        return len(self.objectids)
+
+    @property
+    def vertex_count(self):
+        return len(self.coords)
+
+    def feature_vertices(self
+                        ,i):
+
+        # (start, stop) slice of coords for feature i
+        first = self.part_offsets[self.feature_offsets[i]]
+        last  = self.part_offsets[self.feature_offsets[i + 1]]
+        return int(first), int(last)
+
+    def parts(self
+             ,i):
+
+        # list of (n, 2) views into coords, one per part of feature i
+        offsets = self.part_offsets[self.feature_offsets[i]:
+                                    self.feature_offsets[i + 1] + 1]
+        return [self.coords[start:stop]
+                for start, stop in zip(offsets[:-1], offsets[1:])]
+
+    def vertex_feature(self):
+
+        # feature index of every vertex
+        partsperfeature = np.diff(self.feature_offsets)
+        vertsperpart = np.diff(self.part_offsets)
+        partfeature = np.repeat(np.arange(len(self)), partsperfeature)
+        return np.repeat(partfeature, vertsperpart)
+
+
+def _parse_header(blob):
+
+    # returns (shapetype, npoints, part lengths, header length)
+    # or None parts for a point
+    shapetype, pos = gdbtable.read_varuint(blob, 0)
+    basetype, hasz, hasm, hascurves = _flags(shapetype)
+
+    if hasm or hascurves:
+        raise NotImplementedError(
+            'shape type {0:#x} with m values or curves'.format(shapetype))
+
+    if basetype in POINT_TYPES:
+        return shapetype, None, None, pos
+
+    if basetype in MULTIPOINT_TYPES:
+        npoints, pos = gdbtable.read_varuint(blob, pos)
+        for _ in range(4):
+            _, pos = gdbtable.read_varuint(blob, pos)
+        return shapetype, npoints, [npoints] if npoints else [], pos
+
+    if basetype in POLYLINE_TYPES or basetype in POLYGON_TYPES:
+        npoints, pos = gdbtable.read_varuint(blob, pos)
+        if npoints == 0:
+            return shapetype, 0, [], pos
+        nparts, pos = gdbtable.read_varuint(blob, pos)
+        for _ in range(4):
+            _, pos = gdbtable.read_varuint(blob, pos)
+        lengths = []
+        for _ in range(nparts - 1):
+            length, pos = gdbtable.read_varuint(blob, pos)
+            lengths.append(length)
+        lengths.append(npoints - sum(lengths))
+        return shapetype, npoints, lengths, pos
+
+    raise NotImplementedError('shape type {0:#x}'.format(shapetype))
+
+
+def decode(rows
+          ,field):
+
+    # rows is an iterable of (objectid, blob) with blob None for null shapes
+    # field is the gdbtable.GDBField of the geometry column
+    objectids  = []
+    shapetypes = []
+    partlengths = []
+    partsperfeature = []
+    pointcoords = {}
+
+    # coordinate regions, separated by a 0x00 byte so every region
+    # starts right after a varint terminator
+    regions = []
+    regionstart = []
+    regioncount = []
+    regionhasz = []
+    offset = 0
+
+    for objectid, blob in rows:
+
+        objectids.append(objectid)
+        if blob is None:
+            shapetypes.append(0)
+            partsperfeature.append(0)
+            continue
+
+        shapetype, npoints, lengths, pos = _parse_header(blob)
+        shapetypes.append(shapetype)
+        hasz = _flags(shapetype)[1]
+
+        if lengths is None:
+            # point: varuint x + 1, varuint y + 1 (0 is empty)
+            x, pos = gdbtable.read_varuint(blob, pos)
+            y, pos = gdbtable.read_varuint(blob, pos)
+            if x == 0:
+                partsperfeature.append(0)
+                continue
+            z = None
+            if hasz:
+                z, pos = gdbtable.read_varuint(blob, pos)
+                z = (z - 1) / field.zscale + field.zorigin
+            pointcoords[len(partlengths)] = ((x - 1) / field.xyscale + field.xorigin
+                                            ,(y - 1) / field.xyscale + field.yorigin
+                                            ,z)
+            partlengths.append(1)
+            partsperfeature.append(1)
+            continue
+
+        partlengths.extend(lengths)
+        partsperfeature.append(len(lengths))
+        if npoints:
+            regions.append(blob[pos:])
+            regions.append(b'\x00')
+            regionstart.append(offset)
+            regioncount.append(npoints)
+            regionhasz.append(hasz)
+            offset += len(blob) - pos + 1
+
+    part_offsets = np.zeros(len(partlengths) + 1, dtype=np.int64)
+    np.cumsum(partlengths, out=part_offsets[1:])
+    feature_offsets = np.zeros(len(partsperfeature) + 1, dtype=np.int64)
+    np.cumsum(partsperfeature, out=feature_offsets[1:])
+
+    nvertices = int(part_offsets[-1])
+    coords = np.empty((nvertices, 2), dtype=np.float64)
+    z = None
+    if any(regionhasz) or any(p[2] is not None for p in pointcoords.values()):
+        z = np.full(nvertices, np.nan)
+
+    if regions:
+        buf = np.frombuffer(b''.join(regions), dtype=np.uint8)
+        ends = np.flatnonzero(buf < 0x80)
+        values = decode_varints(buf)
+
+        # varint index of each region start
+        firstvarint = np.searchsorted(ends, np.asarray(regionstart))
+        counts = np.asarray(regioncount, dtype=np.int64)
+        hasz = np.asarray(regionhasz)
+
+        # gather the 2 * npoints xy deltas of every region
+        nxy = 2 * counts
+        xyoffsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(nxy, out=xyoffsets[1:])
+        local = np.arange(xyoffsets[-1]) - np.repeat(xyoffsets[:-1], nxy)
+        deltas = values[np.repeat(firstvarint, nxy) + local].reshape(-1, 2)
+
+        # deltas run across parts and restart at each feature
+        regionvertices = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=regionvertices[1:])
+        running = np.cumsum(deltas, axis=0)
+        base = np.concatenate([np.zeros((1, 2), dtype=np.int64)
+                              ,running])[regionvertices[:-1]]
+        integers = running - np.repeat(base, counts, axis=0)
+
+        # region vertices land in coords after any point features
+        target = _region_targets(part_offsets, pointcoords, nvertices)
+        coords[target, 0] = integers[:, 0] / field.xyscale + field.xorigin
+        coords[target, 1] = integers[:, 1] / field.xyscale + field.yorigin
+
+        if hasz.any():
+            zcounts = np.where(hasz, counts, 0)
+            zoffsets = np.zeros(len(counts) + 1, dtype=np.int64)
+            np.cumsum(zcounts, out=zoffsets[1:])
+            local = np.arange(zoffsets[-1]) - np.repeat(zoffsets[:-1], zcounts)
+            dz = values[np.repeat(firstvarint + nxy, zcounts) + local]
+            runningz = np.cumsum(dz)
+            zbase = np.concatenate([[0], runningz])[zoffsets[:-1]]
+            zint = runningz - np.repeat(zbase, zcounts)
+            vertexhasz = np.repeat(hasz, counts)
+            z[target[vertexhasz]] = zint / field.zscale + field.zorigin
+
+    for part, (x, y, pointz) in pointcoords.items():
+        vertex = part_offsets[part]
+        coords[vertex] = (x, y)
+        if pointz is not None:
+            z[vertex] = pointz
+
+    return GeometryBuffer(objectids
+                         ,shapetypes
+                         ,coords
+                         ,part_offsets
+                         ,feature_offsets
+                         ,z)
+
+
+def _region_targets(part_offsets
+                   ,pointcoords
+                   ,nvertices):
+
+    # vertex indexes that come from varint regions (not single points)
+    if not pointcoords:
+        return np.arange(nvertices)
+    mask = np.ones(nvertices, dtype=bool)
+    mask[part_offsets[list(pointcoords)]] = False
+    return np.flatnonzero(mask)
+
+
+def decode_table(table
+                ,start=1
+                ,stop=None):
+
+    # every shape in a gdbtable.GDBTable feature class
+    field = table.geometry_field
+    if field is None:
+        raise ValueError('{0} has no geometry field'.format(table.name))
+    oidfield = [f.name for f in table.fields
+                if f.type == gdbtable.FIELD_OBJECTID][0]
+    return decode(table.rows([oidfield, field.name], start, stop)
+                 ,field)
+
+
+def encode(geometry
+          ,field):
+
+    # GeometryBuffer back to a list of blobs (None for null shapes)
+    ix = np.round((geometry.coords[:, 0] - field.xorigin) * field.xyscale).astype(np.int64)
+    iy = np.round((geometry.coords[:, 1] - field.yorigin) * field.xyscale).astype(np.int64)
+    iz = None
+    if geometry.z is not None:
+        iz = np.round((np.nan_to_num(geometry.z) - field.zorigin)
+                      * field.zscale).astype(np.int64)
+
+    # delta encode every vertex against the previous vertex of its feature
+    vertexfeature = geometry.vertex_feature()
+    firstvertex = np.ones(len(ix), dtype=bool)
+    firstvertex[1:] = vertexfeature[1:] != vertexfeature[:-1]
+
+    def deltas(values):
+        d = np.empty_like(values)
+        if len(values):
+            d[0] = values[0]
+            d[1:] = values[1:] - values[:-1]
+            d[firstvertex] = values[firstvertex]
+        return d
+
+    xy = np.column_stack([deltas(ix), deltas(iy)]).ravel()
+    xybytes, xylengths = encode_varints(xy)
+    xyoffsets = np.zeros(len(xylengths) + 1, dtype=np.int64)
+    np.cumsum(xylengths, out=xyoffsets[1:])
+
+    if iz is not None:
+        zbytes, zlengths = encode_varints(deltas(iz))
+        zoffsets = np.zeros(len(zlengths) + 1, dtype=np.int64)
+        np.cumsum(zlengths, out=zoffsets[1:])
+
+    blobs = []
+    for i, shapetype in enumerate(geometry.shapetypes):
+
+        shapetype = int(shapetype)
+        partslice = geometry.part_offsets[geometry.feature_offsets[i]:
+                                          geometry.feature_offsets[i + 1] + 1]
+        if shapetype == 0:
+            blobs.append(None)
+            continue
+
+        basetype, hasz = _flags(shapetype)[:2]
+        first, last = geometry.feature_vertices(i)
+        header = [_varuint(shapetype)]
+
+        if basetype in POINT_TYPES:
+            if first == last:
+                header += [_varuint(0), _varuint(0)]
+            else:
+                header += [_varuint(int(ix[first]) + 1), _varuint(int(iy[first]) + 1)]
+                if hasz:
+                    header.append(_varuint(int(iz[first]) + 1))
+            blobs.append(b''.join(header))
+            continue
+
+        npoints = last - first
+        header.append(_varuint(npoints))
+        if npoints == 0:
+            blobs.append(b''.join(header))
+            continue
+
+        if basetype not in MULTIPOINT_TYPES:
+            header.append(_varuint(len(partslice) - 1))
+
+        xmin = int(ix[first:last].min())
+        ymin = int(iy[first:last].min())
+        header += [_varuint(xmin)
+                  ,_varuint(ymin)
+                  ,_varuint(int(ix[first:last].max()) - xmin)
+                  ,_varuint(int(iy[first:last].max()) - ymin)]
+
+        if basetype not in MULTIPOINT_TYPES:
+            for length in np.diff(partslice)[:-1]:
+                header.append(_varuint(int(length)))
+
+        body = xybytes[xyoffsets[2 * first]:xyoffsets[2 * last]]
+        if hasz:
+            body += zbytes[zoffsets[first]:zoffsets[last]]
+        blobs.append(b''.join(header) + body)
+
+    return blobs
+
+
+def esri_json(geometry):
+
+    # GeometryBuffer to esri json dicts (None for null or empty shapes)
+    # the shape arcpy.AsShape(json, True) builds, parts map one to one
+    # onto paths and rings so no ring grouping is needed
+    xy = geometry.coords.tolist()
+    xyz = None
+    if geometry.z is not None:
+        xyz = np.column_stack([geometry.coords, geometry.z]).tolist()
+
+    shapes = []
+    for i, shapetype in enumerate(geometry.shapetypes):
+
+        basetype, hasz = _flags(int(shapetype))[:2]
+        first, last = geometry.feature_vertices(i)
+        if shapetype == 0 or first == last:
+            shapes.append(None)
+            continue
+
+        hasz = hasz and xyz is not None
+        vertices = xyz if hasz else xy
+
+        offsets = geometry.part_offsets[geometry.feature_offsets[i]:
+                                        geometry.feature_offsets[i + 1] + 1]
+        parts = [vertices[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+
+        if basetype in POINT_TYPES:
+            shape = dict(zip(('x', 'y', 'z'), vertices[first]))
+        elif basetype in MULTIPOINT_TYPES:
+            shape = {'points': vertices[first:last]}
+        elif basetype in POLYLINE_TYPES:
+            shape = {'paths': parts}
+        else:
+            shape = {'rings': parts}
+        if hasz:
+            shape['hasZ'] = True
+        shapes.append(shape)
+    return shapes
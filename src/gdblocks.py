@@ -0,0 +1,230 @@
+import os
+import time
+import errno
+import select
+import socket
+import ctypes
+import ctypes.util
+from collections import namedtuple
+
+# file geodatabase lock files and waiting for them to go away
+# ArcGIS names them <item>.<machine>.<pid>.<thread>.<type>.lock
+#   _gdb.MYPC.8872.5064.sr.lock        geodatabase level schema lock
+#   a00000009.MYPC.8872.5064.rd.lock   read lock on a table
+# type is sr (shared schema), rd (read), wr (write), ed (edit)
+# or xs (exclusive schema)
+#
+# waiting uses inotify on linux, elsewhere polling that starts fast and
+# backs off
+
+LockInfo = namedtuple('LockInfo'
+                     ,['path'
+                      ,'item'
+                      ,'type'
+                      ,'machine'
+                      ,'pid'
+                      ,'age'])
+
+_POLL_MIN = 0.05
+_POLL_MAX = 2.0
+
+# inotify(7)
+_IN_CREATE     = 0x00000100
+_IN_DELETE     = 0x00000200
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO   = 0x00000080
+_IN_NONBLOCK   = 0x00000800
+_IN_CLOEXEC    = 0x00080000
+
+
+def parse(path
+         ,now=None):
+
+    # LockInfo for a lock file, machine and pid are None when the name
+    # does not follow the usual pattern
+    now = time.time() if now is None else now
+    parts = os.path.basename(path).split('.')
+    item = parts[0]
+    locktype = parts[-2] if len(parts) >= 3 else None
+    machine = pid = None
+    if len(parts) >= 6:
+        machine = parts[1]
+        try:
+            pid = int(parts[2])
+        except ValueError:
+            pass
+    try:
+        age = now - os.path.getmtime(path)
+    except FileNotFoundError:
+        age = None
+    return LockInfo(path, item, locktype, machine, pid, age)
+
+
+def locks(gdb):
+
+    now = time.time()
+    try:
+        names = os.listdir(gdb)
+    except FileNotFoundError:
+        return []
+    return [parse(os.path.join(gdb, name), now)
+            for name in sorted(names) if name.endswith('.lock')]
+
+
+def is_stale(lock):
+
+    # a lock from this machine whose process is gone
+    # None when we cannot tell (another machine, unparsed name)
+    if lock.pid is None or lock.machine is None:
+        return None
+    if lock.machine.lower() != socket.gethostname().split('.')[0].lower():
+        return None
+    if os.name == 'nt':
+        return None
+    try:
+        os.kill(lock.pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def _libc():
+
+    name = ctypes.util.find_library('c')
+    if name is None:
+        return None
+    libc = ctypes.CDLL(name, use_errno=True)
+    if not hasattr(libc, 'inotify_init1'):
+        return None
+    return libc
+
+
+class LockWatcher(object):
+
+    # changes() returns True when something in the gdb directory was
+    # created, deleted or renamed, False at the timeout
+    # with inotify the wait wakes on the change, otherwise it polls the
+    # lock file names with a growing interval
+
+    def __init__(self
+                ,gdb
+                ,inotify=True):
+
+        self.gdb  = gdb
+        self._fd  = None
+        self._interval = _POLL_MIN
+        self._snapshot = None
+        if inotify and os.name == 'posix':
+            self._open_inotify()
+        if self._fd is None:
+            self._snapshot = self._names()
+
+    @property
+    def uses_inotify(self):
+        return self._fd is not None
+
+    def _open_inotify(self):
+
+        libc = _libc()
+        if libc is None:
+            return
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            return
+        mask = _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO
+        if libc.inotify_add_watch(fd, os.fsencode(self.gdb), mask) < 0:
+            os.close(fd)
+            return
+        self._fd = fd
+
+    def _names(self):
+
+        try:
+            return frozenset(name for name in os.listdir(self.gdb)
+                             if name.endswith('.lock'))
+        except FileNotFoundError:
+            return frozenset()
+
+    def _drain(self):
+
+        # read and drop queued events, we only need to know there were some
+        seen = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return seen
+                raise
+            if not data:
+                return seen
+            seen = True
+
+    def changes(self
+               ,timeout=None):
+
+        if self._fd is not None:
+            if self._drain():
+                return True
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+            return bool(readable) and self._drain()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            names = self._names()
+            if names != self._snapshot:
+                self._snapshot = names
+                self._interval = _POLL_MIN
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(self._interval, remaining))
+            else:
+                time.sleep(self._interval)
+            self._interval = min(self._interval * 2, _POLL_MAX)
+
+    def close(self):
+
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self
+                ,exc_type
+                ,exc_value
+                ,traceback):
+        self.close()
+
+
+def wait_until_unlocked(gdb
+                       ,timeout=None
+                       ,ignore_stale=False
+                       ,inotify=True):
+
+    # True once gdb has no lock files, False if timeout seconds pass first
+    # ignore_stale treats locks left by dead local processes as gone
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    def unlocked():
+        current = locks(gdb)
+        if ignore_stale:
+            current = [lock for lock in current if not is_stale(lock)]
+        return not current
+
+    with LockWatcher(gdb, inotify=inotify) as watcher:
+        # the watch starts before the check, no release slips between
+        while not unlocked():
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+            watcher.changes(remaining)
+    return True
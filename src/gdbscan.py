@@ -0,0 +1,109 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import gdbtable
+import tracing
+
+# full table passes split by OBJECTID across processes
+# the .gdbtablx offsets say which objectids are live, so the objectid
+# space is cut into ranges holding the same number of rows whatever
+# the gaps deletes left. Every worker maps the table files itself, once
+# per process, and the pages are shared through the OS file cache.
+# Only (path, range) goes to a worker and only what func returns comes
+# back, never the rows
+#
+# func(table, start, stop, *args) is called with an open GDBTable and
+# must be a module level function (it is pickled by name)
+
+# below this a partition costs more to start than it saves
+MIN_ROWS = 20000
+
+# open tables of this worker process, by path
+_tables = {}
+
+
+def partitions(table
+              ,parts
+              ,min_rows=MIN_ROWS):
+
+    # [(start, stop)] objectid ranges of a GDBTable with about the same
+    # number of live rows each, at most parts of them and none smaller
+    # than min_rows unless there is only one
+    live = np.cumsum(table.offsets() != 0)
+    total = int(live[-1]) if len(live) else 0
+    parts = max(1, min(parts, total // max(min_rows, 1)))
+    if total == 0 or parts == 1:
+        return [(1, table.total_rows + 1)]
+    # the objectid of the first row of each partition
+    cuts = np.searchsorted(live, np.arange(1, parts) * total / parts, side='right') + 1
+    bounds = [1] + sorted(set(int(cut) for cut in cuts)) + [table.total_rows + 1]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def open_table(gdbtablepath):
+
+    # the GDBTable at gdbtablepath, opened once per process
+    table = _tables.get(gdbtablepath)
+    if table is None:
+        table = _tables[gdbtablepath] = gdbtable.GDBTable(gdbtablepath)
+    return table
+
+
+def run_partition(gdbtablepath
+                 ,func
+                 ,start
+                 ,stop
+                 ,args=()):
+
+    # in a worker, the table stays open for the next partition
+    return func(open_table(gdbtablepath), start, stop, *args)
+
+
+def _parts(workers):
+    # a few partitions per worker so a slow one does not hold up the end
+    return 4 * (workers or os.cpu_count() or 1)
+
+
+def submit(pool
+          ,gdbtablepath
+          ,func
+          ,args=()
+          ,parts=None
+          ,min_rows=MIN_ROWS):
+
+    # futures of func over the partitions of gdbtablepath, in objectid
+    # order, for callers that keep one pool busy with several tables
+    with gdbtable.GDBTable(gdbtablepath) as table:
+        ranges = partitions(table
+                           ,parts or _parts(None)
+                           ,min_rows)
+    return [pool.submit(run_partition, gdbtablepath, func, start, stop, args)
+            for start, stop in ranges]
+
+
+@tracing.traced('scan')
+def scan(gdbtablepath
+        ,func
+        ,args=()
+        ,parts=None
+        ,workers=None
+        ,min_rows=MIN_ROWS):
+
+    # [func(table, start, stop, *args)] over the partitions, in objectid
+    # order. One partition runs here without starting any process
+    with gdbtable.GDBTable(gdbtablepath) as table:
+        ranges = partitions(table
+                           ,parts or _parts(workers)
+                           ,min_rows)
+        tracing.count(rows=len(table), items=len(ranges))
+        if len(ranges) == 1:
+            start, stop = ranges[0]
+            return [func(table, start, stop, *args)]
+
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1
+                                            ,len(ranges))) as pool:
+        futures = [pool.submit(run_partition, gdbtablepath, func, start, stop, args)
+                   for start, stop in ranges]
+        return [future.result() for future in futures]
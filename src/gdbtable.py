@@ -0,0 +1,876 @@
+import mmap
+import os
+import struct
+import uuid
+import datetime
+from collections import namedtuple
+
+import numpy as np
+
+# read-only access to file geodatabase aXXXXXXXX.gdbtable/.gdbtablx pairs
+# without arcpy. The layout follows the reverse engineered OpenFileGDB
+# specification.  Both files are memory mapped and rows are decoded lazily
+# straight out of the map, geometry and binary values come back as
+# memoryview slices of the map (no copy)
+
+FIELD_INT16        = 0
+FIELD_INT32        = 1
+FIELD_FLOAT32      = 2
+FIELD_FLOAT64      = 3
+FIELD_STRING       = 4
+FIELD_DATETIME     = 5
+FIELD_OBJECTID     = 6
+FIELD_GEOMETRY     = 7
+FIELD_BINARY       = 8
+FIELD_RASTER       = 9
+FIELD_GUID         = 10
+FIELD_GLOBALID     = 11
+FIELD_XML          = 12
+FIELD_INT64        = 13
+FIELD_DATEONLY     = 14
+FIELD_TIMEONLY     = 15
+FIELD_DATETIMEOFFSET = 16
+
+FIELD_TYPE_NAMES = {FIELD_INT16: 'SmallInteger'
+                   ,FIELD_INT32: 'Integer'
+                   ,FIELD_FLOAT32: 'Single'
+                   ,FIELD_FLOAT64: 'Double'
+                   ,FIELD_STRING: 'String'
+                   ,FIELD_DATETIME: 'Date'
+                   ,FIELD_OBJECTID: 'OID'
+                   ,FIELD_GEOMETRY: 'Geometry'
+                   ,FIELD_BINARY: 'Blob'
+                   ,FIELD_RASTER: 'Raster'
+                   ,FIELD_GUID: 'Guid'
+                   ,FIELD_GLOBALID: 'GlobalID'
+                   ,FIELD_XML: 'XML'
+                   ,FIELD_INT64: 'BigInteger'
+                   ,FIELD_DATEONLY: 'DateOnly'
+                   ,FIELD_TIMEONLY: 'TimeOnly'
+                   ,FIELD_DATETIMEOFFSET: 'TimestampOffset'}
+
+GEOMETRY_TYPE_NAMES = {0: None
+                      ,1: 'Point'
+                      ,2: 'Multipoint'
+                      ,3: 'Polyline'
+                      ,4: 'Polygon'
+                      ,9: 'Multipatch'}
+
+# fixed width values: struct format by field type
+_FIXED = {FIELD_INT16: struct.Struct('<h')
+         ,FIELD_INT32: struct.Struct('<i')
+         ,FIELD_FLOAT32: struct.Struct('<f')
+         ,FIELD_FLOAT64: struct.Struct('<d')
+         ,FIELD_DATETIME: struct.Struct('<d')
+         ,FIELD_INT64: struct.Struct('<q')
+         ,FIELD_DATEONLY: struct.Struct('<d')
+         ,FIELD_TIMEONLY: struct.Struct('<d')}
+
+_EPOCH = datetime.datetime(1899, 12, 30)
+
+_TABLX_OFFSET_SIZE = 5
+
+TableHeader = namedtuple('TableHeader'
+                        ,['version'
+                         ,'valid_rows'
+                         ,'max_row_size'
+                         ,'file_size'
+                         ,'field_offset'
+                         ,'geometry_type'
+                         ,'has_z'
+                         ,'has_m'
+                         ,'utf8'])
+
+
+def read_varuint(buf
+                ,pos):
+
+    # 7 bits per byte, high bit set means another byte follows
+    # returns (value, next position)
+    value = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def read_varint(buf
+               ,pos):
+
+    # like read_varuint but bit 6 of the first byte is the sign
+    byte = buf[pos]
+    pos += 1
+    value = byte & 0x3F
+    negative = byte & 0x40
+    shift = 6
+    while byte & 0x80:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+    if negative:
+        value = -value
+    return value, pos
+
+
+def table_ids(gdb):
+
+    # GDB_SystemCatalog (a00000001) maps table names to the
+    # aXXXXXXXX hex file names.  Returns {lowercase name: table id}
+    systemcatalog = os.path.join(gdb, 'a00000001.gdbtable')
+    with GDBTable(systemcatalog) as catalog:
+        return {name.lower(): tableid
+                for tableid, name in catalog.rows(['ID', 'Name'])}
+
+
+def table_path(gdb
+              ,tableid):
+
+    return os.path.join(gdb, 'a{0:08x}.gdbtable'.format(tableid))
+
+
+def write_table(gdbtablepath
+               ,field_section
+               ,rows
+               ,version=3):
+
+    # write a .gdbtable/.gdbtablx pair from a field section (as returned
+    # by GDBTable.field_section) and (objectid, row bytes) pairs in
+    # ascending objectid order. Gaps in the objectids are deleted rows
+    # no free space, no indexes: a freshly compacted table
+    offsets = {}
+    maxrowsize = 0
+    with open(gdbtablepath, 'wb') as f:
+        f.write(b'\x00' * 40)
+        f.write(field_section)
+        position = 40 + len(field_section)
+        for objectid, data in rows:
+            offsets[objectid] = position
+            f.write(struct.pack('<I', len(data)))
+            f.write(data)
+            position += 4 + len(data)
+            maxrowsize = max(maxrowsize, len(data))
+        f.seek(0)
+        f.write(struct.pack('<iiiiiiqq'
+                           ,version
+                           ,len(offsets)
+                           ,maxrowsize
+                           ,5, 0, 0
+                           ,position
+                           ,40))
+
+    totalrows = max(offsets) if offsets else 0
+    nblocks = (totalrows + 1023) // 1024
+    index = bytearray(nblocks * 1024 * _TABLX_OFFSET_SIZE)
+    for objectid, position in offsets.items():
+        at = (objectid - 1) * _TABLX_OFFSET_SIZE
+        index[at:at + _TABLX_OFFSET_SIZE] = position.to_bytes(_TABLX_OFFSET_SIZE
+                                                              ,'little')
+    with open(os.path.splitext(gdbtablepath)[0] + '.gdbtablx', 'wb') as f:
+        f.write(struct.pack('<iiii', 3, nblocks, totalrows, _TABLX_OFFSET_SIZE))
+        f.write(index)
+        # no block bitmap, every block is present
+        f.write(struct.pack('<iiii', 0, 0, 0, 0))
+
+
+def encode_varuint(value):
+
+    # inverse of read_varuint
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def encode_row(fields
+              ,values
+              ,utf8=True):
+
+    # row bytes (null flags and values) as GDBTable.row_bytes returns
+    # them. values follow fields without the objectid, as _decode gives
+    # them back: datetimes as datetime, guids as {...} strings, shapes
+    # and blobs as bytes
+    nullable = [field for field in fields if field.nullable
+                and field.type != FIELD_OBJECTID]
+    nullflags = bytearray((len(nullable) + 7) >> 3)
+    # the unused bits of the last byte are set, as esri writes them
+    if len(nullable) & 7:
+        nullflags[-1] = 0xFF & ~((1 << (len(nullable) & 7)) - 1)
+    body = []
+    inullable = 0
+    values = iter(values)
+    for field in fields:
+
+        ftype = field.type
+        if ftype == FIELD_OBJECTID:
+            continue
+        value = next(values)
+
+        if field.nullable:
+            if value is None:
+                nullflags[inullable >> 3] |= 1 << (inullable & 7)
+                inullable += 1
+                continue
+            inullable += 1
+        elif value is None:
+            raise ValueError('{0} is not nullable'.format(field.name))
+
+        if ftype in _FIXED:
+            if ftype == FIELD_DATETIME and isinstance(value, datetime.datetime):
+                value = (value - _EPOCH) / datetime.timedelta(days=1)
+            body.append(_FIXED[ftype].pack(value))
+        elif ftype in (FIELD_STRING, FIELD_XML):
+            if utf8 or ftype == FIELD_XML:
+                data = value.encode('utf-8')
+            else:
+                data = value.encode('utf-16-le')
+            body.append(encode_varuint(len(data)) + data)
+        elif ftype in (FIELD_GEOMETRY, FIELD_BINARY):
+            body.append(encode_varuint(len(value)) + bytes(value))
+        elif ftype in (FIELD_GUID, FIELD_GLOBALID):
+            body.append(uuid.UUID(value).bytes_le)
+        elif ftype == FIELD_DATETIMEOFFSET:
+            body.append(struct.pack('<dh', *value))
+        else:
+            raise NotImplementedError('{0} field type {1}'.format(
+                field.name, ftype))
+
+    return bytes(nullflags) + b''.join(body)
+
+
+class TableWriter(object):
+
+    # appends rows to an existing table batch by batch, rows go to the
+    # end of the .gdbtable and their offsets straight into the .gdbtablx
+    # so nothing grows in memory with the table. Headers, the tablx
+    # trailer and stale indexes are fixed up on close()
+
+    def __init__(self
+                ,gdbtablepath):
+
+        self.gdbtable = gdbtablepath
+        self.gdbtablx = os.path.splitext(gdbtablepath)[0] + '.gdbtablx'
+        with GDBTable(gdbtablepath) as table:
+            sparse = table._blockmap is not None or table._offset_size != _TABLX_OFFSET_SIZE
+            if sparse:
+                # once, a dense copy we can append to
+                section = bytes(table.field_section())
+                rows = [(objectid, bytes(table.row_bytes(objectid)))
+                        for objectid in table.objectids()]
+                version = table.header.version
+        if sparse:
+            write_table(gdbtablepath, section, rows, version)
+        with GDBTable(gdbtablepath) as table:
+            self.fields      = table.fields
+            self.utf8        = table.header.utf8
+            self.valid_rows  = table.header.valid_rows
+            self.max_row_size = table.header.max_row_size
+            self.position    = table.header.file_size
+            self.total_rows  = table.total_rows
+        self._table = open(self.gdbtable, 'r+b')
+        self._tablx = open(self.gdbtablx, 'r+b')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self
+                ,exc_type
+                ,exc_value
+                ,traceback):
+        self.close()
+
+    def append(self
+              ,rows):
+
+        # rows are row bytes (see encode_row), returns their objectids
+        self._table.seek(self.position)
+        objectids = []
+        offsets = bytearray()
+        for data in rows:
+            self._table.write(struct.pack('<I', len(data)))
+            self._table.write(data)
+            offsets += self.position.to_bytes(_TABLX_OFFSET_SIZE, 'little')
+            self.position += 4 + len(data)
+            self.max_row_size = max(self.max_row_size, len(data))
+            self.total_rows += 1
+            objectids.append(self.total_rows)
+        if objectids:
+            self._tablx.seek(16 + (objectids[0] - 1) * _TABLX_OFFSET_SIZE)
+            self._tablx.write(offsets)
+        self.valid_rows += len(objectids)
+        return objectids
+
+    def close(self):
+
+        if self._table is None:
+            return
+        self._table.seek(4)
+        self._table.write(struct.pack('<ii', self.valid_rows, self.max_row_size))
+        self._table.seek(24)
+        self._table.write(struct.pack('<q', self.position))
+        self._table.truncate(self.position)
+        self._table.close()
+        self._table = None
+
+        nblocks = (self.total_rows + 1023) // 1024
+        end = 16 + nblocks * 1024 * _TABLX_OFFSET_SIZE
+        self._tablx.truncate(end)
+        self._tablx.seek(end)
+        self._tablx.write(struct.pack('<iiii', 0, 0, 0, 0))
+        self._tablx.seek(0)
+        self._tablx.write(struct.pack('<iiii'
+                                     ,3
+                                     ,nblocks
+                                     ,self.total_rows
+                                     ,_TABLX_OFFSET_SIZE))
+        self._tablx.close()
+
+        # indexes describe the rows before the append
+        base = os.path.splitext(self.gdbtable)[0]
+        directory = os.path.dirname(self.gdbtable)
+        for name in os.listdir(directory):
+            sidecar = os.path.join(directory, name)
+            if (sidecar.startswith(base + '.')
+            and not name.endswith(('.gdbtable', '.gdbtablx'))):
+                os.remove(sidecar)
+
+
+class GDBField(object):
+
+    __slots__ = ('name'
+                ,'alias'
+                ,'type'
+                ,'width'
+                ,'nullable'
+                ,'wkt'
+                ,'xorigin'
+                ,'yorigin'
+                ,'xyscale'
+                ,'morigin'
+                ,'mscale'
+                ,'zorigin'
+                ,'zscale'
+                ,'xytolerance'
+                ,'mtolerance'
+                ,'ztolerance'
+                ,'extent'
+                ,'grid_sizes')
+
+    def __init__(self
+                ,name
+                ,alias
+                ,fieldtype):
+
+        self.name     = name
+        self.alias    = alias
+        self.type     = fieldtype
+        self.width    = 0
+        self.nullable = False
+        for attr in self.__slots__[5:]:
+            setattr(self, attr, None)
+
+    @property
+    def typename(self):
+        return FIELD_TYPE_NAMES.get(self.type, str(self.type))
+
+    def __repr__(self):
+        return 'GDBField({0!r}, {1})'.format(self.name, self.typename)
+
+
+class GDBTable(object):
+
+    def __init__(self
+                ,gdbtable):
+
+        # gdbtable is the path to aXXXXXXXX.gdbtable
+        # the .gdbtablx offset index must sit beside it
+        self.gdbtable = gdbtable
+        self.gdbtablx = os.path.splitext(gdbtable)[0] + '.gdbtablx'
+        self.name     = os.path.basename(os.path.splitext(gdbtable)[0])
+
+        self._files = []
+        self._table = self._map(self.gdbtable)
+        self._tablx = self._map(self.gdbtablx)
+
+        self._geometry_layout = None
+        self.header = self._read_header()
+        self.fields = self._read_fields()
+        self._read_tablx_header()
+
+        self._nullable_count = sum(1 for f in self.fields if f.nullable)
+        self._view = memoryview(self._table)
+
+    def _map(self
+            ,path):
+
+        f = open(path, 'rb')
+        self._files.append(f)
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+
+        # a caller still holding a geometry memoryview keeps the map
+        # alive, in that case we leave the map to the garbage collector
+        try:
+            self._view.release()
+            self._table.close()
+        except BufferError:
+            pass
+        self._tablx.close()
+        for f in self._files:
+            f.close()
+        self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self
+                ,exc_type
+                ,exc_value
+                ,traceback):
+        self.close()
+
+    def __len__(self):
+        return self.header.valid_rows
+
+    def _read_header(self):
+
+        (version
+        ,valid_rows
+        ,max_row_size
+        ,_, _, _
+        ,file_size
+        ,field_offset) = struct.unpack_from('<iiiiiiqq', self._table, 0)
+
+        if version not in (3, 4):
+            raise ValueError('{0} is not a gdbtable (version {1})'.format(
+                self.gdbtable, version))
+
+        # field descriptor section header
+        # uint32 length, uint32 version, uint32 flags, uint16 field count
+        flags = struct.unpack_from('<I', self._table, field_offset + 8)[0]
+
+        return TableHeader(version
+                          ,valid_rows
+                          ,max_row_size
+                          ,file_size
+                          ,field_offset
+                          ,GEOMETRY_TYPE_NAMES.get(flags & 0xFF, flags & 0xFF)
+                          ,bool(flags & (1 << 31))
+                          ,bool(flags & (1 << 30))
+                          ,bool(flags & (1 << 8)))
+
+    def _read_utf16(self
+                   ,pos
+                   ,nchars):
+
+        end = pos + 2 * nchars
+        return self._table[pos:end].decode('utf-16-le'), end
+
+    def _read_fields(self):
+
+        buf = self._table
+        pos = self.header.field_offset + 12
+        (nfields,) = struct.unpack_from('<H', buf, pos)
+        pos += 2
+
+        fields = []
+        for _ in range(nfields):
+
+            name, pos  = self._read_utf16(pos + 1, buf[pos])
+            alias, pos = self._read_utf16(pos + 1, buf[pos])
+            field = GDBField(name, alias, buf[pos])
+            pos += 1
+
+            if field.type == FIELD_OBJECTID:
+                field.width = buf[pos]
+                pos += 2
+            elif field.type == FIELD_STRING:
+                (field.width,) = struct.unpack_from('<i', buf, pos)
+                field.nullable = bool(buf[pos + 4] & 1)
+                default_length, pos = read_varuint(buf, pos + 5)
+                pos += default_length
+            elif field.type == FIELD_GEOMETRY:
+                field.nullable = bool(buf[pos + 1] & 1)
+                (wkt_bytes,) = struct.unpack_from('<H', buf, pos + 2)
+                # where the spatial reference sits, for field_section_with
+                self._geometry_layout = (pos + 2, pos + 4 + wkt_bytes)
+                field.wkt, pos = self._read_utf16(pos + 4, wkt_bytes // 2)
+                pos = self._read_geometry_field(field, pos)
+            elif field.type in (FIELD_BINARY, FIELD_XML):
+                field.nullable = bool(buf[pos + 1] & 1)
+                pos += 2
+            elif field.type in (FIELD_GUID, FIELD_GLOBALID):
+                field.width = buf[pos]
+                field.nullable = bool(buf[pos + 1] & 1)
+                pos += 2
+            elif field.type == FIELD_RASTER:
+                raise NotImplementedError('{0} has a raster field {1}'.format(
+                    self.gdbtable, name))
+            else:
+                # numeric, date, time
+                field.width = buf[pos]
+                field.nullable = bool(buf[pos + 1] & 1)
+                pos += 3 + buf[pos + 2]
+
+            fields.append(field)
+
+        return fields
+
+    def _read_geometry_field(self
+                            ,field
+                            ,pos):
+
+        buf = self._table
+        geomflags = buf[pos]
+        pos += 1
+
+        def nextdouble(pos):
+            return struct.unpack_from('<d', buf, pos)[0], pos + 8
+
+        field.xorigin, pos = nextdouble(pos)
+        field.yorigin, pos = nextdouble(pos)
+        field.xyscale, pos = nextdouble(pos)
+        if geomflags & 2:
+            field.morigin, pos = nextdouble(pos)
+            field.mscale, pos  = nextdouble(pos)
+        if geomflags & 4:
+            field.zorigin, pos = nextdouble(pos)
+            field.zscale, pos  = nextdouble(pos)
+        field.xytolerance, pos = nextdouble(pos)
+        if geomflags & 2:
+            field.mtolerance, pos = nextdouble(pos)
+        if geomflags & 4:
+            field.ztolerance, pos = nextdouble(pos)
+
+        field.extent = struct.unpack_from('<4d', buf, pos)
+        pos += 32
+        if self.header.has_z:
+            pos += 16
+        if self.header.has_m:
+            pos += 16
+
+        # spatial index grid: ubyte, uint32 count, count doubles
+        (ngrids,) = struct.unpack_from('<I', buf, pos + 1)
+        pos += 5
+        field.grid_sizes = struct.unpack_from('<{0}d'.format(ngrids), buf, pos)
+        return pos + 8 * ngrids
+
+    def _read_tablx_header(self):
+
+        (_
+        ,self._nblocks
+        ,self.total_rows
+        ,self._offset_size) = struct.unpack_from('<iiii', self._tablx, 0)
+
+        # sparse tables carry a bitmap of the 1024 row blocks present
+        # after the offsets. No bitmap means every block is present
+        self._blockmap = None
+        trailer = 16 + self._nblocks * 1024 * self._offset_size
+        if len(self._tablx) >= trailer + 16:
+            (bitmap_words
+            ,total_blocks
+            ,_, _) = struct.unpack_from('<iiii', self._tablx, trailer)
+            if bitmap_words:
+                bitmap = self._tablx[trailer + 16:trailer + 16 + 4 * bitmap_words]
+                self._blockmap = []
+                present = 0
+                for block in range(total_blocks):
+                    if bitmap[block >> 3] & (1 << (block & 7)):
+                        self._blockmap.append(present)
+                        present += 1
+                    else:
+                        self._blockmap.append(None)
+
+    def row_offset(self
+                  ,objectid):
+
+        # offset of the row in the gdbtable, or 0 for a deleted objectid
+        index = objectid - 1
+        if index < 0 or index >= self.total_rows:
+            return 0
+        if self._blockmap is not None:
+            block = index >> 10
+            if block >= len(self._blockmap) or self._blockmap[block] is None:
+                return 0
+            index = (self._blockmap[block] << 10) | (index & 1023)
+        pos = 16 + index * self._offset_size
+        return int.from_bytes(self._tablx[pos:pos + self._offset_size]
+                             ,'little')
+
+    def offsets(self):
+
+        # row offset of every objectid as one NumPy array, index 0 is
+        # objectid 1 and deleted rows are 0. One pass over the tablx
+        size = self._offset_size
+        end = 16 + self._nblocks * 1024 * size
+        raw = np.zeros((self._nblocks * 1024, 8), dtype=np.uint8)
+        raw[:, :size] = np.frombuffer(self._tablx[16:end]
+                                     ,dtype=np.uint8).reshape(-1, size)
+        stored = raw.view('<u8').ravel().astype(np.int64)
+        if self._blockmap is None:
+            return stored[:self.total_rows]
+        out = np.zeros(len(self._blockmap) * 1024, dtype=np.int64)
+        for block, present in enumerate(self._blockmap):
+            if present is not None:
+                out[block << 10:(block + 1) << 10] = stored[present << 10:(present + 1) << 10]
+        return out[:self.total_rows]
+
+    def objectids(self
+                 ,start=1
+                 ,stop=None):
+
+        # objectids of the live rows in [start, stop)
+        if stop is None or stop > self.total_rows + 1:
+            stop = self.total_rows + 1
+        for objectid in range(max(start, 1), stop):
+            if self.row_offset(objectid):
+                yield objectid
+
+    def field_index(self
+                   ,name):
+
+        for i, field in enumerate(self.fields):
+            if field.name.lower() == name.lower():
+                return i
+        raise KeyError('{0} has no field {1}'.format(self.name, name))
+
+    @property
+    def geometry_field(self):
+
+        for field in self.fields:
+            if field.type == FIELD_GEOMETRY:
+                return field
+        return None
+
+    def _decode(self
+               ,offset
+               ,wanted):
+
+        # wanted is a list of booleans, one per field
+        buf = self._table
+        utf8 = self.header.utf8
+        (length,) = struct.unpack_from('<I', buf, offset)
+        pos = offset + 4
+        nullflags = pos
+        pos += (self._nullable_count + 7) >> 3
+
+        values = []
+        inullable = 0
+        for field, want in zip(self.fields, wanted):
+
+            ftype = field.type
+            if ftype == FIELD_OBJECTID:
+                continue
+
+            if field.nullable:
+                isnull = buf[nullflags + (inullable >> 3)] & (1 << (inullable & 7))
+                inullable += 1
+                if isnull:
+                    if want:
+                        values.append(None)
+                    continue
+
+            if ftype in _FIXED:
+                fixed = _FIXED[ftype]
+                if want:
+                    value = fixed.unpack_from(buf, pos)[0]
+                    if ftype == FIELD_DATETIME:
+                        value = _EPOCH + datetime.timedelta(days=value)
+                    values.append(value)
+                pos += fixed.size
+            elif ftype in (FIELD_STRING, FIELD_XML):
+                size, pos = read_varuint(buf, pos)
+                if want:
+                    if utf8 or ftype == FIELD_XML:
+                        values.append(buf[pos:pos + size].decode('utf-8'))
+                    else:
+                        values.append(buf[pos:pos + size].decode('utf-16-le'))
+                pos += size
+            elif ftype in (FIELD_GEOMETRY, FIELD_BINARY):
+                size, pos = read_varuint(buf, pos)
+                if want:
+                    values.append(self._view[pos:pos + size])
+                pos += size
+            elif ftype in (FIELD_GUID, FIELD_GLOBALID):
+                if want:
+                    values.append('{{{0}}}'.format(
+                        uuid.UUID(bytes_le=bytes(buf[pos:pos + 16]))).upper())
+                pos += 16
+            elif ftype == FIELD_DATETIMEOFFSET:
+                if want:
+                    values.append(struct.unpack_from('<dh', buf, pos))
+                pos += 10
+            else:
+                raise NotImplementedError('{0} field type {1}'.format(
+                    self.name, ftype))
+
+        return values
+
+    def _wanted(self
+               ,columns):
+
+        if columns is None:
+            return [True] * len(self.fields), None
+        indexes = [self.field_index(c) for c in columns]
+        wanted = [False] * len(self.fields)
+        for i in indexes:
+            wanted[i] = True
+        return wanted, indexes
+
+    def _project(self
+                ,objectid
+                ,values
+                ,wanted
+                ,indexes):
+
+        # put the decoded values (in field order) back into columns order
+        # the objectid is not stored in the row, it is the tablx position
+        full = []
+        it = iter(values)
+        for field, want in zip(self.fields, wanted):
+            if not want:
+                full.append(None)
+            elif field.type == FIELD_OBJECTID:
+                full.append(objectid)
+            else:
+                full.append(next(it))
+        if indexes is None:
+            return tuple(full)
+        return tuple(full[i] for i in indexes)
+
+    def row(self
+           ,objectid
+           ,columns=None):
+
+        offset = self.row_offset(objectid)
+        if not offset:
+            raise KeyError('{0} has no objectid {1}'.format(self.name
+                                                           ,objectid))
+        wanted, indexes = self._wanted(columns)
+        return self._project(objectid
+                            ,self._decode(offset, wanted)
+                            ,wanted
+                            ,indexes)
+
+    def row_bytes(self
+                 ,objectid):
+
+        # the stored row (null flags and values) without its size prefix
+        # a memoryview into the mapped file, valid until close()
+        offset = self.row_offset(objectid)
+        if not offset:
+            raise KeyError('{0} has no objectid {1}'.format(self.name
+                                                           ,objectid))
+        (length,) = struct.unpack_from('<I', self._table, offset)
+        return self._view[offset + 4:offset + 4 + length]
+
+    def field_section(self):
+
+        # the raw field descriptor section, the whole table schema
+        start = self.header.field_offset
+        (length,) = struct.unpack_from('<I', self._table, start)
+        return self._view[start:start + 4 + length]
+
+    def field_section_with(self
+                          ,wkt=None
+                          ,xyscale=None
+                          ,xytolerance=None):
+
+        # a copy of field_section() with a new geometry spatial reference
+        # origins and the spatial index grid stay as they are
+        section = bytearray(self.field_section())
+        if self._geometry_layout is None:
+            raise ValueError('{0} has no geometry field'.format(self.name))
+        field = self.geometry_field
+        lengthpos, wktend = (p - self.header.field_offset
+                             for p in self._geometry_layout)
+        flags = section[wktend]
+
+        # x origin, y origin, xy scale, [m origin, m scale],
+        # [z origin, z scale], xy tolerance
+        doubles = wktend + 1
+        if xyscale is not None:
+            struct.pack_into('<d', section, doubles + 16, xyscale)
+        if xytolerance is not None:
+            tolerance = doubles + 24
+            if flags & 2:
+                tolerance += 16
+            if flags & 4:
+                tolerance += 16
+            struct.pack_into('<d', section, tolerance, xytolerance)
+
+        if wkt is not None and wkt != field.wkt:
+            encoded = wkt.encode('utf-16-le')
+            section[lengthpos:wktend] = (struct.pack('<H', len(encoded))
+                                         + encoded)
+            struct.pack_into('<I', section, 0, len(section) - 4)
+        return bytes(section)
+
+    def value_spans(self
+                   ,objectid):
+
+        # (start, end) of each stored value inside row_bytes(objectid)
+        # a length prefix is part of its value, None for the objectid
+        # and for null values
+        offset = self.row_offset(objectid)
+        if not offset:
+            raise KeyError('{0} has no objectid {1}'.format(self.name
+                                                           ,objectid))
+        buf = self._table
+        start = offset + 4
+        nullflags = start
+        pos = start + ((self._nullable_count + 7) >> 3)
+
+        spans = []
+        inullable = 0
+        for field in self.fields:
+            ftype = field.type
+            if ftype == FIELD_OBJECTID:
+                spans.append(None)
+                continue
+            if field.nullable:
+                isnull = buf[nullflags + (inullable >> 3)] & (1 << (inullable & 7))
+                inullable += 1
+                if isnull:
+                    spans.append(None)
+                    continue
+            first = pos
+            if ftype in _FIXED:
+                pos += _FIXED[ftype].size
+            elif ftype in (FIELD_STRING, FIELD_XML, FIELD_GEOMETRY, FIELD_BINARY):
+                size, pos = read_varuint(buf, pos)
+                pos += size
+            elif ftype in (FIELD_GUID, FIELD_GLOBALID):
+                pos += 16
+            elif ftype == FIELD_DATETIMEOFFSET:
+                pos += 10
+            else:
+                raise NotImplementedError('{0} field type {1}'.format(
+                    self.name, ftype))
+            spans.append((first - start, pos - start))
+        return spans
+
+    def rows(self
+            ,columns=None
+            ,start=1
+            ,stop=None):
+
+        # generator of row tuples in field order (or in columns order)
+        # geometry and blob values are memoryviews into the mapped file
+        # and are only valid until close()
+        wanted, indexes = self._wanted(columns)
+        for objectid in self.objectids(start, stop):
+            yield self._project(objectid
+                               ,self._decode(self.row_offset(objectid), wanted)
+                               ,wanted
+                               ,indexes)
@@ -0,0 +1,120 @@
+import os
+import stat
+import uuid
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as _wait
+
+# delete geodatabases without waiting for the delete
+# discard() renames the .gdb into a .gdbtrash directory beside it (same
+# filesystem so the rename is atomic) and returns, a small thread pool
+# removes the trash, and the trash directory once it is empty. Trash
+# left behind by a process that died first is purged the next time
+# anyone looks at that directory
+
+TRASH = '.gdbtrash'
+
+_WORKERS = 2
+
+_pool    = None
+_pending = {}
+_purged  = set()
+_lock    = threading.Lock()
+
+
+def _remove_readonly(func
+                    ,path
+                    ,excinfo):
+
+    # another process purging the same trash got there first
+    if issubclass(excinfo[0], FileNotFoundError):
+        return
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def _remove(path):
+
+    shutil.rmtree(path, onerror=_remove_readonly)
+    # the last delete out takes the empty trash directory with it
+    try:
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
+
+
+def _submit(path):
+
+    # one delete per path however often it is asked for
+    global _pool
+    with _lock:
+        if path in _pending:
+            return _pending[path]
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_WORKERS
+                                      ,thread_name_prefix='gdbtrash')
+        future = _pool.submit(_remove, path)
+        _pending[path] = future
+    future.add_done_callback(lambda future: _done(path))
+    return future
+
+
+def _done(path):
+
+    # a failed delete stays in the trash for the next purge
+    with _lock:
+        _pending.pop(path, None)
+
+
+def trash_dir(path):
+
+    return os.path.join(os.path.dirname(os.path.abspath(path)), TRASH)
+
+
+def discard(path):
+
+    # returns the background delete (a Future)
+    # raises OSError when the rename is refused, on windows an open
+    # handle inside the gdb does that, the caller decides what next
+    trash = trash_dir(path)
+    target = os.path.join(trash
+                         ,'{0}.{1}'.format(os.path.basename(os.path.normpath(path))
+                                          ,uuid.uuid4().hex))
+    for attempt in range(3):
+        os.makedirs(trash, exist_ok=True)
+        try:
+            os.rename(path, target)
+            break
+        except FileNotFoundError:
+            # a finished delete removed the empty trash under us
+            if attempt == 2 or not os.path.exists(path):
+                raise
+    return _submit(target)
+
+
+def purge(directory):
+
+    # queue a delete for everything in directory/.gdbtrash
+    trash = os.path.join(directory, TRASH)
+    if not os.path.isdir(trash):
+        return []
+    return [_submit(os.path.join(trash, name)) for name in os.listdir(trash)]
+
+
+def purge_once(directory):
+
+    # purge at most once per directory per process
+    directory = os.path.abspath(directory or os.curdir)
+    with _lock:
+        if directory in _purged:
+            return []
+        _purged.add(directory)
+    return purge(directory)
+
+
+def wait(timeout=None):
+
+    # block until queued deletes finish, returns the ones still running
+    with _lock:
+        pending = list(_pending.values())
+    return _wait(pending, timeout=timeout).not_done
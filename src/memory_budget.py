@@ -0,0 +1,394 @@
+import os
+import sys
+import ctypes
+import logging
+import threading
+import tracemalloc
+from collections import namedtuple
+
+import tracing
+
+# memory per stage and a budget to stop before the host swaps
+# hooks into tracing as an observer. Each traced stage (up to max_depth
+# deep) gets a tracemalloc snapshot when it starts and ends, the
+# difference names the lines that allocated the most. A background
+# thread samples the process RSS so peaks inside arcpy or openpyxl calls
+# are seen, not only the boundaries
+#
+# over warn_at x budget we log a warning once per stage. Over budget with
+# action='abort' the next stage boundary raises MemoryBudgetExceeded,
+# nothing interrupts a tool call already running
+#
+# GDB_MEMORY_BUDGET=6G (GDB_MEMORY_ACTION=abort) installs it at import
+
+logger = logging.getLogger(__name__)
+
+StageMemory = namedtuple('StageMemory'
+                        ,['name'
+                         ,'depth'
+                         ,'start'
+                         ,'rss_start'
+                         ,'rss_peak'
+                         ,'rss_end'
+                         ,'traced_peak'
+                         ,'top'])
+
+Allocation = namedtuple('Allocation'
+                       ,['location'
+                        ,'size'
+                        ,'count'])
+
+_UNITS = {'K': 1 << 10
+         ,'M': 1 << 20
+         ,'G': 1 << 30
+         ,'T': 1 << 40}
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    pass
+
+
+def parse_size(value):
+
+    # 6G, 512M, 1.5G or plain bytes
+    if value is None or isinstance(value, int):
+        return value
+    value = str(value).strip().upper().rstrip('B')
+    if value and value[-1] in _UNITS:
+        return int(float(value[:-1]) * _UNITS[value[-1]])
+    return int(value)
+
+
+def format_size(size):
+
+    if size is None:
+        return '-'
+    for unit in ('T', 'G', 'M', 'K'):
+        if abs(size) >= _UNITS[unit]:
+            return '{0:.1f}{1}'.format(size / _UNITS[unit], unit)
+    return str(size)
+
+
+class _ProcessMemoryCounters(ctypes.Structure):
+
+    _fields_ = [('cb', ctypes.c_ulong)
+               ,('PageFaultCount', ctypes.c_ulong)
+               ,('PeakWorkingSetSize', ctypes.c_size_t)
+               ,('WorkingSetSize', ctypes.c_size_t)
+               ,('QuotaPeakPagedPoolUsage', ctypes.c_size_t)
+               ,('QuotaPagedPoolUsage', ctypes.c_size_t)
+               ,('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t)
+               ,('QuotaNonPagedPoolUsage', ctypes.c_size_t)
+               ,('PagefileUsage', ctypes.c_size_t)
+               ,('PeakPagefileUsage', ctypes.c_size_t)]
+
+
+def rss():
+
+    # resident set size of this process in bytes, None if unknown
+    if sys.platform == 'win32':
+        counters = _ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process
+                                                   ,ctypes.byref(counters)
+                                                   ,counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def physical_memory():
+
+    # bytes of RAM on this host, None if unknown
+    if sys.platform == 'win32':
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong)
+                       ,('dwMemoryLoad', ctypes.c_ulong)
+                       ,('ullTotalPhys', ctypes.c_ulonglong)
+                       ,('ullAvailPhys', ctypes.c_ulonglong)
+                       ,('ullTotalPageFile', ctypes.c_ulonglong)
+                       ,('ullAvailPageFile', ctypes.c_ulonglong)
+                       ,('ullTotalVirtual', ctypes.c_ulonglong)
+                       ,('ullAvailVirtual', ctypes.c_ulonglong)
+                       ,('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+        return None
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (OSError, ValueError):
+        return None
+
+
+def default_budget():
+
+    # leave a fifth of the host for everything else
+    total = physical_memory()
+    return int(total * 0.8) if total else None
+
+
+class _Stage(object):
+
+    __slots__ = ('span'
+                ,'snapshot'
+                ,'rss_start'
+                ,'rss_peak'
+                ,'traced_peak'
+                ,'warned')
+
+    def __init__(self
+                ,span
+                ,snapshot
+                ,rss_start):
+
+        self.span        = span
+        self.snapshot    = snapshot
+        self.rss_start   = rss_start
+        self.rss_peak    = rss_start or 0
+        self.traced_peak = 0
+        self.warned      = False
+
+
+class MemoryBudget(object):
+
+    # tracing observer, see install()
+
+    def __init__(self
+                ,budget=None
+                ,action='warn'
+                ,warn_at=0.8
+                ,interval=0.05
+                ,top=5
+                ,max_depth=1
+                ,frames=1):
+
+        if action not in ('warn', 'abort'):
+            raise ValueError('action is warn or abort, not {0}'.format(action))
+        self.budget    = parse_size(budget) or default_budget()
+        self.action    = action
+        self.warn_at   = warn_at
+        self.interval  = interval
+        self.top       = top
+        self.max_depth = max_depth
+        self.frames    = frames
+        self.stages    = []
+        self.exceeded  = None
+        self._open     = {}
+        self._lock     = threading.Lock()
+        self._stop     = threading.Event()
+        self._thread   = None
+        self._started_tracemalloc = False
+
+    def start(self):
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracemalloc = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample
+                                       ,name='memory_budget'
+                                       ,daemon=True)
+        self._thread.start()
+
+    def stop(self):
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _sample(self):
+
+        while not self._stop.wait(self.interval):
+            self._observe(rss())
+
+    def _observe(self
+                ,current):
+
+        # fold an rss sample into every open stage and check the budget
+        if current is None:
+            return
+        with self._lock:
+            stages = list(self._open.values())
+        for stage in stages:
+            stage.rss_peak = max(stage.rss_peak, current)
+        if not self.budget:
+            return
+        if current > self.budget:
+            if self.exceeded is None:
+                self.exceeded = (current
+                                ,stages[-1].span.name if stages else None)
+            if self.action == 'abort':
+                return
+        if current > self.budget * self.warn_at:
+            for stage in stages:
+                if not stage.warned:
+                    stage.warned = True
+                    logger.warning('{0} rss {1} is {2:.0f}% of the {3} budget'.format(
+                        stage.span.name
+                       ,format_size(current)
+                       ,100.0 * current / self.budget
+                       ,format_size(self.budget)))
+
+    def _fold_traced_peak(self):
+
+        # tracemalloc keeps one peak, share it with every open stage
+        # and start the next one
+        _, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            for stage in self._open.values():
+                stage.traced_peak = max(stage.traced_peak, peak)
+        tracemalloc.reset_peak()
+
+    def _snapshot(self):
+
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)
+            ,tracemalloc.Filter(False, tracing.__file__)
+            ,tracemalloc.Filter(False, __file__)])
+
+    def check(self):
+
+        # raise in abort mode once the budget was exceeded
+        # long loops outside tracing can call this themselves
+        if self.action == 'abort' and self.exceeded is not None:
+            current, stagename = self.exceeded
+            raise MemoryBudgetExceeded(
+                'rss {0} went over the {1} budget during {2}'.format(
+                    format_size(current)
+                   ,format_size(self.budget)
+                   ,stagename))
+
+    def on_start(self
+                ,span):
+
+        self.check()
+        if span.depth > self.max_depth:
+            return
+        current = rss()
+        self._observe(current)
+        if tracemalloc.is_tracing():
+            self._fold_traced_peak()
+            snapshot = self._snapshot()
+        else:
+            snapshot = None
+        with self._lock:
+            self._open[id(span)] = _Stage(span, snapshot, current)
+
+    def on_end(self
+              ,span):
+
+        with self._lock:
+            stage = self._open.get(id(span))
+        if stage is not None:
+            current = rss()
+            self._observe(current)
+            top = []
+            if tracemalloc.is_tracing():
+                self._fold_traced_peak()
+                if stage.snapshot is not None:
+                    top = self._allocators(stage.snapshot)
+            with self._lock:
+                del self._open[id(span)]
+            self.stages.append(StageMemory(span.name
+                                          ,span.depth
+                                          ,span.start
+                                          ,stage.rss_start
+                                          ,stage.rss_peak or None
+                                          ,current
+                                          ,stage.traced_peak
+                                          ,top))
+        self.check()
+
+    def _allocators(self
+                   ,before):
+
+        # lines that grew the most between before and now
+        stats = self._snapshot().compare_to(before, 'lineno')
+        stats = sorted((stat for stat in stats if stat.size_diff > 0)
+                      ,key=lambda stat: -stat.size_diff)
+        return [Allocation('{0}:{1}'.format(stat.traceback[0].filename
+                                           ,stat.traceback[0].lineno)
+                          ,stat.size_diff
+                          ,stat.count_diff)
+                for stat in stats[:self.top]]
+
+    def format_report(self):
+
+        lines = ['{0:<44} {1:>9} {2:>9} {3:>9} {4:>9}'.format(
+            'stage', 'rss', 'peak', 'growth', 'py peak')]
+        # stages finish inner first, the report reads top down
+        for stage in sorted(self.stages, key=lambda stage: stage.start):
+            growth = None
+            if stage.rss_end is not None and stage.rss_start is not None:
+                growth = stage.rss_end - stage.rss_start
+            lines.append('{0:<44} {1:>9} {2:>9} {3:>9} {4:>9}'.format(
+                '  ' * stage.depth + stage.name
+               ,format_size(stage.rss_start)
+               ,format_size(stage.rss_peak)
+               ,format_size(growth)
+               ,format_size(stage.traced_peak)))
+            for allocation in stage.top:
+                lines.append('{0:<44} {1:>9} {2:>9} blocks'.format(
+                    '  ' * stage.depth + '    ' + _short(allocation.location)
+                   ,format_size(allocation.size)
+                   ,allocation.count))
+        if self.exceeded is not None:
+            lines.append('budget {0} exceeded: rss {1} during {2}'.format(
+                format_size(self.budget)
+               ,format_size(self.exceeded[0])
+               ,self.exceeded[1]))
+        return '\n'.join(lines)
+
+
+def _short(location):
+
+    # the last two path parts are enough to find the line
+    path, _, lineno = location.rpartition(':')
+    parts = path.replace('\\', '/').split('/')
+    return '{0}:{1}'.format('/'.join(parts[-2:]), lineno)
+
+
+_installed = None
+
+
+def install(budget=None
+           ,action='warn'
+           ,**kwargs):
+
+    # turn on tracing and watch memory across its stages
+    # returns the MemoryBudget, its report grows as stages finish
+    global _installed
+    uninstall()
+    _installed = MemoryBudget(budget, action, **kwargs)
+    tracing.enable().add_observer(_installed)
+    _installed.start()
+    return _installed
+
+
+def uninstall():
+
+    global _installed
+    if _installed is not None:
+        tracing.get().remove_observer(_installed)
+        _installed.stop()
+        _installed = None
+
+
+def installed():
+    return _installed
+
+
+if os.environ.get('GDB_MEMORY_BUDGET'):
+    install(os.environ['GDB_MEMORY_BUDGET']
+           ,os.environ.get('GDB_MEMORY_ACTION', 'warn'))
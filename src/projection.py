@@ -0,0 +1,168 @@
+import re
+
+import numpy as np
+
+# batched Lambert Conformal Conic (2SP, EPSG method 9802) on NumPy arrays
+# coordinates are (N, 2) arrays: (longitude, latitude) in degrees on the
+# geographic side and (x, y) in the projected linear unit on the other
+# parameters come from ESRI WKT, the same strings we write to the
+# SpatialReferences worksheet
+
+
+def _wkt_parameters(wkt):
+
+    parameters = {name.lower(): float(value)
+                  for name, value
+                  in re.findall(r'PARAMETER\["([^"]+)",\s*([-+0-9.eE]+)\]', wkt)}
+
+    projection = re.search(r'PROJECTION\["([^"]+)"\]', wkt)
+    if projection is None or projection.group(1) != 'Lambert_Conformal_Conic':
+        raise ValueError('Not a Lambert_Conformal_Conic projection: {0}'.format(
+            wkt[:60]))
+
+    spheroid = re.search(r'SPHEROID\["[^"]*",\s*([-+0-9.eE]+),\s*([-+0-9.eE]+)\]'
+                        ,wkt)
+    if spheroid is None:
+        raise ValueError('No SPHEROID in {0}'.format(wkt[:60]))
+
+    # the projected linear unit is the UNIT after PROJECTION
+    unit = re.search(r'UNIT\["[^"]*",\s*([-+0-9.eE]+)\]'
+                    ,wkt[projection.end():])
+
+    return {'semimajor': float(spheroid.group(1))
+           ,'inverse_flattening': float(spheroid.group(2))
+           ,'central_meridian': parameters['central_meridian']
+           ,'latitude_of_origin': parameters['latitude_of_origin']
+           ,'standard_parallel_1': parameters['standard_parallel_1']
+           ,'standard_parallel_2': parameters.get('standard_parallel_2'
+                                                 ,parameters['standard_parallel_1'])
+           ,'false_easting': parameters.get('false_easting', 0.0)
+           ,'false_northing': parameters.get('false_northing', 0.0)
+           ,'unit': float(unit.group(1)) if unit else 1.0}
+
+
+class LambertConformalConic(object):
+
+    def __init__(self
+                ,semimajor
+                ,inverse_flattening
+                ,central_meridian
+                ,latitude_of_origin
+                ,standard_parallel_1
+                ,standard_parallel_2
+                ,false_easting=0.0
+                ,false_northing=0.0
+                ,unit=1.0):
+
+        # false easting and northing are in the projected unit
+        # unit is meters per projected unit (0.3048006096012192 for Foot_US)
+        self.semimajor      = semimajor
+        self.false_easting  = false_easting
+        self.false_northing = false_northing
+        self.unit           = unit
+
+        flattening = 1.0 / inverse_flattening
+        self.e = np.sqrt(2 * flattening - flattening ** 2)
+
+        self.lon0 = np.radians(central_meridian)
+        lat0 = np.radians(latitude_of_origin)
+        lat1 = np.radians(standard_parallel_1)
+        lat2 = np.radians(standard_parallel_2)
+
+        m1 = self._m(lat1)
+        m2 = self._m(lat2)
+        t1 = self._t(lat1)
+        t2 = self._t(lat2)
+
+        if np.isclose(lat1, lat2):
+            self.n = np.sin(lat1)
+        else:
+            self.n = (np.log(m1) - np.log(m2)) / (np.log(t1) - np.log(t2))
+        self.F  = m1 / (self.n * t1 ** self.n)
+        self.r0 = self._r(self._t(lat0))
+
+    @classmethod
+    def from_wkt(cls
+                ,wkt):
+
+        return cls(**_wkt_parameters(wkt))
+
+    def _m(self
+          ,lat):
+
+        return np.cos(lat) / np.sqrt(1 - (self.e * np.sin(lat)) ** 2)
+
+    def _t(self
+          ,lat):
+
+        esin = self.e * np.sin(lat)
+        return (np.tan(np.pi / 4 - lat / 2)
+                / ((1 - esin) / (1 + esin)) ** (self.e / 2))
+
+    def _r(self
+          ,t):
+
+        # meters
+        return self.semimajor * self.F * t ** self.n
+
+    def forward(self
+               ,lonlat):
+
+        # (N, 2) degrees to (N, 2) projected units
+        lonlat = np.asarray(lonlat, dtype=np.float64)
+        lon = np.radians(lonlat[..., 0])
+        lat = np.radians(lonlat[..., 1])
+
+        r = self._r(self._t(lat))
+        theta = self.n * (lon - self.lon0)
+
+        out = np.empty(lonlat.shape, dtype=np.float64)
+        out[..., 0] = self.false_easting + r * np.sin(theta) / self.unit
+        out[..., 1] = (self.false_northing
+                       + (self.r0 - r * np.cos(theta)) / self.unit)
+        return out
+
+    def inverse(self
+               ,xy
+               ,tolerance=1e-12
+               ,maxiterations=15):
+
+        # (N, 2) projected units to (N, 2) degrees
+        xy = np.asarray(xy, dtype=np.float64)
+        dx = (xy[..., 0] - self.false_easting) * self.unit
+        dy = self.r0 - (xy[..., 1] - self.false_northing) * self.unit
+
+        sign = np.sign(self.n)
+        r = sign * np.hypot(dx, dy)
+        t = (r / (self.semimajor * self.F)) ** (1 / self.n)
+        theta = np.arctan2(sign * dx, sign * dy)
+
+        # latitude by fixed point iteration, converges in a handful of steps
+        halfe = self.e / 2
+        lat = np.pi / 2 - 2 * np.arctan(t)
+        for _ in range(maxiterations):
+            esin = self.e * np.sin(lat)
+            nextlat = (np.pi / 2
+                       - 2 * np.arctan(t * ((1 - esin) / (1 + esin)) ** halfe))
+            converged = np.all(np.abs(nextlat - lat) < tolerance)
+            lat = nextlat
+            if converged:
+                break
+
+        out = np.empty(xy.shape, dtype=np.float64)
+        out[..., 0] = np.degrees(theta / self.n + self.lon0)
+        out[..., 1] = np.degrees(lat)
+        return out
+
+
+def between(sourcewkt
+           ,targetwkt):
+
+    # a function of (N, 2) source coordinates to (N, 2) target
+    # coordinates, None when the two are the same. Both must be Lambert
+    # Conformal Conic, the datum is not shifted
+    if sourcewkt == targetwkt:
+        return None
+    source = LambertConformalConic.from_wkt(sourcewkt)
+    target = LambertConformalConic.from_wkt(targetwkt)
+    return lambda coords: target.forward(source.inverse(coords))
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import gdbbackend
+import gdbcatalog
+import tracing
+
+# relationship classes in two steps
+#   build()   reads every relationship class definition of the source
+#             geodatabase once, the Plan saves to a json file
+#   execute() makes a target geodatabase match the plan. Relationship
+#             classes that already match are left alone, the rest are
+#             (re)created one at a time, or with workers > 1 in batches
+#             that share no tables
+# a plan saved with a schema key is reused while the key still matches
+# so reruns against the same schema skip reading definitions entirely
+
+_PLAN_VERSION = 1
+
+RelclassResult = namedtuple('RelclassResult'
+                           ,['name'
+                            ,'action'
+                            ,'seconds'])
+
+# CreateRelationshipClass keywords that hold paths, plans keep them
+# relative to the geodatabase
+_PATHS = ('origin_table'
+         ,'destination_table'
+         ,'out_relationship_class')
+
+
+class Plan(object):
+
+    def __init__(self
+                ,relclasses
+                ,schema=None):
+
+        # relclasses is {name: CreateRelationshipClass keywords} with
+        # paths relative to the geodatabase
+        self.relclasses = relclasses
+        self.schema     = schema
+
+    @classmethod
+    def build(cls
+             ,catalog
+             ,schema=None):
+
+        # catalog is a gdbcatalog.CatalogIndex of the source
+        relclasses = {}
+        for item in catalog.of_type('RelationshipClass'):
+            relclasses[item.name] = catalog.relclass_arguments('', item.name)
+        return cls(relclasses, schema)
+
+    @classmethod
+    def load(cls
+            ,path):
+
+        with open(path) as f:
+            plan = json.load(f)
+        if plan.get('version') != _PLAN_VERSION:
+            raise ValueError('{0} is not a version {1} plan'.format(
+                path, _PLAN_VERSION))
+        return cls(plan['relclasses'], plan['schema'])
+
+    @classmethod
+    def load_or_build(cls
+                     ,path
+                     ,gdb
+                     ,schema):
+
+        # the plan at path when it was built for schema, otherwise a new
+        # plan from gdb, saved to path
+        if schema is not None and os.path.exists(path):
+            try:
+                plan = cls.load(path)
+            except (ValueError, KeyError):
+                plan = None
+            if plan is not None and plan.schema == schema:
+                return plan
+        plan = cls.build(gdbcatalog.CatalogIndex.from_gdb(gdb), schema)
+        plan.save(path)
+        return plan
+
+    def save(self
+            ,path):
+
+        temp = path + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'version': _PLAN_VERSION
+                      ,'schema': self.schema
+                      ,'relclasses': self.relclasses}
+                     ,f
+                     ,indent=1
+                     ,sort_keys=True)
+        os.replace(temp, path)
+
+    def __len__(self):
+        return len(self.relclasses)
+
+    def arguments(self
+                 ,gdb
+                 ,name):
+
+        # keywords for relationship class name in gdb
+        arguments = dict(self.relclasses[name])
+        for key in _PATHS:
+            arguments[key] = os.path.join(gdb, arguments[key])
+        return arguments
+
+    def attributed(self):
+
+        # names of the relationship classes with their own table
+        return sorted(name for name, arguments in self.relclasses.items()
+                      if arguments['attributed'] == 'ATTRIBUTED')
+
+    def tables(self
+              ,name):
+
+        # what creating name locks: both ends, and its own table
+        arguments = self.relclasses[name]
+        tables = {os.path.basename(arguments['origin_table']).lower()
+                 ,os.path.basename(arguments['destination_table']).lower()}
+        if arguments['attributed'] == 'ATTRIBUTED':
+            tables.add(name.lower())
+        return tables
+
+    def batches(self
+               ,names=None):
+
+        # names in batches where no two share a table, first fit in
+        # name order, so every batch can be created at the same time
+        names = sorted(self.relclasses if names is None else names)
+        batches = []
+        for name in names:
+            tables = self.tables(name)
+            for batch, locked in batches:
+                if not locked & tables:
+                    batch.append(name)
+                    locked |= tables
+                    break
+            else:
+                batches.append(([name], set(tables)))
+        return [batch for batch, _ in batches]
+
+
+def _normalized(arguments):
+
+    # compare paths without case or separators, None and '' alike
+    normalized = {}
+    for key, value in arguments.items():
+        if key in _PATHS:
+            value = os.path.normcase(os.path.normpath(value))
+        elif value is None:
+            value = ''
+        normalized[key] = value
+    return normalized
+
+
+def _create(arguments):
+
+    start = time.perf_counter()
+    gdbbackend.get().create_relationship_class(**arguments)
+    return time.perf_counter() - start
+
+
+def _init_worker(backend):
+    gdbbackend.use(backend)
+
+
+@tracing.traced('relclass', 'relclass_plan.execute')
+def execute(plan
+           ,gdb
+           ,workers=1):
+
+    # make the relationship classes of gdb match plan, serially unless
+    # the caller asks for more workers
+    # returns a RelclassResult per relationship class in the plan, action
+    # is unchanged, created or replaced
+    backend = gdbbackend.get()
+    existing = {name.lower(): _normalized(arguments)
+                for name, arguments in backend.relationship_classes(gdb).items()}
+
+    results = {}
+    todo = []
+    for name in sorted(plan.relclasses):
+        arguments = plan.arguments(gdb, name)
+        current = existing.get(name.lower())
+        if current is not None and current == _normalized(arguments):
+            results[name] = RelclassResult(name, 'unchanged', 0.0)
+            continue
+        if current is not None:
+            backend.delete(arguments['out_relationship_class'])
+        results[name] = RelclassResult(name
+                                      ,'created' if current is None else 'replaced'
+                                      ,None)
+        todo.append(name)
+
+    pool = None
+    if workers is not None and workers > 1 and len(todo) > 1:
+        pool = ProcessPoolExecutor(max_workers=workers
+                                  ,initializer=_init_worker
+                                  ,initargs=(backend.name,))
+    try:
+        for batch in plan.batches(todo):
+            arguments = [plan.arguments(gdb, name) for name in batch]
+            if pool is None or len(batch) == 1:
+                seconds = [_create(argument) for argument in arguments]
+            else:
+                seconds = list(pool.map(_create, arguments))
+            for name, elapsed in zip(batch, seconds):
+                results[name] = results[name]._replace(seconds=elapsed)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    tracing.count(items=len(todo))
+    return [results[name] for name in sorted(results)]
+
+
+def format_results(results):
+
+    lines = ['{0:<50} {1:>10} {2:>10}'.format(
+        'relationship class', 'action', 'seconds')]
+    for result in results:
+        lines.append('{0:<50} {1:>10} {2:>10.1f}'.format(
+            result.name
+           ,result.action
+           ,result.seconds or 0.0))
+    return '\n'.join(lines)
@@ -0,0 +1,85 @@
+import os
+import json
+
+import gdbfingerprint
+import xlsx_schema
+
+# what the last reprojection loaded into an output geodatabase
+# saved next to the output (out.gdb -> out.gdb.manifest.json) because
+# the .gdb directory itself belongs to the geodatabase
+#
+# the schema key covers the source catalog and the content of every
+# sheet of the workbook (the workbook carries the srid). Content, not
+# bytes, because a workbook saved again is never byte for byte the
+# same. Same key means the output schema is still right and only
+# tables with a new fingerprint need a reload
+
+
+def schema_key(gdbin
+              ,xlsx):
+
+    return '{0}-{1}'.format(gdbfingerprint.catalog_fingerprint(gdbin)
+                           ,xlsx_schema.content_sha256(xlsx))
+
+
+class Manifest(object):
+
+    def __init__(self
+                ,path):
+
+        self.path   = path
+        self.schema = None
+        self.tables = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                manifest = json.load(f)
+            self.schema = manifest['schema']
+            self.tables = manifest['tables']
+
+    @classmethod
+    def for_gdb(cls
+               ,gdbout):
+
+        return cls(os.path.normpath(gdbout) + '.manifest.json')
+
+    def matches(self
+               ,schema):
+
+        return self.schema is not None and self.schema == schema
+
+    def changed(self
+               ,fingerprints):
+
+        # names in fingerprints that are new or differ from the manifest
+        return sorted(name for name, fingerprint in fingerprints.items()
+                      if name not in self.tables
+                      or self.tables[name]['hash'] != fingerprint['hash'])
+
+    def update(self
+              ,schema
+              ,fingerprints):
+
+        self.schema = schema
+        self.tables = dict(fingerprints)
+
+    def save(self):
+
+        # write then rename, a crash never leaves half a manifest
+        temp = self.path + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'schema': self.schema
+                      ,'tables': self.tables}
+                     ,f
+                     ,indent=1
+                     ,sort_keys=True)
+        os.replace(temp, self.path)
+
+    def remove(self):
+
+        # an output being rebuilt has no trustworthy manifest
+        self.schema = None
+        self.tables = {}
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
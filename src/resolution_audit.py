@@ -0,0 +1,181 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+
+import gdbtable
+import gdbcatalog
+import gdbgeometry
+import gdbscan
+
+# preview what a new XY resolution does to the data before LoadData
+# every vertex of a feature class snaps to the new resolution grid in one
+# vectorized pass. We report how many vertices move, how far, and which
+# segments end up shorter than the XY tolerance (they collapse). Points
+# and multipoints have no segments, their vertices only move
+
+AuditResult = namedtuple('AuditResult'
+                        ,['name'
+                         ,'features'
+                         ,'vertices'
+                         ,'moved'
+                         ,'max_shift'
+                         ,'mean_shift'
+                         ,'segments'
+                         ,'collapsed'
+                         ,'collapsed_objectids'
+                         ,'skipped'])
+
+
+def default_tolerance(xyscale):
+
+    # esri default: tolerance is 10x the resolution
+    # 1 / 3048.006096012192 ft resolution -> 0.0032808333 ft tolerance
+    return 10.0 / xyscale
+
+
+def snap(coords
+        ,xorigin
+        ,yorigin
+        ,xyscale):
+
+    # coords (N, 2) onto the grid with 1 / xyscale squares
+    origin = np.array([xorigin, yorigin])
+    return origin + np.round((coords - origin) * xyscale) / xyscale
+
+
+def audit_geometry(name
+                  ,geometry
+                  ,xorigin
+                  ,yorigin
+                  ,xyscale
+                  ,tolerance=None):
+
+    if tolerance is None:
+        tolerance = default_tolerance(xyscale)
+
+    coords = geometry.coords
+    snapped = snap(coords, xorigin, yorigin, xyscale)
+    shift = np.hypot(snapped[:, 0] - coords[:, 0]
+                    ,snapped[:, 1] - coords[:, 1])
+    # coordinates already on the new grid wobble by float noise only
+    moved = shift > 1e-6 / xyscale
+
+    # segments are consecutive vertices inside one part of a line or
+    # polygon, a multipoint decodes as one part of unrelated points
+    samepart = np.ones(max(len(coords) - 1, 0), dtype=bool)
+    partstarts = geometry.part_offsets[1:-1]
+    samepart[partstarts[(partstarts > 0) & (partstarts < len(coords))] - 1] = False
+    pointlike = np.isin(geometry.shapetypes & 0xFF
+                       ,list(gdbgeometry.POINT_TYPES | gdbgeometry.MULTIPOINT_TYPES))
+    vertexfeature = geometry.vertex_feature()[:-1]
+    samepart &= ~pointlike[vertexfeature]
+    segment = np.diff(snapped, axis=0)[samepart]
+    collapsed = np.hypot(segment[:, 0], segment[:, 1]) < tolerance
+
+    vertexfeature = vertexfeature[samepart]
+    collapsedoids = np.unique(geometry.objectids[vertexfeature[collapsed]])
+
+    return AuditResult(name
+                      ,len(geometry)
+                      ,len(coords)
+                      ,int(moved.sum())
+                      ,float(shift.max()) if len(shift) else 0.0
+                      ,float(shift[moved].mean()) if moved.any() else 0.0
+                      ,int(samepart.sum())
+                      ,int(collapsed.sum())
+                      ,collapsedoids.tolist()
+                      ,None)
+
+
+def _audit_partition(table
+                    ,start
+                    ,stop
+                    ,name
+                    ,xyscale
+                    ,tolerance):
+
+    # the grid origin stays the origin of the existing feature class
+    field = table.geometry_field
+    try:
+        geometry = gdbgeometry.decode_table(table, start, stop)
+    except NotImplementedError as e:
+        return AuditResult(name, 0, 0, 0, 0.0, 0.0, 0, 0, [], str(e))
+    return audit_geometry(name
+                         ,geometry
+                         ,field.xorigin
+                         ,field.yorigin
+                         ,xyscale
+                         ,tolerance)
+
+
+def _merge(name
+          ,results):
+
+    # one AuditResult from the results of objectid ranges
+    skipped = [result.skipped for result in results if result.skipped]
+    moved = sum(result.moved for result in results)
+    return AuditResult(name
+                      ,sum(result.features for result in results)
+                      ,sum(result.vertices for result in results)
+                      ,moved
+                      ,max(result.max_shift for result in results)
+                      ,sum(result.mean_shift * result.moved for result in results)
+                       / moved if moved else 0.0
+                      ,sum(result.segments for result in results)
+                      ,sum(result.collapsed for result in results)
+                      ,[objectid for result in results
+                        for objectid in result.collapsed_objectids]
+                      ,skipped[0] if skipped else None)
+
+
+def audit_table(name
+               ,gdbtablepath
+               ,xyscale
+               ,tolerance=None
+               ,workers=None):
+
+    # large tables are audited in objectid ranges in parallel
+    results = gdbscan.scan(gdbtablepath
+                          ,_audit_partition
+                          ,(name, xyscale, tolerance)
+                          ,workers=workers)
+    result = _merge(name, results)
+    if result.skipped:
+        with gdbtable.GDBTable(gdbtablepath) as table:
+            result = result._replace(features=len(table))
+    return result
+
+
+def audit_gdb(gdb
+             ,xyscale
+             ,tolerance=None
+             ,workers=None):
+
+    # one AuditResult per feature class in the geodatabase
+    results = []
+    for item in gdbcatalog.CatalogIndex.from_gdb(gdb).of_type('FeatureClass'):
+        results.append(audit_table(item.name
+                                  ,os.path.join(gdb, item.table + '.gdbtable')
+                                  ,xyscale
+                                  ,tolerance
+                                  ,workers))
+    return results
+
+
+def format_report(results):
+
+    lines = ['{0:<40} {1:>10} {2:>10} {3:>14} {4:>10}'.format(
+        'feature class', 'vertices', 'moved', 'max shift', 'collapsed')]
+    for result in results:
+        if result.skipped:
+            lines.append('{0:<40} skipped: {1}'.format(result.name
+                                                      ,result.skipped))
+            continue
+        lines.append('{0:<40} {1:>10} {2:>10} {3:>14.10f} {4:>10}'.format(
+            result.name
+           ,result.vertices
+           ,result.moved
+           ,result.max_shift
+           ,result.collapsed))
+    return '\n'.join(lines)
@@ -0,0 +1,273 @@
+import os
+import time
+import shutil
+import tempfile
+import openpyxl
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import filegeodatabase_manager
+import gdbbackend
+import gdbcatalog
+import relclass_plan
+import stream_loader
+import table_loader
+import tracing
+
+# copygeodatabase in shards, one process each
+#   every feature dataset is a shard, the classes outside any dataset
+#   are one more. A shard gets a copy of the workbook cut down to its
+#   own classes, its own empty gdb from that workbook, a cross reference
+#   and a LoadData (or a stream_load). The cross reference only maps classes the shard gdb
+#   has, so each LoadData reads its part of the source and no more
+#   meanwhile this process generates the final gdb from the whole
+#   workbook. Shard outputs are appended into it (table_loader, in
+#   parallel) and relationship classes are created last, their ends can
+#   sit in different shards. The tables of attributed relationship
+#   classes are loaded straight from the source after that
+
+Shard = namedtuple('Shard'
+                  ,['name'
+                   ,'dataset'
+                   ,'items'
+                   ,'size'])
+
+ShardResult = namedtuple('ShardResult'
+                        ,['name'
+                         ,'gdb'
+                         ,'rows'
+                         ,'seconds'
+                         ,'error'])
+
+STANDALONE = 'standalone'
+
+# sheets with these headers hold one row per object class or dataset
+_OBJECTCLASS_ID = 'objectclassid'
+_RELCLASS_SHEET = 'RelationshipClasses'
+
+
+def _size(gdb
+         ,item):
+
+    size = 0
+    if item.table is not None:
+        for extension in ('.gdbtable', '.gdbtablx'):
+            path = os.path.join(gdb, item.table + extension)
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+    return size
+
+
+def shards(gdbin
+          ,catalog=None):
+
+    # Shards of gdbin, largest first, no empty ones
+    catalog = catalog or gdbcatalog.CatalogIndex.from_gdb(gdbin)
+    groups = {}
+    for item in catalog.of_type('FeatureClass', 'Table'):
+        groups.setdefault(item.dataset, []).append(item)
+    result = []
+    for dataset, items in groups.items():
+        result.append(Shard(dataset or STANDALONE
+                           ,dataset
+                           ,sorted(item.name for item in items)
+                           ,sum(_size(gdbin, item) for item in items)))
+    return sorted(result, key=lambda shard: (-shard.size, shard.name))
+
+
+def _header(ws):
+
+    return [str(value).lower() if value is not None else None
+            for value in next(ws.iter_rows(max_row=1, values_only=True), ())]
+
+
+def _keep_rows(ws
+              ,keep):
+
+    # rewrite ws with the header and the rows keep(values) accepts
+    rows = [row for row in ws.iter_rows(min_row=2, values_only=True)
+            if any(value is not None for value in row) and keep(row)]
+    if ws.max_row > 1:
+        ws.delete_rows(2, ws.max_row - 1)
+    for row in rows:
+        ws.append(row)
+
+
+def split_workbook(xlsx
+                  ,shard
+                  ,output):
+
+    # a copy of xlsx with the object classes of shard, their rows in any
+    # sheet keyed on ObjectClassID, the shard dataset and no
+    # relationship classes
+    wb = openpyxl.load_workbook(xlsx)
+    names = {name.lower() for name in shard.items}
+
+    objectclasses = wb['ObjectClasses']
+    header = _header(objectclasses)
+    idcolumn = header.index('id')
+    namecolumn = header.index('name')
+    keep = set()
+    for row in objectclasses.iter_rows(min_row=2, values_only=True):
+        if row[namecolumn] is not None and str(row[namecolumn]).lower() in names:
+            keep.add(row[idcolumn])
+    _keep_rows(objectclasses
+              ,lambda row: row[idcolumn] in keep)
+
+    for ws in wb.worksheets:
+        header = _header(ws)
+        if ws.title != 'ObjectClasses' and _OBJECTCLASS_ID in header:
+            column = header.index(_OBJECTCLASS_ID)
+            _keep_rows(ws
+                      ,lambda row: row[column] in keep)
+
+    containers = wb['DatasetContainers']
+    namecolumn = _header(containers).index('name')
+    _keep_rows(containers
+              ,lambda row: shard.dataset is not None
+                           and row[namecolumn] == shard.dataset)
+
+    if _RELCLASS_SHEET in wb.sheetnames:
+        _keep_rows(wb[_RELCLASS_SHEET]
+                  ,lambda row: False)
+
+    wb.save(output)
+
+
+def _init_worker(scratchroot
+                ,backend):
+
+    # own scratch, the parent's backend, and the topographic license
+    # every process needs its own
+    scratch = os.path.join(scratchroot, 'worker{0}'.format(os.getpid()))
+    os.makedirs(scratch, exist_ok=True)
+    backend = gdbbackend.use(backend)
+    backend.set_workspace(scratch)
+    if backend.check_extension('Foundation'):
+        backend.check_out_extension('Foundation')
+
+
+def reproject_shard(xlsx
+                   ,gdbin
+                   ,shard
+                   ,workdir
+                   ,streaming=False):
+
+    # shard of gdbin into workdir\<shard>.gdb, a ShardResult
+    # streaming=True loads it with stream_loader instead of LoadData
+    start = time.perf_counter()
+    shardxlsx = os.path.join(workdir, shard.name + '.xlsx')
+    shardgdb = os.path.join(workdir, shard.name + '.gdb')
+    xref = os.path.join(workdir, shard.name + '_xref.gdb')
+    try:
+        split_workbook(xlsx, shard, shardxlsx)
+        backend = gdbbackend.get()
+        backend.generate_geodatabase_from_excel(shardxlsx, shardgdb)
+        backend.create_cross_reference_geodatabase(gdbin, shardgdb, xref)
+        if streaming:
+            failed = stream_loader.failures(
+                stream_loader.stream_load(xref, gdbin, shardgdb))
+            if failed:
+                raise RuntimeError('streaming load failed - {0}'.format(
+                    '; '.join('{0} {1}'.format(result.name, result.error)
+                              for result in failed)))
+        else:
+            backend.load_data(xref, gdbin, shardgdb)
+        rows, _ = filegeodatabase_manager.LocalGDB(shardgdb).size()
+        return ShardResult(shard.name
+                          ,shardgdb
+                          ,rows
+                          ,time.perf_counter() - start
+                          ,None)
+    except Exception as e:
+        return ShardResult(shard.name
+                          ,shardgdb
+                          ,None
+                          ,time.perf_counter() - start
+                          ,'{0}: {1}'.format(type(e).__name__, e))
+    finally:
+        shutil.rmtree(xref, ignore_errors=True)
+
+
+@tracing.traced('load')
+def copy_sharded(xlsx
+                ,gdbin
+                ,gdbout
+                ,shardlist=None
+                ,workers=None
+                ,streaming=False):
+
+    # create gdbout from xlsx and load it from gdbin shard by shard
+    # shardlist defaults to shards(gdbin), streaming=True streams each
+    # shard in (see reproject_shard). Returns the ShardResults,
+    # raises when a shard, a merge or a relationship class failed
+    shardlist = shards(gdbin) if shardlist is None else list(shardlist)
+    workdir = tempfile.mkdtemp(prefix='shard_loader'
+                              ,dir=os.path.dirname(os.path.abspath(gdbout)))
+    try:
+        with ProcessPoolExecutor(max_workers=workers
+                                ,initializer=_init_worker
+                                ,initargs=(os.path.join(workdir, 'scratch')
+                                          ,gdbbackend.get().name)) as pool:
+            futures = [pool.submit(reproject_shard, xlsx, gdbin, shard, workdir
+                                   ,streaming)
+                       for shard in shardlist]
+            with tracing.span('GenerateGeodatabaseFromExcel', 'tool'):
+                gdbbackend.get().generate_geodatabase_from_excel(xlsx, gdbout)
+            results = [future.result() for future in futures]
+
+        failed = [result for result in results if result.error is not None]
+        if failed:
+            raise RuntimeError('shards failed - {0}'.format(
+                '; '.join('{0} {1}'.format(result.name, result.error)
+                          for result in failed)))
+
+        with tracing.span('merge', 'load'):
+            items = {shard.name: shard.items for shard in shardlist}
+            tasks = []
+            for result in results:
+                tasks.extend(table_loader.schedule(result.gdb
+                                                  ,gdbout
+                                                  ,items[result.name]))
+            merged = table_loader.load_tables(sorted(tasks
+                                                    ,key=lambda task: (-task.size, task.name))
+                                             ,workers=workers)
+        failed = table_loader.failures(merged)
+        if failed:
+            raise RuntimeError('merge failed - {0}'.format(
+                ', '.join(result.name for result in failed)))
+
+        # one at a time, then the tables of the attributed ones, which
+        # are in no shard
+        plan = relclass_plan.Plan.build(gdbcatalog.CatalogIndex.from_gdb(gdbin))
+        relclass_plan.execute(plan
+                             ,gdbout)
+        with tracing.span('attributed relationship classes', 'load'):
+            attributed = table_loader.load_tables(table_loader.schedule(gdbin
+                                                                       ,gdbout
+                                                                       ,plan.attributed())
+                                                 ,workers=workers)
+        failed = table_loader.failures(attributed)
+        if failed:
+            raise RuntimeError('attributed relationship class load failed - {0}'.format(
+                ', '.join(result.name for result in failed)))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    tracing.count(rows=sum(result.rows for result in results)
+                 ,items=len(results))
+    return results
+
+
+def format_results(results):
+
+    lines = ['{0:<40} {1:>12} {2:>10}'.format('shard', 'rows', 'seconds')]
+    for result in results:
+        if result.error is not None:
+            lines.append('{0:<40} failed: {1}'.format(result.name, result.error))
+            continue
+        lines.append('{0:<40} {1:>12} {2:>10.1f}'.format(
+            result.name
+           ,result.rows
+           ,result.seconds))
+    return '\n'.join(lines)
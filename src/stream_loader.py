@@ -0,0 +1,357 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+import filegeodatabase_manager
+import gdbbackend
+import gdbcatalog
+import gdbgeometry
+import gdbtable
+import projection
+import resolution_audit
+import tracing
+
+# LoadData we can see into, one table at a time in three stages
+#   read       source rows in batches straight from the .gdbtable
+#   transform  fields mapped to the target (cross reference field map or
+#              same name), shapes reprojected when the spatial
+#              references differ and snapped to the target grid
+#   insert     batches through the backend inserter
+# stages are threads joined by queues of at most queue_size batches,
+# so no more than (2 x queue_size + 3) batches are in memory however big
+# the table. The source is memory mapped, the OS pages it in and out
+# progress logs rows and rows/sec every few seconds
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10000
+QUEUE_SIZE = 2
+
+Batch = namedtuple('Batch'
+                  ,['objectids'
+                   ,'rows'
+                   ,'geometry'])
+
+StreamResult = namedtuple('StreamResult'
+                         ,['name'
+                          ,'rows'
+                          ,'seconds'
+                          ,'error'])
+
+_DONE = object()
+
+
+class Progress(object):
+
+    def __init__(self
+                ,name
+                ,total
+                ,interval=5.0
+                ,report=None):
+
+        # report(name, rows, total, rows per second) defaults to a log line
+        self.name     = name
+        self.total    = total
+        self.interval = interval
+        self.report   = report or _log
+        self.rows     = 0
+        self.start    = time.perf_counter()
+        self._last    = self.start
+
+    def rate(self):
+
+        elapsed = time.perf_counter() - self.start
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def update(self
+              ,rows):
+
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.report(self.name, self.rows, self.total, self.rate())
+
+    def finish(self):
+        self.report(self.name, self.rows, self.total, self.rate())
+
+
+def _log(name
+        ,rows
+        ,total
+        ,rate):
+
+    logger.info('{0} {1}/{2} rows {3:.0f} rows/sec'.format(name, rows, total, rate))
+
+
+def _projector(sourcefield
+              ,targetfield):
+
+    # coords (N, 2) from the source to the target projection, None when
+    # they are the same
+    try:
+        return projection.between(sourcefield.wkt, targetfield.wkt)
+    except ValueError as e:
+        raise NotImplementedError('no streaming reprojection: {0}'.format(e))
+
+
+class Transform(object):
+
+    def __init__(self
+                ,source
+                ,target
+                ,fieldmap=None):
+
+        # source and target are gdbtable.GDBTables
+        # fieldmap is {target field: source field}, unmapped target
+        # fields match a source field of the same name
+        fieldmap = {name.lower(): value for name, value in (fieldmap or {}).items()}
+        sourcefields = {field.name.lower(): field for field in source.fields}
+        self.fields = [field for field in target.fields
+                       if field.type != gdbtable.FIELD_OBJECTID]
+
+        oid = [field.name for field in source.fields
+               if field.type == gdbtable.FIELD_OBJECTID][0]
+        self.columns = [oid]
+        self.positions = []
+        self.shape = None
+        for i, field in enumerate(self.fields):
+            if field.type == gdbtable.FIELD_GEOMETRY:
+                self.shape = i
+            name = fieldmap.get(field.name.lower(), field.name)
+            sourcefield = sourcefields.get(name.lower()) if name else None
+            if sourcefield is None:
+                if (name and field.name.lower() in fieldmap
+                or not field.nullable and field.type != gdbtable.FIELD_GEOMETRY):
+                    raise ValueError('no source for {0}'.format(field.name))
+                self.positions.append(None)
+                continue
+            if sourcefield.type != field.type:
+                raise ValueError('{0} is {1} in the source, {2} in the target'.format(
+                    field.name, sourcefield.typename, field.typename))
+            self.positions.append(len(self.columns))
+            self.columns.append(sourcefield.name)
+
+        self.sourceshape = source.geometry_field
+        self.targetshape = target.geometry_field
+        self.project = None
+        if self.shape is not None and self.positions[self.shape] is not None:
+            self.project = _projector(self.sourceshape, self.targetshape)
+
+    def __call__(self
+                ,rows):
+
+        # rows are tuples in columns order, a Batch in fields order
+        objectids = [row[0] for row in rows]
+        values = [tuple(None if position is None else row[position]
+                        for position in self.positions)
+                  for row in rows]
+
+        geometry = None
+        if self.shape is not None and self.positions[self.shape] is not None:
+            position = self.positions[self.shape]
+            geometry = gdbgeometry.decode([(row[0], row[position]) for row in rows]
+                                         ,self.sourceshape)
+            coords = geometry.coords
+            if self.project is not None and len(coords):
+                coords = self.project(coords)
+            if len(coords):
+                coords = resolution_audit.snap(coords
+                                              ,self.targetshape.xorigin
+                                              ,self.targetshape.yorigin
+                                              ,self.targetshape.xyscale)
+            geometry.coords = np.ascontiguousarray(coords)
+
+        return Batch(objectids, values, geometry)
+
+
+def read_batches(table
+                ,columns
+                ,batch_size=BATCH_SIZE):
+
+    # lists of row tuples, shapes and blobs copied out of the map
+    batch = []
+    for row in table.rows(columns):
+        batch.append(tuple(bytes(value) if isinstance(value, memoryview) else value
+                           for value in row))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _put(q
+        ,item
+        ,stop):
+
+    # a put that gives up once the other side stopped
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q
+        ,stop):
+
+    # a get that gives up once the other side stopped, as _DONE
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def _stage(work
+          ,outbox
+          ,stop):
+
+    # run work() feeding outbox, an exception travels down the queue
+    # on stop the generator is closed so its finally blocks run
+    items = work()
+    try:
+        for item in items:
+            if not _put(outbox, item, stop):
+                return
+        _put(outbox, _DONE, stop)
+    except BaseException as e:
+        _put(outbox, e, stop)
+    finally:
+        items.close()
+
+
+def stream_table(gdbin
+                ,sourcename
+                ,gdbout
+                ,targetname
+                ,fieldmap=None
+                ,batch_size=BATCH_SIZE
+                ,queue_size=QUEUE_SIZE
+                ,progress=None):
+
+    # rows of sourcename in gdbin into targetname in gdbout through
+    # gdbbackend.get().inserter, returns the rows inserted
+    source = filegeodatabase_manager.LocalGDB(gdbin).table(sourcename)
+    try:
+        with filegeodatabase_manager.LocalGDB(gdbout).table(targetname) as target:
+            transform = Transform(source, target, fieldmap)
+    except BaseException:
+        source.close()
+        raise
+    if progress is None:
+        progress = Progress(sourcename, len(source))
+
+    raw   = queue.Queue(queue_size)
+    ready = queue.Queue(queue_size)
+    stop  = threading.Event()
+
+    def read():
+        try:
+            for batch in read_batches(source, transform.columns, batch_size):
+                yield batch
+        finally:
+            source.close()
+
+    def transformed():
+        while True:
+            item = _get(raw, stop)
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield transform(item)
+
+    threads = [threading.Thread(target=_stage, args=(read, raw, stop), daemon=True)
+              ,threading.Thread(target=_stage, args=(transformed, ready, stop), daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    catalog = gdbcatalog.CatalogIndex.from_gdb(gdbout)
+    try:
+        inserter = gdbbackend.get().inserter(
+            os.path.join(catalog.container(gdbout, targetname)
+                        ,catalog.get(targetname).name)
+           ,transform.fields)
+        try:
+            while True:
+                item = _get(ready, stop)
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                inserter.insert(item.rows, item.geometry)
+                progress.update(len(item.rows))
+        finally:
+            inserter.close()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    progress.finish()
+    return progress.rows
+
+
+@tracing.traced('load')
+def stream_load(xref
+               ,gdbin
+               ,gdbout
+               ,batch_size=BATCH_SIZE
+               ,queue_size=QUEUE_SIZE
+               ,report=None):
+
+    # LoadData(xref, gdbin, gdbout) a table at a time, a StreamResult each
+    # report(name, rows, total, rows per second) replaces the log lines
+    mapping = gdbbackend.get().cross_reference(xref)
+    results = []
+    for name in sorted(mapping):
+        targetname, fieldmap = mapping[name]
+        start = time.perf_counter()
+        try:
+            with filegeodatabase_manager.LocalGDB(gdbin).table(name) as table:
+                total = len(table)
+            with tracing.span(name, 'load'):
+                rows = stream_table(gdbin
+                                   ,name
+                                   ,gdbout
+                                   ,targetname
+                                   ,fieldmap
+                                   ,batch_size
+                                   ,queue_size
+                                   ,Progress(name, total, report=report))
+            results.append(StreamResult(name, rows, time.perf_counter() - start, None))
+        except Exception as e:
+            results.append(StreamResult(name
+                                       ,None
+                                       ,time.perf_counter() - start
+                                       ,'{0}: {1}'.format(type(e).__name__, e)))
+    tracing.count(rows=sum(result.rows or 0 for result in results)
+                 ,items=len(results))
+    return results
+
+
+def failures(results):
+    return [result for result in results if result.error is not None]
+
+
+def format_results(results):
+
+    lines = ['{0:<40} {1:>12} {2:>10}'.format('table', 'rows', 'seconds')]
+    for result in results:
+        if result.error is not None:
+            lines.append('{0:<40} failed: {1}'.format(result.name, result.error))
+            continue
+        lines.append('{0:<40} {1:>12} {2:>10.1f}'.format(
+            result.name
+           ,result.rows
+           ,result.seconds))
+    return '\n'.join(lines)
@@ -0,0 +1,154 @@
+import os
+import time
+import shutil
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import gdbbackend
+import gdbcatalog
+import tracing
+
+# load independent tables from one geodatabase into another in parallel
+# each worker is its own process (arcpy is not thread safe) with its
+# own scratch workspace. Biggest source tables start first so the long
+# ones do not run alone at the end. Every table is truncated, appended
+# and counted, failures retry before they are reported
+
+LoadTask = namedtuple('LoadTask'
+                     ,['name'
+                      ,'source'
+                      ,'target'
+                      ,'size'])
+
+LoadResult = namedtuple('LoadResult'
+                       ,['name'
+                        ,'rows'
+                        ,'seconds'
+                        ,'attempts'
+                        ,'error'])
+
+
+def schedule(gdbin
+            ,gdbout
+            ,names):
+
+    # LoadTasks for names, largest .gdbtable + .gdbtablx first
+    catalog = gdbcatalog.CatalogIndex.from_gdb(gdbin)
+    tasks = []
+    for name in names:
+        item = catalog.get(name)
+        size = 0
+        if item.table is not None:
+            for extension in ('.gdbtable', '.gdbtablx'):
+                path = os.path.join(gdbin, item.table + extension)
+                if os.path.exists(path):
+                    size += os.path.getsize(path)
+        tasks.append(LoadTask(item.name
+                             ,os.path.join(catalog.container(gdbin, name)
+                                          ,item.name)
+                             ,os.path.join(catalog.container(gdbout, name)
+                                          ,item.name)
+                             ,size))
+    return sorted(tasks, key=lambda task: (-task.size, task.name))
+
+
+def _init_worker(scratchroot
+                ,backend):
+
+    # per process scratch so tools in different workers never share
+    # and the same backend as the parent, whatever the environment says
+    scratch = os.path.join(scratchroot, 'worker{0}'.format(os.getpid()))
+    os.makedirs(scratch, exist_ok=True)
+    gdbbackend.use(backend).set_workspace(scratch)
+
+
+def load_table(task
+              ,retries=2
+              ,backoff=1.0):
+
+    # truncate, append and count one table
+    # an error is retried after backoff, 2 x backoff, ... seconds
+    start = time.perf_counter()
+    error = None
+    for attempt in range(1, retries + 2):
+        try:
+            backend = gdbbackend.get()
+            backend.truncate_table(task.target)
+            backend.append(task.source
+                          ,task.target
+                          ,schema_type="TEST")
+            rows = backend.get_count(task.target)
+            return LoadResult(task.name
+                             ,rows
+                             ,time.perf_counter() - start
+                             ,attempt
+                             ,None)
+        except Exception as e:
+            error = '{0}: {1}'.format(type(e).__name__, e)
+            if attempt <= retries:
+                time.sleep(backoff * attempt)
+
+    return LoadResult(task.name
+                     ,None
+                     ,time.perf_counter() - start
+                     ,retries + 1
+                     ,error)
+
+
+@tracing.traced('load')
+def load_tables(tasks
+               ,workers=None
+               ,retries=2
+               ,backoff=1.0):
+
+    # LoadResults in the order of tasks, failures are in the results
+    # workers=1 loads in this process, no pool
+    tasks = list(tasks)
+    if not tasks:
+        return []
+
+    if workers == 1:
+        results = [load_table(task, retries, backoff) for task in tasks]
+    else:
+        scratchroot = tempfile.mkdtemp(prefix='table_loader')
+        try:
+            with ProcessPoolExecutor(max_workers=workers
+                                    ,initializer=_init_worker
+                                    ,initargs=(scratchroot
+                                              ,gdbbackend.get().name)) as pool:
+                futures = [pool.submit(load_table, task, retries, backoff)
+                           for task in tasks]
+                results = [future.result() for future in futures]
+        finally:
+            shutil.rmtree(scratchroot, ignore_errors=True)
+
+    tracing.count(rows=sum(result.rows or 0 for result in results)
+                 ,items=len(results))
+    return results
+
+
+def failures(results):
+
+    return [result for result in results if result.error is not None]
+
+
+def format_results(results):
+
+    lines = ['{0:<40} {1:>12} {2:>10} {3:>8}'.format(
+        'table', 'rows', 'seconds', 'attempts')]
+    for result in results:
+        if result.error is not None:
+            lines.append('{0:<40} failed after {1} attempts: {2}'.format(
+                result.name, result.attempts, result.error))
+            continue
+        lines.append('{0:<40} {1:>12} {2:>10.1f} {3:>8}'.format(
+            result.name
+           ,result.rows
+           ,result.seconds
+           ,result.attempts))
+    lines.append('{0:<40} {1:>12} {2:>10.1f}'.format(
+        'total'
+       ,sum(result.rows or 0 for result in results)
+       ,sum(result.seconds for result in results)))
+    return '\n'.join(lines)
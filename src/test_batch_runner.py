@@ -0,0 +1,82 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+
+import batch_runner
+import gdbbackend
+
+class BatchRunnerTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.samplegdb = os.path.join(self.testdatadir
+                                     ,'sample.gdb')
+
+    def setUp(self):
+
+        self.previous = gdbbackend._current
+        gdbbackend.use('local')
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+
+        gdbbackend._current = self.previous
+        shutil.rmtree(self.tempdir)
+
+    def test_apool(self):
+
+        pool = batch_runner.LicensePool(2)
+        seats = [pool.acquire(), pool.acquire()]
+        self.assertEqual(sorted(seats), [0, 1])
+        self.assertIsNone(pool.acquire(timeout=0))
+        pool.release(seats[0])
+        self.assertEqual(pool.available(), 1)
+        self.assertEqual(pool.acquire(timeout=0), seats[0])
+        with self.assertRaises(ValueError):
+            batch_runner.LicensePool(0)
+
+    def test_bbatch(self):
+
+        # three geodatabases, two licenses, never more than two at once
+        jobsfile = os.path.join(self.tempdir, 'jobs.json')
+        with open(jobsfile, 'w') as f:
+            json.dump([{'name': name
+                       ,'gdbin': self.samplegdb
+                       ,'gdbout': os.path.join(self.tempdir, name + '.gdb')
+                       ,'srid': 6539}
+                       for name in ('dev', 'stg', 'prd')], f)
+        jobs = batch_runner.load_jobs(jobsfile)
+        self.assertEqual(jobs[0].workdir, os.path.join(self.tempdir, 'dev.work'))
+
+        results = batch_runner.run_batch(jobs
+                                        ,batch_runner.LicensePool(2))
+        self.assertEqual(batch_runner.failures(results), [])
+        self.assertEqual(sorted(result.name for result in results)
+                        ,['dev', 'prd', 'stg'])
+        events = []
+        for result in results:
+            self.assertTrue(os.path.isdir(os.path.join(self.tempdir
+                                                      ,result.name + '.gdb')))
+            events.extend([(result.started, 1), (result.finished, -1)])
+            # overlapping jobs hold different seats
+            for other in results:
+                if (other is not result
+                and other.started < result.finished
+                and result.started < other.finished):
+                    self.assertNotEqual(other.seat, result.seat)
+        running = []
+        for _, change in sorted(events, key=lambda event: (event[0], event[1])):
+            running.append((running[-1] if running else 0) + change)
+        self.assertLessEqual(max(running), 2)
+
+        with self.assertRaises(ValueError):
+            batch_runner.run_batch(jobs + jobs[:1]
+                                  ,batch_runner.LicensePool(1))
+
+if __name__ == '__main__':
+    unittest.main()
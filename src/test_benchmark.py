@@ -0,0 +1,50 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import benchmark
+import gdbtable
+
+class BenchmarkTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.tempdir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(self):
+
+        shutil.rmtree(self.tempdir)
+
+    def test_asynthesize(self):
+
+        gdb = os.path.join(self.tempdir, 'synthetic.gdb')
+        # nybb 5, neighborhooddata 5
+        self.assertEqual(benchmark.synthesize(benchmark._SAMPLE, gdb, 3), 30)
+        with gdbtable.GDBTable(gdbtable.table_path(gdb, 9)) as nybb:
+            self.assertEqual(len(nybb), 15)
+            names = [row[0] for row in nybb.rows(['BoroName'])]
+        self.assertEqual(names[:5], names[10:])
+
+    def test_bregressions(self):
+
+        def result(stage, seconds):
+            return {'stage': stage, 'size': 8, 'backend': 'local'
+                   ,'seconds': seconds}
+
+        baseline = [result('audit', 1.0), result('audit', 2.0)
+                   ,result('copy', 0.01)]
+        # 2x slower on a tiny stage is noise, 1.5x on audit is not
+        self.assertEqual(benchmark.regressions([result('audit', 1.5)
+                                               ,result('copy', 0.02)
+                                               ,result('clean', 9.0)]
+                                              ,baseline)
+                        ,[('audit', 8, 1.0, 1.5)])
+        self.assertEqual(benchmark.regressions([result('audit', 1.1)]
+                                              ,baseline)
+                        ,[])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import content_verifier
+import filegeodatabase_manager
+import gdbbackend
+import gdbgeometry
+import gdbtable
+import xlsx_manager
+
+class ContentVerifierTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.samplegdb = os.path.join(self.testdatadir
+                                     ,'sample.gdb')
+
+    def setUp(self):
+
+        # sample.gdb reprojected to 6539 on the local backend
+        self.previous = gdbbackend._current
+        gdbbackend.use('local')
+        self.tempdir = tempfile.mkdtemp()
+        self.gdbout = os.path.join(self.tempdir, 'out.gdb')
+        xlsx = xlsx_manager.ExcelFile(os.path.join(self.tempdir, 'out.xlsx'))
+        xlsx.generate_from_geodatabase(self.samplegdb)
+        xlsx.update_all_spatial_reference(6539)
+        xlsx.copygeodatabase(self.samplegdb
+                            ,self.gdbout)
+
+    def tearDown(self):
+
+        gdbbackend._current = self.previous
+        shutil.rmtree(self.tempdir)
+
+    def rewrite(self
+               ,name
+               ,change):
+
+        # rewrite the rows of name in gdbout, change(objectid, values)
+        # returns the new values or None to drop the row
+        path = filegeodatabase_manager.LocalGDB(self.gdbout).tablepath(name)
+        with gdbtable.GDBTable(path) as table:
+            section = bytes(table.field_section())
+            fields = table.fields
+            version = table.header.version
+            utf8 = table.header.utf8
+            rows = []
+            for objectid in table.objectids():
+                values = [bytes(value) if isinstance(value, memoryview) else value
+                          for field, value in zip(fields, table.row(objectid))
+                          if field.type != gdbtable.FIELD_OBJECTID]
+                values = change(objectid, values)
+                if values is not None:
+                    rows.append((objectid, gdbtable.encode_row(fields, values, utf8)))
+        gdbtable.write_table(path, section, rows, version)
+
+    def test_averify(self):
+
+        results = content_verifier.verify(self.samplegdb
+                                         ,self.gdbout
+                                         ,workers=2
+                                         ,parts=2
+                                         ,min_rows=1)
+        self.assertEqual([result.name for result in results]
+                        ,['NEIGHBORHOODS', 'neighborhooddata', 'nybb'])
+        self.assertEqual(content_verifier.failures(results), [])
+        for result in results:
+            self.assertEqual(result.source_digest, result.target_digest)
+            self.assertEqual(result.source_rows, result.target_rows)
+
+    def test_battributes(self):
+
+        # same count, one borough renamed and one row gone from the other
+        with gdbtable.GDBTable(filegeodatabase_manager.LocalGDB(self.gdbout)
+                               .tablepath('nybb')) as table:
+            boroname = [field.name for field in table.fields
+                        if field.type != gdbtable.FIELD_OBJECTID].index('BoroName')
+
+        def rename(objectid, values):
+            if objectid == 3:
+                values[boroname] = 'Kings'
+            return values
+
+        self.rewrite('nybb', rename)
+        self.rewrite('neighborhooddata'
+                    ,lambda objectid, values: None if objectid == 1 else values)
+        results = {result.name: result
+                   for result in content_verifier.verify(self.samplegdb
+                                                        ,self.gdbout
+                                                        ,['nybb', 'neighborhooddata']
+                                                        ,workers=2)}
+        self.assertEqual(results['nybb'].source_rows, results['nybb'].target_rows)
+        self.assertNotEqual(results['nybb'].source_digest, results['nybb'].target_digest)
+        self.assertEqual(results['nybb'].missing, [3])
+        self.assertEqual(results['nybb'].unexpected, [3])
+        self.assertEqual(results['neighborhooddata'].missing, [1])
+        self.assertEqual(results['neighborhooddata'].unexpected, [])
+        self.assertEqual(len(content_verifier.failures(results.values())), 2)
+        report = content_verifier.format_results(sorted(results.values()))
+        self.assertIn('not in target, source OBJECTIDs 3', report)
+
+    def test_cgeometry(self):
+
+        # a shape moved by a grid cell is still the same shape, one moved
+        # past the XY tolerance is caught, not with geometry=False
+        with gdbtable.GDBTable(filegeodatabase_manager.LocalGDB(self.gdbout)
+                               .tablepath('nybb')) as table:
+            fields = [field for field in table.fields
+                      if field.type != gdbtable.FIELD_OBJECTID]
+        shape = [i for i, field in enumerate(fields)
+                 if field.type == gdbtable.FIELD_GEOMETRY][0]
+        cell = 1.0 / fields[shape].xyscale
+        tolerance = content_verifier.tolerance(fields[shape])
+        self.assertGreaterEqual(tolerance, cell)
+
+        def mover(offsets):
+            def move(objectid, values):
+                if objectid in offsets:
+                    geometry = gdbgeometry.decode([(objectid, values[shape])]
+                                                 ,fields[shape])
+                    geometry.coords = geometry.coords + offsets[objectid]
+                    values[shape] = gdbgeometry.encode(geometry, fields[shape])[0]
+                return values
+            return move
+
+        self.rewrite('nybb', mover({4: cell}))
+        result = content_verifier.verify(self.samplegdb
+                                        ,self.gdbout
+                                        ,['nybb'])[0]
+        self.assertEqual((result.missing, result.unexpected), ([], []))
+
+        self.rewrite('nybb', mover({5: 10 * tolerance}))
+        result = content_verifier.verify(self.samplegdb
+                                        ,self.gdbout
+                                        ,['nybb']
+                                        ,min_rows=1)[0]
+        self.assertEqual((result.missing, result.unexpected), ([5], [5]))
+        result = content_verifier.verify(self.samplegdb
+                                        ,self.gdbout
+                                        ,['nybb']
+                                        ,geometry=False)[0]
+        self.assertEqual(content_verifier.failures([result]), [])
+
+    def test_derrors(self):
+
+        # a table that cannot be read is not a mismatch
+        results = content_verifier.verify(self.samplegdb
+                                         ,self.gdbout
+                                         ,['nybb', 'missing'])
+        self.assertEqual(content_verifier.failures(results), [])
+        self.assertEqual([result.name for result in content_verifier.errors(results)]
+                        ,['missing'])
+        self.assertIn('not verified', content_verifier.format_results(results))
+
+if __name__ == '__main__':
+    unittest.main()
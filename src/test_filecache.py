@@ -0,0 +1,88 @@
+import unittest
+import os
+import time
+import shutil
+import tempfile
+
+import filecache
+
+class FileCacheTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.tempdir = tempfile.mkdtemp()
+
+    def setUp(self):
+
+        self.cachedir = os.path.join(self.tempdir, 'cache')
+        self.source   = os.path.join(self.tempdir, 'source.xlsx')
+        with open(self.source, 'wb') as f:
+            f.write(b'x' * 100)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    @classmethod
+    def tearDownClass(self):
+
+        shutil.rmtree(self.tempdir)
+
+    def age(self
+           ,path
+           ,seconds):
+
+        past = time.time() - seconds
+        os.utime(path, (past, past))
+
+    def test_aputget(self):
+
+        cache = filecache.FileCache(self.cachedir)
+        self.assertIsNone(cache.get('abc', '.xlsx'))
+        cache.put('abc', self.source, '.xlsx')
+        cached = cache.get('abc', '.xlsx')
+        with open(cached, 'rb') as f:
+            self.assertEqual(f.read(), b'x' * 100)
+        self.assertEqual(cache.size(), 100)
+
+    def test_bdirectory(self):
+
+        # a .gdb is a directory
+        cache = filecache.FileCache(self.cachedir)
+        gdb = os.path.join(self.tempdir, 'a.gdb')
+        os.makedirs(gdb, exist_ok=True)
+        shutil.copyfile(self.source, os.path.join(gdb, 'a00000001.gdbtable'))
+        cache.put('abc', gdb, '.gdb')
+        self.assertTrue(os.path.isfile(os.path.join(cache.get('abc', '.gdb')
+                                                   ,'a00000001.gdbtable')))
+        # a second put of the same key keeps the first
+        cache.put('abc', gdb, '.gdb')
+        self.assertEqual(cache.size(), 100)
+        shutil.rmtree(gdb)
+
+    def test_cage(self):
+
+        cache = filecache.FileCache(self.cachedir
+                                   ,max_age=60)
+        self.age(cache.put('old', self.source), 120)
+        cache.put('new', self.source)
+        self.assertIsNone(cache.get('old'))
+        self.assertIsNotNone(cache.get('new'))
+        self.assertEqual(os.listdir(self.cachedir), ['new'])
+
+    def test_dsize(self):
+
+        # least recently used goes first
+        cache = filecache.FileCache(self.cachedir
+                                   ,max_bytes=250)
+        self.age(cache.put('a', self.source), 30)
+        self.age(cache.put('b', self.source), 20)
+        # a hit makes a the most recent use
+        cache.get('a')
+        cache.put('c', self.source)
+        self.assertEqual(sorted(os.listdir(self.cachedir)), ['a', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
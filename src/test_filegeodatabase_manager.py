@@ -1,9 +1,12 @@
 import unittest
 import os
 from pathlib import Path
+import shutil
 import tempfile
 
 import filegeodatabase_manager
+import gdbbackend
+import gdbtrash
 
 class FileGeodatabaseTestCase(unittest.TestCase):
 
@@ -46,8 +49,9 @@ class FileGeodatabaseTestCase(unittest.TestCase):
 
     def test_cclean(self):
 
+        # the slow way, Compact and delete before returning
         self.testgdb.create()
-        self.testgdb.clean()
+        self.assertIsNone(self.testgdb.clean(fast=False))
         self.assertFalse(self.testgdb.exists())
 
     def test_dcopy(self):
@@ -58,5 +62,67 @@ class FileGeodatabaseTestCase(unittest.TestCase):
         self.tempgdb.clean()
         self.testgdb.clean()
 
+    def test_etable(self):
+
+        samplegdb = filegeodatabase_manager.LocalGDB(
+            os.path.join(self.testdatadir
+                        ,'sample.gdb'))
+        self.assertTrue(samplegdb.tablepath('NYBB').endswith('a00000009.gdbtable'))
+        self.assertEqual(samplegdb.count('nybb'), 5)
+        with samplegdb.table('nybb') as nybb:
+            self.assertEqual(nybb.fields[3].name, 'BoroName')
+            self.assertEqual(next(nybb.rows(['BoroName'])), ('Bronx',))
+        self.assertEqual(samplegdb.geometries('nybb').coords.shape, (75497, 2))
+
+    @unittest.skipUnless(gdbbackend.get().name == 'arcpy'
+                        ,'needs arcpy cursors to hold locks')
+    def test_fcopyskipslocks(self):
+
+        import arcpy
+
+        # the open geodatabase holds locks, the copy does not
+        self.testgdb.create()
+        arcpy.management.CreateTable(self.testgdb.gdb
+                                    ,'locked')
+        cursor = arcpy.da.SearchCursor(os.path.join(self.testgdb.gdb
+                                                   ,'locked')
+                                      ,['OID@'])
+        result = self.testgdb.copy(self.tempgdb.gdb)
+        del cursor
+        self.assertFalse(self.tempgdb.has_locks())
+        self.assertEqual(sum(result.methods.values()), result.files)
+
+    def test_gfastclean(self):
+
+        # in a temp dir of its own, the trash goes beside the gdb
+        gdbdir = tempfile.mkdtemp()
+        try:
+            fastgdb = filegeodatabase_manager.LocalGDB(os.path.join(gdbdir
+                                                                   ,'fastsample.gdb'))
+            fastgdb.create()
+            future = fastgdb.clean()
+            self.assertFalse(fastgdb.exists())
+            future.result(timeout=60)
+            self.assertFalse(os.path.exists(gdbtrash.trash_dir(fastgdb.gdb)))
+        finally:
+            shutil.rmtree(gdbdir)
+
+    @unittest.skipUnless(gdbbackend.get().name == 'arcpy'
+                        ,'needs arcpy cursors to hold locks')
+    def test_hwaitunlocked(self):
+
+        import arcpy
+
+        self.testgdb.create()
+        arcpy.management.CreateTable(self.testgdb.gdb
+                                    ,'locked')
+        cursor = arcpy.da.SearchCursor(os.path.join(self.testgdb.gdb
+                                                   ,'locked')
+                                      ,['OID@'])
+        self.assertTrue(self.testgdb.locks())
+        self.assertFalse(self.testgdb.wait_until_unlocked(timeout=0.5))
+        del cursor
+        self.assertTrue(self.testgdb.wait_until_unlocked(timeout=30))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,128 @@
+import unittest
+import os
+import shutil
+import tempfile
+import openpyxl
+import numpy as np
+
+import gdbbackend
+import gdbcatalog
+import gdbgeometry
+import gdbtable
+
+class GDBBackendTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.samplegdb = os.path.join(self.testdatadir
+                                     ,'sample.gdb')
+        self.backend = gdbbackend.LocalBackend()
+
+    def setUp(self):
+
+        self.tempdir = tempfile.mkdtemp()
+        self.xlsx = os.path.join(self.tempdir, 'sample.xlsx')
+        self.outgdb = os.path.join(self.tempdir, 'out.gdb')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tempdir)
+
+    def generate(self
+                ,xyscale=None):
+
+        # empty copy of sample.gdb through the workbook
+        self.backend.generate_excel_from_geodatabase(self.samplegdb
+                                                    ,self.xlsx)
+        if xyscale is not None:
+            wb = openpyxl.load_workbook(self.xlsx)
+            wb['SpatialReferences']['K2'] = str(xyscale)
+            wb.save(self.xlsx)
+        self.backend.generate_geodatabase_from_excel(self.xlsx
+                                                    ,self.outgdb)
+
+    def test_acreate(self):
+
+        self.backend.create_file_gdb(self.tempdir, 'empty.gdb')
+        gdb = os.path.join(self.tempdir, 'empty.gdb')
+        self.assertTrue(self.backend.exists(gdb))
+        self.assertFalse(self.backend.exists(os.path.join(gdb, 'nybb')))
+        catalog = gdbcatalog.CatalogIndex.from_gdb(gdb)
+        self.assertEqual(catalog.of_type('FeatureClass', 'Table'), [])
+
+    def test_bgenerate(self):
+
+        self.generate(xyscale=1000)
+        nybb = os.path.join(self.outgdb, 'nybb')
+        self.assertTrue(self.backend.exists(nybb))
+        self.assertEqual(self.backend.get_count(nybb), 0)
+        with gdbtable.GDBTable(gdbtable.table_path(self.outgdb, 9)) as table:
+            self.assertEqual(table.geometry_field.xyscale, 1000)
+
+    def test_cloaddata(self):
+
+        # geometry lands on the target resolution
+        self.generate(xyscale=1000)
+        xref = os.path.join(self.tempdir, 'xref')
+        self.backend.create_cross_reference_geodatabase(self.samplegdb
+                                                       ,self.outgdb
+                                                       ,xref)
+        self.backend.load_data(xref, self.samplegdb, self.outgdb)
+        self.assertEqual(self.backend.get_count(os.path.join(self.outgdb, 'nybb')), 5)
+        with gdbtable.GDBTable(gdbtable.table_path(self.samplegdb, 9)) as source, \
+             gdbtable.GDBTable(gdbtable.table_path(self.outgdb, 9)) as target:
+            self.assertEqual(list(source.rows(['BoroName']))
+                            ,list(target.rows(['BoroName'])))
+            before = gdbgeometry.decode_table(source)
+            after = gdbgeometry.decode_table(target)
+        self.assertEqual(before.coords.shape, after.coords.shape)
+        self.assertLess(np.abs(before.coords - after.coords).max()
+                       ,1.0 / 1000)
+
+    def test_dtruncateappend(self):
+
+        self.generate()
+        nybb = os.path.join(self.outgdb, 'nybb')
+        self.backend.append(os.path.join(self.samplegdb, 'nybb'), nybb)
+        self.backend.append(os.path.join(self.samplegdb, 'nybb'), nybb)
+        self.assertEqual(self.backend.get_count(nybb), 10)
+        self.backend.compact(self.outgdb)
+        self.assertEqual(self.backend.get_count(nybb), 10)
+        self.backend.truncate_table(nybb)
+        self.assertEqual(self.backend.get_count(nybb), 0)
+        with self.assertRaises(RuntimeError):
+            self.backend.append(os.path.join(self.samplegdb, 'neighborhooddata')
+                               ,nybb)
+
+    def test_erelationshipclass(self):
+
+        self.generate()
+        relclass = os.path.join(self.outgdb, 'nybb_neighborhooddata')
+        self.backend.create_relationship_class(
+            origin_table=os.path.join(self.outgdb, 'nybb')
+           ,destination_table=os.path.join(self.outgdb, 'neighborhooddata')
+           ,out_relationship_class=relclass
+           ,relationship_type='SIMPLE')
+        self.assertTrue(self.backend.exists(relclass))
+        with self.assertRaises(ValueError):
+            self.backend.create_relationship_class(
+                origin_table=os.path.join(self.outgdb, 'nope')
+               ,destination_table=os.path.join(self.outgdb, 'nybb')
+               ,out_relationship_class=relclass)
+
+    def test_fuse(self):
+
+        previous = gdbbackend._current
+        try:
+            self.assertEqual(gdbbackend.use('local').name, 'local')
+            self.assertIs(gdbbackend.get(), gdbbackend._current)
+            with self.assertRaises(ValueError):
+                gdbbackend.use('bogus')
+        finally:
+            gdbbackend._current = previous
+
+if __name__ == '__main__':
+    unittest.main()
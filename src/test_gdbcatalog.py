@@ -0,0 +1,117 @@
+import unittest
+import os
+from pathlib import Path
+import tempfile
+
+import gdbcatalog
+
+RELCLASS_XML = (
+    "<DERelationshipClassInfo xsi:type='typens:DERelationshipClassInfo' "
+    "xmlns:xsi='http://www.w3.org/2001/XMLSchema-instance' "
+    "xmlns:typens='http://www.esri.com/schemas/ArcGIS/10.8'>"
+    "<CatalogPath>\\Boroughs\\nybb_neighborhooddata</CatalogPath>"
+    "<Name>nybb_neighborhooddata</Name>"
+    "<DatasetType>esriDTRelationshipClass</DatasetType>"
+    "<Cardinality>esriRelCardinalityOneToMany</Cardinality>"
+    "<Notification>esriRelNotificationForward</Notification>"
+    "<IsAttributed>false</IsAttributed>"
+    "<IsComposite>true</IsComposite>"
+    "<OriginClassNames xsi:type='typens:Names'><Name>nybb</Name></OriginClassNames>"
+    "<DestinationClassNames xsi:type='typens:Names'><Name>neighborhooddata</Name></DestinationClassNames>"
+    "<ForwardPathLabel>neighborhoods</ForwardPathLabel>"
+    "<BackwardPathLabel>borough</BackwardPathLabel>"
+    "<OriginClassKeys xsi:type='typens:ArrayOfRelationshipClassKey'>"
+    "<RelationshipClassKey xsi:type='typens:RelationshipClassKey'>"
+    "<ObjectKeyName>BoroCode</ObjectKeyName><ClassKeyName></ClassKeyName>"
+    "<KeyRole>esriRelKeyRoleOriginPrimary</KeyRole></RelationshipClassKey>"
+    "<RelationshipClassKey xsi:type='typens:RelationshipClassKey'>"
+    "<ObjectKeyName>BOROCODE</ObjectKeyName><ClassKeyName></ClassKeyName>"
+    "<KeyRole>esriRelKeyRoleOriginForeign</KeyRole></RelationshipClassKey>"
+    "</OriginClassKeys>"
+    "<DestinationClassKeys xsi:type='typens:ArrayOfRelationshipClassKey'>"
+    "</DestinationClassKeys>"
+    "</DERelationshipClassInfo>")
+
+class GDBCatalogTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.tempdir = Path(tempfile.gettempdir())
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.sourcepath = os.path.join(self.testdatadir
+                                      ,'sample.gdb')
+        self.cachepath = os.path.join(self.tempdir
+                                     ,'samplecatalog.json')
+        self.catalog = gdbcatalog.CatalogIndex.from_gdb(self.sourcepath)
+
+    def tearDown(self):
+
+        if os.path.exists(self.cachepath):
+            os.remove(self.cachepath)
+
+    def test_aitems(self):
+
+        nybb = self.catalog.get('NYBB')
+        self.assertEqual(nybb.type, 'FeatureClass')
+        self.assertEqual(nybb.table, 'a00000009')
+        self.assertIsNone(nybb.dataset)
+        self.assertEqual(self.catalog.get('neighborhooddata').table
+                        ,'a0000000c')
+        self.assertEqual(self.catalog.counts()['Table'], 2)
+
+    def test_bcontainer(self):
+
+        self.assertEqual(self.catalog.container(self.sourcepath, 'nybb')
+                        ,self.sourcepath)
+        with self.assertRaises(KeyError):
+            self.catalog.get('bogus')
+
+    def test_crelclass(self):
+
+        relclass = gdbcatalog.parse_relclass(RELCLASS_XML)
+        self.assertEqual(relclass.origin, ['nybb'])
+        self.assertEqual(relclass.destination, ['neighborhooddata'])
+        self.assertEqual(relclass.cardinality, 'ONE_TO_MANY')
+        self.assertEqual(relclass.notification, 'FORWARD')
+        self.assertTrue(relclass.composite)
+        self.assertFalse(relclass.attributed)
+        self.assertEqual(relclass.origin_primary, 'BoroCode')
+        self.assertEqual(relclass.origin_foreign, 'BOROCODE')
+        self.assertIsNone(relclass.destination_primary)
+
+    def test_erelclassarguments(self):
+
+        catalog = gdbcatalog.CatalogIndex(
+            list(self.catalog)
+            + [gdbcatalog.CatalogItem('nybb_neighborhooddata'
+                                     ,'RelationshipClass'
+                                     ,'Boroughs'
+                                     ,'\\Boroughs\\nybb_neighborhooddata'
+                                     ,'nybb_neighborhooddata'
+                                     ,None
+                                     ,gdbcatalog.parse_relclass(RELCLASS_XML))])
+        arguments = catalog.relclass_arguments(self.sourcepath
+                                              ,'nybb_neighborhooddata')
+        self.assertEqual(arguments['origin_table']
+                        ,os.path.join(self.sourcepath, 'nybb'))
+        self.assertEqual(arguments['out_relationship_class']
+                        ,os.path.join(self.sourcepath
+                                     ,'Boroughs'
+                                     ,'nybb_neighborhooddata'))
+        self.assertEqual(arguments['relationship_type'], 'COMPOSITE')
+        self.assertEqual(arguments['message_direction'], 'FORWARD')
+        self.assertEqual(arguments['attributed'], 'NONE')
+        with self.assertRaises(ValueError):
+            catalog.relclass_arguments(self.sourcepath, 'nybb')
+
+    def test_dsaveandload(self):
+
+        self.catalog.save(self.cachepath)
+        cached = gdbcatalog.CatalogIndex.load(self.cachepath)
+        self.assertEqual(len(cached), len(self.catalog))
+        self.assertEqual(cached.get('nybb'), self.catalog.get('nybb'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import os
+import shutil
+import filecmp
+import tempfile
+
+import gdbcopy
+
+class GDBCopyTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.sourcepath = os.path.join(self.testdatadir
+                                      ,'sample.gdb')
+        self.tempdir = tempfile.mkdtemp()
+
+    def setUp(self):
+
+        # a source with a lock file as if ArcGIS had it open
+        self.source = os.path.join(self.tempdir, 'source.gdb')
+        shutil.copytree(self.sourcepath, self.source)
+        with open(os.path.join(self.source
+                              ,'a00000009.1234.5678.sr.lock'), 'w') as f:
+            f.write('')
+        self.target = os.path.join(self.tempdir, 'target.gdb')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.source)
+        shutil.rmtree(self.target, ignore_errors=True)
+
+    @classmethod
+    def tearDownClass(self):
+
+        shutil.rmtree(self.tempdir)
+
+    def test_acopy(self):
+
+        result = gdbcopy.copy_gdb(self.source, self.target, workers=4)
+        self.assertEqual(result.skipped, ['a00000009.1234.5678.sr.lock'])
+        self.assertEqual(result.files, len(os.listdir(self.sourcepath)))
+        self.assertEqual(sum(result.methods.values()), result.files)
+
+        names = sorted(os.listdir(self.target))
+        self.assertEqual(names, sorted(os.listdir(self.sourcepath)))
+        _, mismatch, errors = filecmp.cmpfiles(self.source
+                                               ,self.target
+                                               ,names
+                                               ,shallow=False)
+        self.assertEqual(mismatch + errors, [])
+
+    def test_bindependent(self):
+
+        # auto mode copies are safe to edit
+        gdbcopy.copy_gdb(self.source, self.target)
+        copied = os.path.join(self.target, 'a00000009.gdbtable')
+        self.assertNotEqual(os.stat(copied).st_ino
+                           ,os.stat(os.path.join(self.source
+                                                ,'a00000009.gdbtable')).st_ino)
+        # timestamps survive, incremental fingerprints depend on them
+        self.assertEqual(os.stat(copied).st_mtime_ns
+                        ,os.stat(os.path.join(self.source
+                                             ,'a00000009.gdbtable')).st_mtime_ns)
+
+    def test_chardlink(self):
+
+        result = gdbcopy.copy_gdb(self.source, self.target, mode='hardlink')
+        if 'hardlink' not in result.methods:
+            self.skipTest('filesystem without hard links')
+        self.assertTrue(os.path.samefile(
+            os.path.join(self.target, 'a00000009.gdbtable')
+           ,os.path.join(self.source, 'a00000009.gdbtable')))
+
+    def test_dfreelists(self):
+
+        result = gdbcopy.copy_gdb(self.source
+                                 ,self.target
+                                 ,skip=gdbcopy.SKIP_LOCKS + gdbcopy.SKIP_FREELISTS)
+        self.assertIn('a00000001.freelist', result.skipped)
+        self.assertFalse(os.path.exists(os.path.join(self.target
+                                                    ,'a00000001.freelist')))
+
+    def test_eexists(self):
+
+        os.makedirs(self.target)
+        with self.assertRaises(FileExistsError):
+            gdbcopy.copy_gdb(self.source, self.target)
+        with self.assertRaises(ValueError):
+            gdbcopy.copy_file(os.path.join(self.source, 'a00000001.gdbtable')
+                             ,os.path.join(self.target, 'a00000001.gdbtable')
+                             ,mode='symlink')
+
+    @unittest.skipUnless(hasattr(os, 'copy_file_range'), 'no copy_file_range')
+    def test_fshortcopy(self):
+
+        # a kernel copy that stops early is finished in Python
+        copy_file_range = os.copy_file_range
+
+        def short(src, dst, count, offset_src, offset_dst):
+            if offset_src:
+                return 0
+            return copy_file_range(src, dst, min(count, 100), offset_src, offset_dst)
+
+        os.copy_file_range = short
+        source = os.path.join(self.source, 'a00000001.gdbtable')
+        target = os.path.join(self.tempdir, 'a00000001.gdbtable')
+        try:
+            with open(source, 'rb') as fsrc, open(target, 'wb') as fdst:
+                self.assertTrue(gdbcopy._kernelcopy(os.copy_file_range
+                                                   ,fsrc
+                                                   ,fdst
+                                                   ,os.path.getsize(source)))
+        finally:
+            os.copy_file_range = copy_file_range
+        self.assertTrue(filecmp.cmp(source, target, shallow=False))
+        os.remove(target)
+
+
+if __name__ == '__main__':
+    unittest.main()
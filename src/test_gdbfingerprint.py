@@ -0,0 +1,110 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import gdbtable
+import gdbfingerprint
+
+class GDBFingerprintTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.sourcepath = os.path.join(self.testdatadir
+                                      ,'sample.gdb')
+        self.tempdir = tempfile.mkdtemp()
+
+    def setUp(self):
+
+        self.gdbpath = os.path.join(self.tempdir, 'sample.gdb')
+        shutil.copytree(self.sourcepath, self.gdbpath)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.gdbpath)
+
+    @classmethod
+    def tearDownClass(self):
+
+        shutil.rmtree(self.tempdir)
+
+    def rewrite(self
+               ,tableid
+               ,old
+               ,new):
+
+        # same length edit inside the rows of a table
+        path = gdbtable.table_path(self.gdbpath, tableid)
+        with open(path, 'rb') as f:
+            data = f.read()
+        with gdbtable.GDBTable(path) as table:
+            rowsstart = table.header.field_offset
+        position = data.index(old, rowsstart)
+        with open(path, 'r+b') as f:
+            f.seek(position)
+            f.write(new)
+
+    def test_astable(self):
+
+        fingerprint = gdbfingerprint.catalog_fingerprint(self.gdbpath)
+        self.assertEqual(len(fingerprint), 32)
+        self.assertEqual(gdbfingerprint.catalog_fingerprint(self.sourcepath)
+                        ,fingerprint)
+
+    def test_bschemachange(self):
+
+        # GDB_Items (a00000004) holds the definitions
+        before = gdbfingerprint.catalog_fingerprint(self.gdbpath)
+        self.rewrite(4, b'<Name>nybb', b'<Name>nyBB')
+        self.assertNotEqual(gdbfingerprint.catalog_fingerprint(self.gdbpath)
+                           ,before)
+
+    def test_cdatachange(self):
+
+        # nybb (a00000009) rows are data, not schema
+        before = gdbfingerprint.catalog_fingerprint(self.gdbpath)
+        self.rewrite(9, 'Queens'.encode('utf-8'), 'QUEENS'.encode('utf-8'))
+        self.assertEqual(gdbfingerprint.catalog_fingerprint(self.gdbpath)
+                        ,before)
+
+    def test_dfreespace(self):
+
+        # bytes after the last row are not content
+        before = gdbfingerprint.catalog_fingerprint(self.gdbpath)
+        with open(gdbtable.table_path(self.gdbpath, 4), 'ab') as f:
+            f.write(b'\x00' * 64)
+        self.assertEqual(gdbfingerprint.catalog_fingerprint(self.gdbpath)
+                        ,before)
+
+    def test_etablefingerprints(self):
+
+        fingerprints = gdbfingerprint.table_fingerprints(self.gdbpath)
+        self.assertEqual(sorted(fingerprints)
+                        ,['NEIGHBORHOODS', 'neighborhooddata', 'nybb'])
+        self.assertEqual(fingerprints['nybb']['size'][0]
+                        ,os.path.getsize(gdbtable.table_path(self.gdbpath, 9)))
+
+        # any byte of the table counts
+        self.rewrite(9, 'Queens'.encode('utf-8'), 'QUEENS'.encode('utf-8'))
+        changed = gdbfingerprint.table_fingerprints(self.gdbpath)
+        self.assertNotEqual(changed['nybb']['hash'], fingerprints['nybb']['hash'])
+        self.assertEqual(changed['NEIGHBORHOODS'], fingerprints['NEIGHBORHOODS'])
+
+    def test_fsizemtime(self):
+
+        # same size and mtime trusts the previous hash without reading
+        path = gdbtable.table_path(self.gdbpath, 9)
+        fingerprint = gdbfingerprint.table_fingerprint(path)
+        previous = dict(fingerprint, hash='previous')
+        self.assertEqual(gdbfingerprint.table_fingerprint(path, previous)['hash']
+                        ,'previous')
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(gdbfingerprint.table_fingerprint(path, previous)['hash']
+                        ,fingerprint['hash'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import os
+
+import numpy as np
+
+import gdbtable
+import gdbgeometry
+
+class GDBGeometryTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.nybbpath = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                    ,'testdata'
+                                    ,'sample.gdb'
+                                    ,'a00000009.gdbtable')
+        # a made up 2263-ish geometry field for synthetic shapes
+        self.field = gdbtable.GDBField('Shape', '', gdbtable.FIELD_GEOMETRY)
+        self.field.xorigin = -120039300.0
+        self.field.yorigin = -96540300.0
+        self.field.xyscale = 3048.006096012192
+        self.field.zorigin = -100000.0
+        self.field.zscale  = 10000.0
+
+    def setUp(self):
+
+        self.nybb = gdbtable.GDBTable(self.nybbpath)
+
+    def tearDown(self):
+
+        self.nybb.close()
+
+    def test_avarints(self):
+
+        values = np.array([0, 1, -1, 63, -64, 64, 8191, -123456789012])
+        encoded, lengths = gdbgeometry.encode_varints(values)
+        self.assertEqual(list(lengths[:4]), [1, 1, 1, 1])
+        np.testing.assert_array_equal(gdbgeometry.decode_varints(encoded)
+                                     ,values)
+
+    def test_bdecodenybb(self):
+
+        geometry = gdbgeometry.decode_table(self.nybb)
+        self.assertEqual(len(geometry), 5)
+        self.assertEqual(geometry.coords.shape, (75497, 2))
+        self.assertEqual(len(geometry.part_offsets), 108)
+        # rings close and shoelace area agrees with Shape_Area
+        areas = [row[0] for row in self.nybb.rows(['Shape_Area'])]
+        for i in range(len(geometry)):
+            area = 0.0
+            for ring in geometry.parts(i):
+                np.testing.assert_array_equal(ring[0], ring[-1])
+                x, y = ring[:, 0], ring[:, 1]
+                area -= 0.5 * np.sum(x[:-1] * y[1:] - x[1:] * y[:-1])
+            self.assertAlmostEqual(area / areas[i], 1.0, places=6)
+
+    def test_cencodenybb(self):
+
+        geometry = gdbgeometry.decode_table(self.nybb)
+        blobs = [bytes(row[0]) for row in self.nybb.rows(['Shape'])]
+        self.assertEqual(gdbgeometry.encode(geometry
+                                           ,self.nybb.geometry_field)
+                        ,blobs)
+
+    def test_dsynthetic(self):
+
+        # two part polyline, a null, a point, a 3d polyline
+        geometry = gdbgeometry.GeometryBuffer(
+            [1, 2, 3, 4]
+           ,[3, 0, 1, 10]
+           ,np.array([[1000000.0, 200000.0]
+                     ,[1000010.0, 200005.0]
+                     ,[1000020.0, 199990.0]
+                     ,[1000030.0, 199980.0]
+                     ,[1000040.0, 199970.0]
+                     ,[990000.0, 190000.0]
+                     ,[990001.0, 190001.0]
+                     ,[990002.0, 190003.0]])
+           ,np.array([0, 2, 5, 6, 8])
+           ,np.array([0, 2, 2, 3, 4])
+           ,np.array([np.nan] * 5 + [0.0, 10.5, 12.25]))
+        blobs = gdbgeometry.encode(geometry, self.field)
+        self.assertIsNone(blobs[1])
+        decoded = gdbgeometry.decode(zip(geometry.objectids, blobs)
+                                    ,self.field)
+        np.testing.assert_array_equal(decoded.part_offsets
+                                     ,geometry.part_offsets)
+        np.testing.assert_array_equal(decoded.feature_offsets
+                                     ,geometry.feature_offsets)
+        np.testing.assert_allclose(decoded.coords, geometry.coords
+                                  ,atol=1 / self.field.xyscale)
+        self.assertTrue(np.isnan(decoded.z[:6]).all())
+        np.testing.assert_allclose(decoded.z[6:], [10.5, 12.25])
+
+    def test_ecurvesnotsupported(self):
+
+        with self.assertRaises(NotImplementedError):
+            gdbgeometry.decode([(1, gdbgeometry._varuint(50 | 0x20000000) + b'\x00')]
+                              ,self.field)
+
+if __name__ == '__main__':
+    unittest.main()
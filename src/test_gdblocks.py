@@ -0,0 +1,103 @@
+import unittest
+import os
+import socket
+import shutil
+import tempfile
+import threading
+import time
+
+import gdblocks
+
+class GDBLocksTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.gdb = tempfile.mkdtemp(suffix='.gdb')
+        self.machine = socket.gethostname().split('.')[0]
+
+    def tearDown(self):
+
+        shutil.rmtree(self.gdb)
+
+    def lock(self
+            ,item='a00000009'
+            ,pid=None
+            ,locktype='sr'):
+
+        path = os.path.join(self.gdb
+                           ,'{0}.{1}.{2}.1234.{3}.lock'.format(item
+                                                              ,self.machine
+                                                              ,pid or os.getpid()
+                                                              ,locktype))
+        with open(path, 'w') as f:
+            f.write('')
+        return path
+
+    def release(self
+               ,path
+               ,after):
+
+        timer = threading.Timer(after, os.remove, [path])
+        timer.start()
+        return timer
+
+    def test_aparse(self):
+
+        self.lock('_gdb', 8872, 'wr')
+        lock = gdblocks.locks(self.gdb)[0]
+        self.assertEqual(lock.item, '_gdb')
+        self.assertEqual(lock.type, 'wr')
+        self.assertEqual(lock.machine, self.machine)
+        self.assertEqual(lock.pid, 8872)
+        self.assertGreaterEqual(lock.age, 0)
+        odd = gdblocks.parse(os.path.join(self.gdb, 'odd.lock'))
+        self.assertEqual((odd.pid, odd.age), (None, None))
+
+    def test_bstale(self):
+
+        live = self.lock()
+        self.assertFalse(gdblocks.is_stale(gdblocks.parse(live)))
+        # pids do not go this high
+        dead = gdblocks.parse(self.lock('a0000000a', 2 ** 22 + 1))
+        self.assertTrue(gdblocks.is_stale(dead))
+        self.assertFalse(gdblocks.wait_until_unlocked(self.gdb
+                                                     ,0.1
+                                                     ,ignore_stale=True))
+        os.remove(live)
+        self.assertTrue(gdblocks.wait_until_unlocked(self.gdb
+                                                    ,0.1
+                                                    ,ignore_stale=True))
+        self.assertFalse(gdblocks.wait_until_unlocked(self.gdb, 0.1))
+
+    def test_cwait(self):
+
+        for inotify in (True, False):
+            timer = self.release(self.lock(), 0.2)
+            start = time.monotonic()
+            self.assertTrue(gdblocks.wait_until_unlocked(self.gdb
+                                                        ,timeout=10
+                                                        ,inotify=inotify))
+            self.assertLess(time.monotonic() - start, 5)
+            timer.join()
+
+    def test_dtimeout(self):
+
+        self.lock()
+        for inotify in (True, False):
+            start = time.monotonic()
+            self.assertFalse(gdblocks.wait_until_unlocked(self.gdb
+                                                         ,timeout=0.3
+                                                         ,inotify=inotify))
+            self.assertGreaterEqual(time.monotonic() - start, 0.3)
+
+    def test_ewatcher(self):
+
+        with gdblocks.LockWatcher(self.gdb) as watcher:
+            self.assertFalse(watcher.changes(0.05))
+            self.lock()
+            self.assertTrue(watcher.changes(5))
+            self.assertFalse(watcher.changes(0.05))
+
+
+if __name__ == '__main__':
+    unittest.main()
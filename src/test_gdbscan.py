@@ -0,0 +1,82 @@
+import unittest
+import os
+
+import filegeodatabase_manager
+import gdbscan
+import gdbtable
+
+def _objectids(table
+              ,start
+              ,stop):
+    return list(table.objectids(start, stop))
+
+def _boronames(table
+              ,start
+              ,stop
+              ,suffix):
+    return [row[0] + suffix for row in table.rows(['BoroName'], start, stop)]
+
+class GDBScanTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.samplegdb = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                     ,'testdata'
+                                     ,'sample.gdb')
+        # GDB_SystemCatalog, objectid 11 has been deleted
+        self.catalogpath = os.path.join(self.samplegdb
+                                       ,'a00000001.gdbtable')
+
+    def test_aoffsets(self):
+
+        with gdbtable.GDBTable(self.catalogpath) as table:
+            offsets = table.offsets()
+            self.assertEqual(len(offsets), table.total_rows)
+            self.assertEqual(offsets[10], 0)
+            for objectid in table.objectids():
+                self.assertEqual(offsets[objectid - 1], table.row_offset(objectid))
+
+    def test_bpartitions(self):
+
+        # contiguous, covering every objectid, rows spread evenly
+        with gdbtable.GDBTable(self.catalogpath) as table:
+            ranges = gdbscan.partitions(table, 4, min_rows=1)
+            self.assertEqual(len(ranges), 4)
+            self.assertEqual(ranges[0][0], 1)
+            self.assertEqual(ranges[-1][1], table.total_rows + 1)
+            for (_, stop), (start, _) in zip(ranges[:-1], ranges[1:]):
+                self.assertEqual(stop, start)
+            sizes = [len(list(table.objectids(start, stop))) for start, stop in ranges]
+            self.assertEqual(sum(sizes), len(table))
+            self.assertLessEqual(max(sizes) - min(sizes), 1)
+            # small tables are not worth splitting
+            self.assertEqual(gdbscan.partitions(table, 4)
+                            ,[(1, table.total_rows + 1)])
+
+    def test_cscan(self):
+
+        with gdbtable.GDBTable(self.catalogpath) as table:
+            expected = list(table.objectids())
+        results = gdbscan.scan(self.catalogpath
+                              ,_objectids
+                              ,parts=3
+                              ,workers=2
+                              ,min_rows=1)
+        self.assertEqual(len(results), 3)
+        self.assertEqual([objectid for part in results for objectid in part]
+                        ,expected)
+
+        gdb = filegeodatabase_manager.LocalGDB(self.samplegdb)
+        names = gdb.scan('nybb'
+                        ,_boronames
+                        ,('!',)
+                        ,parts=2
+                        ,workers=2
+                        ,min_rows=1)
+        with gdb.table('nybb') as table:
+            self.assertEqual([name for part in names for name in part]
+                            ,[row[0] + '!' for row in table.rows(['BoroName'])])
+
+if __name__ == '__main__':
+    unittest.main()
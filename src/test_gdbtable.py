@@ -0,0 +1,124 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import gdbtable
+
+class GDBTableTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        # a00000009 is nybb (borough) polygons in 2263
+        self.nybbpath = os.path.join(self.testdatadir
+                                    ,'sample.gdb'
+                                    ,'a00000009.gdbtable')
+
+    def setUp(self):
+
+        self.nybb = gdbtable.GDBTable(self.nybbpath)
+
+    def tearDown(self):
+
+        self.nybb.close()
+
+    def test_aheader(self):
+
+        self.assertEqual(self.nybb.header.valid_rows, 5)
+        self.assertEqual(self.nybb.header.geometry_type, 'Polygon')
+        self.assertTrue(self.nybb.header.utf8)
+        self.assertEqual(self.nybb.total_rows, 5)
+
+    def test_bfields(self):
+
+        self.assertEqual([f.name for f in self.nybb.fields]
+                        ,['OBJECTID', 'Shape', 'BoroCode', 'BoroName'
+                         ,'Shape_Leng', 'Shape_Length', 'Shape_Area'])
+        shape = self.nybb.geometry_field
+        self.assertIn('Long_Island', shape.wkt)
+        self.assertAlmostEqual(shape.xyscale, 3048.006096012192)
+        self.assertAlmostEqual(shape.xytolerance, 0.003280833333333333)
+        self.assertTrue(self.nybb.fields[3].nullable)
+
+    def test_crows(self):
+
+        rows = list(self.nybb.rows(['OBJECTID', 'BoroCode', 'BoroName']))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0], (1, 2, 'Bronx'))
+        self.assertEqual(rows[4], (5, 1, 'Manhattan'))
+
+    def test_dgeometryiszerocopy(self):
+
+        oid, shape = next(self.nybb.rows(['OBJECTID', 'Shape']))
+        self.assertIsInstance(shape, memoryview)
+        self.assertEqual(len(shape), 48728)
+        shape.release()
+
+    def test_erow(self):
+
+        self.assertEqual(self.nybb.row(3, ['BoroName']), ('Brooklyn',))
+        with self.assertRaises(KeyError):
+            self.nybb.row(99)
+
+    def test_fdeletedrows(self):
+
+        # GDB_SystemCatalog objectid 11 has been deleted
+        catalog = gdbtable.GDBTable(os.path.join(self.testdatadir
+                                                ,'sample.gdb'
+                                                ,'a00000001.gdbtable'))
+        ids = list(catalog.objectids())
+        self.assertNotIn(11, ids)
+        self.assertEqual(len(ids), len(catalog))
+        self.assertIn((12, 'neighborhooddata')
+                     ,list(catalog.rows(['ID', 'Name'])))
+        catalog.close()
+
+    def test_growbytes(self):
+
+        # the stored row holds the values, row() decodes the same bytes
+        raw = bytes(self.nybb.row_bytes(1))
+        self.assertIn(self.nybb.row(1, ['BoroName'])[0].encode('utf-8'), raw)
+        with self.assertRaises(KeyError):
+            self.nybb.row_bytes(99)
+        self.assertEqual(len(self.nybb.field_section())
+                        ,4 + int.from_bytes(self.nybb.field_section()[:4]
+                                           ,'little'))
+
+    def test_hencoderow(self):
+
+        # encode_row gives back the stored bytes of every row
+        for objectid in self.nybb.objectids():
+            row = self.nybb.row(objectid)
+            row = [bytes(value) if isinstance(value, memoryview) else value
+                   for field, value in zip(self.nybb.fields, row)
+                   if field.type != gdbtable.FIELD_OBJECTID]
+            self.assertEqual(gdbtable.encode_row(self.nybb.fields
+                                                ,row
+                                                ,self.nybb.header.utf8)
+                            ,bytes(self.nybb.row_bytes(objectid)))
+
+    def test_itablewriter(self):
+
+        tempdir = tempfile.mkdtemp()
+        try:
+            gdb = os.path.join(tempdir, 'sample.gdb')
+            shutil.copytree(os.path.join(self.testdatadir, 'sample.gdb'), gdb)
+            path = os.path.join(gdb, 'a00000009.gdbtable')
+            rows = [bytes(self.nybb.row_bytes(objectid))
+                    for objectid in self.nybb.objectids()]
+            with gdbtable.TableWriter(path) as writer:
+                self.assertEqual(writer.append(rows), [6, 7, 8, 9, 10])
+                self.assertEqual(writer.append(rows[:1]), [11])
+            with gdbtable.GDBTable(path) as table:
+                self.assertEqual(len(table), 11)
+                self.assertEqual(table.row(11, ['BoroName'])
+                                ,self.nybb.row(1, ['BoroName']))
+                self.assertEqual(table.header.valid_rows, 11)
+        finally:
+            shutil.rmtree(tempdir)
+
+if __name__ == '__main__':
+    unittest.main()
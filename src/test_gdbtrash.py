@@ -0,0 +1,64 @@
+import unittest
+import os
+import stat
+import shutil
+import tempfile
+
+import gdbtrash
+
+class GDBTrashTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.sourcepath = os.path.join(self.testdatadir
+                                      ,'sample.gdb')
+
+    def setUp(self):
+
+        self.tempdir = tempfile.mkdtemp()
+        self.gdb = os.path.join(self.tempdir, 'sample.gdb')
+        shutil.copytree(self.sourcepath, self.gdb)
+
+    def tearDown(self):
+
+        gdbtrash.wait()
+        shutil.rmtree(self.tempdir)
+
+    def test_adiscard(self):
+
+        # gone from its path at once, gone from the trash after wait
+        future = gdbtrash.discard(self.gdb)
+        self.assertFalse(os.path.exists(self.gdb))
+        future.result(timeout=30)
+        self.assertFalse(os.path.exists(gdbtrash.trash_dir(self.gdb)))
+
+    def test_breadonly(self):
+
+        os.chmod(os.path.join(self.gdb, 'a00000009.gdbtable'), stat.S_IREAD)
+        gdbtrash.discard(self.gdb).result(timeout=30)
+        self.assertFalse(os.path.exists(gdbtrash.trash_dir(self.gdb)))
+
+    def test_cpurge(self):
+
+        # trash a dead process left behind
+        trash = gdbtrash.trash_dir(self.gdb)
+        os.makedirs(trash)
+        os.rename(self.gdb, os.path.join(trash, 'sample.gdb.leftover'))
+        futures = gdbtrash.purge_once(self.tempdir)
+        self.assertEqual(len(futures), 1)
+        self.assertEqual(gdbtrash.purge_once(self.tempdir), [])
+        self.assertEqual(gdbtrash.wait(timeout=30), set())
+        self.assertFalse(os.path.exists(trash))
+
+    def test_dmissing(self):
+
+        with self.assertRaises(OSError):
+            gdbtrash.discard(os.path.join(self.tempdir, 'missing.gdb'))
+        self.assertEqual(gdbtrash.purge(os.path.join(self.tempdir, 'nope')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+import memory_budget
+import tracing
+
+class MemoryBudgetTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        tracing.get().clear()
+
+    def tearDown(self):
+
+        memory_budget.uninstall()
+        tracing.disable()
+        tracing.get().clear()
+
+    def test_asizes(self):
+
+        self.assertEqual(memory_budget.parse_size('6G'), 6 << 30)
+        self.assertEqual(memory_budget.parse_size('1.5gb'), 3 << 29)
+        self.assertEqual(memory_budget.parse_size('512'), 512)
+        self.assertEqual(memory_budget.format_size(3 << 29), '1.5G')
+        with self.assertRaises(ValueError):
+            memory_budget.MemoryBudget('1G', action='explode')
+
+    def test_breport(self):
+
+        budget = memory_budget.install('1T')
+        with tracing.span('outer'):
+            with tracing.span('allocate'):
+                kept = [bytearray(1000) for _ in range(2000)]
+        stages = {stage.name: stage for stage in budget.stages}
+        self.assertEqual(set(stages), {'outer', 'allocate'})
+        allocate = stages['allocate']
+        self.assertGreaterEqual(allocate.traced_peak, 2000 * 1000)
+        self.assertIn('test_memory_budget.py', allocate.top[0].location)
+        self.assertGreaterEqual(allocate.top[0].size, 2000 * 1000)
+        if memory_budget.rss() is not None:
+            self.assertGreaterEqual(allocate.rss_peak, allocate.rss_start)
+        report = budget.format_report()
+        self.assertLess(report.index('outer'), report.index('allocate'))
+        del kept
+
+    def test_cabort(self):
+
+        # any process is over a one byte budget
+        memory_budget.install(1, 'abort')
+        with self.assertRaises(memory_budget.MemoryBudgetExceeded):
+            with tracing.span('stage'):
+                pass
+        with self.assertRaises(memory_budget.MemoryBudgetExceeded):
+            tracing.start('next')
+        self.assertIsNone(tracing.get().current())
+
+    def test_dwarn(self):
+
+        memory_budget.install(1 << 40, warn_at=0)
+        with self.assertLogs('memory_budget', 'WARNING') as logs:
+            with tracing.span('stage'):
+                pass
+        self.assertIn('stage', logs.output[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import os
+
+import numpy as np
+
+import gdbtable
+import projection
+
+# EPSG Guidance Note 7-2 Lambert Conic Conformal (2SP) example
+# NAD27 / Texas South Central, Clarke 1866, US survey feet
+TEXAS_WKT = (
+    'PROJCS["NAD_1927_StatePlane_Texas_South_Central_FIPS_4204",'
+    'GEOGCS["GCS_North_American_1927",'
+    'DATUM["D_North_American_1927",SPHEROID["Clarke_1866",6378206.4,294.9786982]],'
+    'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]],'
+    'PROJECTION["Lambert_Conformal_Conic"],'
+    'PARAMETER["False_Easting",2000000.0],'
+    'PARAMETER["False_Northing",0.0],'
+    'PARAMETER["Central_Meridian",-99.0],'
+    'PARAMETER["Standard_Parallel_1",28.38333333333333],'
+    'PARAMETER["Standard_Parallel_2",30.28333333333333],'
+    'PARAMETER["Latitude_Of_Origin",27.83333333333333],'
+    'UNIT["Foot_US",0.3048006096012192]]')
+
+# NAD83 longitude, latitude and NY Long Island State Plane 2263 feet
+NYC_CONTROL = [((-74.0, 40.16666666666666), (984250.0, 0.0))
+              ,((-73.9857, 40.7484), (988212.237183, 211939.278568))
+              ,((-74.0445, 40.6892), (971909.004806, 190373.715116))
+              ,((-73.7781, 40.6413), (1045832.724738, 172997.260310))]
+
+class ProjectionTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        # the nybb shape field carries the 2263 WKT
+        nybbpath = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                               ,'testdata'
+                               ,'sample.gdb'
+                               ,'a00000009.gdbtable')
+        with gdbtable.GDBTable(nybbpath) as nybb:
+            self.nywkt = nybb.geometry_field.wkt
+        self.ny = projection.LambertConformalConic.from_wkt(self.nywkt)
+
+    def test_aepsgexample(self):
+
+        texas = projection.LambertConformalConic.from_wkt(TEXAS_WKT)
+        xy = texas.forward([[-96.0, 28.5]])
+        np.testing.assert_allclose(xy, [[2963503.91, 254759.80]], atol=0.01)
+
+    def test_bforward(self):
+
+        lonlat = np.array([c[0] for c in NYC_CONTROL])
+        expected = np.array([c[1] for c in NYC_CONTROL])
+        np.testing.assert_allclose(self.ny.forward(lonlat), expected, atol=1e-4)
+
+    def test_cinverse(self):
+
+        lonlat = np.array([c[0] for c in NYC_CONTROL])
+        expected = np.array([c[1] for c in NYC_CONTROL])
+        np.testing.assert_allclose(self.ny.inverse(expected), lonlat, atol=1e-9)
+
+    def test_droundtrip(self):
+
+        rng = np.random.default_rng(2263)
+        xy = np.column_stack([rng.uniform(913000, 1068000, 100000)
+                             ,rng.uniform(120000, 273000, 100000)])
+        roundtrip = self.ny.forward(self.ny.inverse(xy))
+        self.assertLess(np.abs(roundtrip - xy).max(), 1e-6)
+
+    def test_enotlcc(self):
+
+        with self.assertRaises(ValueError):
+            projection.LambertConformalConic.from_wkt(
+                self.nywkt.replace('Lambert_Conformal_Conic'
+                                  ,'Transverse_Mercator'))
+
+if __name__ == '__main__':
+    unittest.main()
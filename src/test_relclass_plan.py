@@ -0,0 +1,158 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+
+import gdbbackend
+import gdbcatalog
+import relclass_plan
+
+RELCLASS_XML = (
+    "<DERelationshipClassInfo>"
+    "<Name>{0}</Name>"
+    "<Cardinality>esriRelCardinalityOneToMany</Cardinality>"
+    "<Notification>esriRelNotificationNone</Notification>"
+    "<IsAttributed>{3}</IsAttributed>"
+    "<IsComposite>false</IsComposite>"
+    "<OriginClassNames><Name>{1}</Name></OriginClassNames>"
+    "<DestinationClassNames><Name>{2}</Name></DestinationClassNames>"
+    "<ForwardPathLabel>forward</ForwardPathLabel>"
+    "<BackwardPathLabel>backward</BackwardPathLabel>"
+    "<OriginClassKeys>"
+    "<RelationshipClassKey><ObjectKeyName>BoroCode</ObjectKeyName>"
+    "<KeyRole>esriRelKeyRoleOriginPrimary</KeyRole></RelationshipClassKey>"
+    "<RelationshipClassKey><ObjectKeyName>BOROCODE</ObjectKeyName>"
+    "<KeyRole>esriRelKeyRoleOriginForeign</KeyRole></RelationshipClassKey>"
+    "</OriginClassKeys>"
+    "</DERelationshipClassInfo>")
+
+
+def relclass(name
+            ,origin
+            ,destination
+            ,attributed=False):
+
+    return gdbcatalog.CatalogItem(name
+                                 ,'RelationshipClass'
+                                 ,None
+                                 ,'\\' + name
+                                 ,name
+                                 ,None
+                                 ,gdbcatalog.parse_relclass(RELCLASS_XML.format(
+                                      name
+                                     ,origin
+                                     ,destination
+                                     ,'true' if attributed else 'false')))
+
+class RelclassPlanTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.samplegdb = os.path.join(self.testdatadir
+                                     ,'sample.gdb')
+        sample = gdbcatalog.CatalogIndex.from_gdb(self.samplegdb)
+        self.catalog = gdbcatalog.CatalogIndex(
+            list(sample)
+            + [relclass('nybb_neighborhooddata', 'nybb', 'neighborhooddata')
+              ,relclass('nybb_neighborhoods', 'nybb', 'NEIGHBORHOODS', True)])
+        self.backend = gdbbackend.LocalBackend()
+
+    def setUp(self):
+
+        self.tempdir = tempfile.mkdtemp()
+        self.planpath = os.path.join(self.tempdir, 'plan.json')
+        self.previous = gdbbackend._current
+        gdbbackend.use(self.backend)
+
+    def tearDown(self):
+
+        gdbbackend._current = self.previous
+        shutil.rmtree(self.tempdir)
+
+    def test_abuild(self):
+
+        plan = relclass_plan.Plan.build(self.catalog, 'schema1')
+        plan.save(self.planpath)
+        loaded = relclass_plan.Plan.load(self.planpath)
+        self.assertEqual(loaded.relclasses, plan.relclasses)
+        self.assertEqual(loaded.schema, 'schema1')
+        self.assertEqual(loaded.attributed(), ['nybb_neighborhoods'])
+        arguments = loaded.arguments(self.tempdir, 'nybb_neighborhooddata')
+        self.assertEqual(arguments['origin_table']
+                        ,os.path.join(self.tempdir, 'nybb'))
+        self.assertEqual(arguments['cardinality'], 'ONE_TO_MANY')
+        self.assertEqual(arguments['origin_primary_key'], 'BoroCode')
+
+    def test_bbatches(self):
+
+        arguments = {'attributed': 'NONE'}
+        plan = relclass_plan.Plan(
+            {'a_b': dict(arguments, origin_table='a', destination_table='b')
+            ,'b_c': dict(arguments, origin_table='b', destination_table='c')
+            ,'c_d': dict(arguments, origin_table='c', destination_table='d')
+            ,'e_f': dict(arguments, origin_table='e', destination_table='f')})
+        self.assertEqual(plan.batches(), [['a_b', 'c_d', 'e_f'], ['b_c']])
+        self.assertEqual(plan.batches(['b_c', 'e_f']), [['b_c', 'e_f']])
+
+    def test_cexecute(self):
+
+        # a fresh gdb gets them all, a rerun none, a changed one is replaced
+        xlsx = os.path.join(self.tempdir, 'sample.xlsx')
+        gdb = os.path.join(self.tempdir, 'out.gdb')
+        self.backend.generate_excel_from_geodatabase(self.samplegdb, xlsx)
+        self.backend.generate_geodatabase_from_excel(xlsx, gdb)
+
+        plan = relclass_plan.Plan.build(self.catalog)
+        actions = [result.action for result in relclass_plan.execute(plan, gdb)]
+        self.assertEqual(actions, ['created', 'created'])
+        self.assertTrue(self.backend.exists(os.path.join(gdb, 'nybb_neighborhoods')))
+        actions = [result.action for result in relclass_plan.execute(plan, gdb)]
+        self.assertEqual(actions, ['unchanged', 'unchanged'])
+
+        plan.relclasses['nybb_neighborhoods']['forward_label'] = 'changed'
+        results = relclass_plan.execute(plan, gdb, workers=2)
+        self.assertEqual([result.action for result in results]
+                        ,['unchanged', 'replaced'])
+        self.assertEqual(self.backend.relationship_classes(gdb)['nybb_neighborhoods']['forward_label']
+                        ,'changed')
+        self.assertIn('replaced', relclass_plan.format_results(results))
+
+    def test_dreuse(self):
+
+        # same schema key reuses the saved plan, another key rebuilds
+        relclass_plan.Plan.build(self.catalog, 'schema1').save(self.planpath)
+        plan = relclass_plan.Plan.load_or_build(self.planpath, self.samplegdb, 'schema1')
+        self.assertEqual(len(plan), 2)
+        plan = relclass_plan.Plan.load_or_build(self.planpath, self.samplegdb, 'schema2')
+        self.assertEqual(len(plan), 0)
+        with open(self.planpath) as f:
+            self.assertEqual(json.load(f)['schema'], 'schema2')
+
+    def test_eparallel(self):
+
+        # with workers relationship classes that share no table are
+        # created together in one batch
+        xlsx = os.path.join(self.tempdir, 'sample.xlsx')
+        gdb = os.path.join(self.tempdir, 'out.gdb')
+        self.backend.generate_excel_from_geodatabase(self.samplegdb, xlsx)
+        self.backend.generate_geodatabase_from_excel(xlsx, gdb)
+
+        sample = gdbcatalog.CatalogIndex.from_gdb(self.samplegdb)
+        plan = relclass_plan.Plan.build(gdbcatalog.CatalogIndex(
+            list(sample)
+            + [relclass('nybb_neighborhooddata', 'nybb', 'neighborhooddata')
+              ,relclass('neighborhoods_neighborhoods', 'NEIGHBORHOODS', 'NEIGHBORHOODS')]))
+        self.assertEqual(plan.batches()
+                        ,[['neighborhoods_neighborhoods', 'nybb_neighborhooddata']])
+        results = relclass_plan.execute(plan, gdb, workers=2)
+        self.assertEqual([result.action for result in results]
+                        ,['created', 'created'])
+        self.assertEqual(sorted(self.backend.relationship_classes(gdb))
+                        ,['neighborhoods_neighborhoods', 'nybb_neighborhooddata'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import os
+import shutil
+import tempfile
+import openpyxl
+
+import gdbfingerprint
+import reprojection_manifest
+
+class ReprojectionManifestTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.sourcepath = os.path.join(self.testdatadir
+                                      ,'sample.gdb')
+        self.tempdir = tempfile.mkdtemp()
+        self.outgdb  = os.path.join(self.tempdir, 'out.gdb')
+        self.xlsx    = os.path.join(self.tempdir, 'schema.xlsx')
+        self.workbook(self.xlsx, 2263)
+
+    @classmethod
+    def workbook(self
+                ,xlsx
+                ,wkid):
+
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = 'SpatialReferences'
+        ws.append(['ID', 'Name', 'WKID'])
+        ws.append([1, 'sr', wkid])
+        wb.save(xlsx)
+
+    def tearDown(self):
+
+        reprojection_manifest.Manifest.for_gdb(self.outgdb).remove()
+
+    @classmethod
+    def tearDownClass(self):
+
+        shutil.rmtree(self.tempdir)
+
+    def test_apath(self):
+
+        manifest = reprojection_manifest.Manifest.for_gdb(self.outgdb + os.sep)
+        self.assertEqual(manifest.path
+                        ,os.path.join(self.tempdir, 'out.gdb.manifest.json'))
+        self.assertIsNone(manifest.schema)
+        self.assertFalse(manifest.matches(None))
+
+    def test_bsaveload(self):
+
+        schema = reprojection_manifest.schema_key(self.sourcepath, self.xlsx)
+        fingerprints = gdbfingerprint.table_fingerprints(self.sourcepath)
+        manifest = reprojection_manifest.Manifest.for_gdb(self.outgdb)
+        manifest.update(schema, fingerprints)
+        manifest.save()
+
+        loaded = reprojection_manifest.Manifest.for_gdb(self.outgdb)
+        self.assertTrue(loaded.matches(schema))
+        self.assertEqual(loaded.tables, fingerprints)
+        self.assertEqual(loaded.changed(fingerprints), [])
+
+    def test_cchanged(self):
+
+        fingerprints = gdbfingerprint.table_fingerprints(self.sourcepath)
+        manifest = reprojection_manifest.Manifest.for_gdb(self.outgdb)
+        manifest.update('schema', fingerprints)
+
+        current = dict(fingerprints)
+        current['nybb'] = dict(current['nybb'], hash='different')
+        current['newtable'] = current['neighborhooddata']
+        self.assertEqual(manifest.changed(current), ['newtable', 'nybb'])
+
+    def test_dschemakey(self):
+
+        # the workbook content (and its srid) is part of the schema,
+        # its bytes are not
+        schema = reprojection_manifest.schema_key(self.sourcepath, self.xlsx)
+        samexlsx = os.path.join(self.tempdir, 'same.xlsx')
+        self.workbook(samexlsx, 2263)
+        wb = openpyxl.load_workbook(samexlsx)
+        wb.properties.creator = 'someone else'
+        wb.save(samexlsx)
+        self.assertEqual(reprojection_manifest.schema_key(self.sourcepath
+                                                         ,samexlsx)
+                        ,schema)
+        otherxlsx = os.path.join(self.tempdir, 'other.xlsx')
+        self.workbook(otherxlsx, 6539)
+        self.assertNotEqual(reprojection_manifest.schema_key(self.sourcepath
+                                                            ,otherxlsx)
+                           ,schema)
+        # so is every sheet the schema model does not read
+        wb = openpyxl.load_workbook(samexlsx)
+        wb.create_sheet('Subtypes').append(['ID', 'ObjectClassID', 'Code'])
+        wb.save(samexlsx)
+        self.assertNotEqual(reprojection_manifest.schema_key(self.sourcepath
+                                                            ,samexlsx)
+                           ,schema)
+
+
+if __name__ == '__main__':
+    unittest.main()
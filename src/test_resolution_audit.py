@@ -0,0 +1,94 @@
+import unittest
+import os
+
+import numpy as np
+
+import gdbgeometry
+import gdbscan
+import resolution_audit
+
+class ResolutionAuditTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.sourcepath = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                      ,'testdata'
+                                      ,'sample.gdb')
+        self.xyscale = float('3048.006096012195121164435877261997627062')
+
+    def test_asnap(self):
+
+        snapped = resolution_audit.snap(np.array([[0.26, -0.74]]), 0.0, 0.0, 2.0)
+        np.testing.assert_array_equal(snapped, [[0.5, -0.5]])
+
+    def test_bsameresolution(self):
+
+        # nybb is already on (almost exactly) this grid
+        result = resolution_audit.audit_gdb(self.sourcepath, self.xyscale)[0]
+        self.assertEqual(result.name, 'nybb')
+        self.assertEqual(result.vertices, 75497)
+        self.assertLess(result.max_shift, 1e-6)
+        self.assertEqual(result.collapsed, 0)
+        self.assertIsNone(result.skipped)
+
+    def test_ccoarseresolution(self):
+
+        result = resolution_audit.audit_gdb(self.sourcepath, 1.0)[0]
+        self.assertGreater(result.collapsed, 0)
+        self.assertLessEqual(result.max_shift, np.sqrt(0.5) + 1e-9)
+        self.assertTrue(set(result.collapsed_objectids) <= {1, 2, 3, 4, 5})
+        self.assertIn('nybb', resolution_audit.format_report([result]))
+
+    def test_dpartboundaries(self):
+
+        # the tiny jump between the two parts is not a segment
+        geometry = gdbgeometry.GeometryBuffer(
+            [7]
+           ,[3]
+           ,np.array([[0.0, 0.0], [10.0, 0.0], [10.001, 0.0], [20.0, 0.0]])
+           ,np.array([0, 2, 4])
+           ,np.array([0, 2]))
+        result = resolution_audit.audit_geometry('lines', geometry, 0.0, 0.0, 1000.0)
+        self.assertEqual(result.segments, 2)
+        self.assertEqual(result.collapsed, 0)
+        result = resolution_audit.audit_geometry('lines', geometry, 0.0, 0.0, 1000.0
+                                                ,tolerance=10.5)
+        self.assertEqual(result.collapsed, 2)
+        self.assertEqual(result.collapsed_objectids, [7])
+
+    def test_dmultipoints(self):
+
+        # nearby points of a multipoint, or consecutive points, are not
+        # segments, they only move
+        geometry = gdbgeometry.GeometryBuffer(
+            [3, 4, 5]
+           ,[8, 1, 1]
+           ,np.array([[0.0, 0.0], [0.0004, 0.0], [10.0, 0.0], [10.0003, 0.0]])
+           ,np.array([0, 2, 3, 4])
+           ,np.array([0, 1, 2, 3]))
+        result = resolution_audit.audit_geometry('points', geometry, 0.0, 0.0, 1000.0)
+        self.assertEqual(result.vertices, 4)
+        self.assertEqual(result.moved, 2)
+        self.assertEqual(result.segments, 0)
+        self.assertEqual(result.collapsed, 0)
+        self.assertEqual(result.collapsed_objectids, [])
+
+    def test_epartitions(self):
+
+        # nybb in three objectid ranges on two processes, the same report
+        whole = resolution_audit.audit_gdb(self.sourcepath, 1.0)[0]
+        parts = gdbscan.scan(os.path.join(self.sourcepath, 'a00000009.gdbtable')
+                            ,resolution_audit._audit_partition
+                            ,('nybb', 1.0, None)
+                            ,parts=3
+                            ,workers=2
+                            ,min_rows=1)
+        self.assertEqual(len(parts), 3)
+        merged = resolution_audit._merge('nybb', parts)
+        self.assertEqual(merged[:4], whole[:4])
+        self.assertEqual(merged.collapsed_objectids, whole.collapsed_objectids)
+        self.assertAlmostEqual(merged.mean_shift, whole.mean_shift)
+
+if __name__ == '__main__':
+    unittest.main()
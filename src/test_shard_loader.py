@@ -0,0 +1,121 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import gdbbackend
+import gdbcatalog
+import gdbtable
+import relclass_plan
+import shard_loader
+import xlsx_schema
+
+class ShardLoaderTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.samplegdb = os.path.join(self.testdatadir
+                                     ,'sample.gdb')
+        self.backend = gdbbackend.LocalBackend()
+
+    def setUp(self):
+
+        self.tempdir = tempfile.mkdtemp()
+        self.xlsx = os.path.join(self.tempdir, 'sample.xlsx')
+        self.previous = gdbbackend._current
+        gdbbackend.use(self.backend)
+        self.backend.generate_excel_from_geodatabase(self.samplegdb, self.xlsx)
+
+    def tearDown(self):
+
+        gdbbackend._current = self.previous
+        shutil.rmtree(self.tempdir)
+
+    def test_ashards(self):
+
+        # sample.gdb has no feature datasets, pretend nybb is in one
+        catalog = gdbcatalog.CatalogIndex(
+            item._replace(dataset='Boroughs') if item.name == 'nybb' else item
+            for item in gdbcatalog.CatalogIndex.from_gdb(self.samplegdb))
+        shards = shard_loader.shards(self.samplegdb, catalog)
+        self.assertEqual({shard.name: shard.items for shard in shards}
+                        ,{'Boroughs': ['nybb']
+                         ,'standalone': ['NEIGHBORHOODS', 'neighborhooddata']})
+        self.assertEqual(shards, sorted(shards, key=lambda shard: -shard.size))
+        self.assertEqual([shard.name for shard in shard_loader.shards(self.samplegdb)]
+                        ,['standalone'])
+
+    def test_bsplitworkbook(self):
+
+        output = os.path.join(self.tempdir, 'nybb.xlsx')
+        shard_loader.split_workbook(self.xlsx
+                                   ,shard_loader.Shard('nybb', None, ['nybb'], 0)
+                                   ,output)
+        schema = xlsx_schema.SchemaModel.from_xlsx(output)
+        self.assertEqual([record.name for record in schema.objectclasses], ['nybb'])
+        nybb = schema.objectclasses.named('nybb')[0].id
+        self.assertTrue(len(schema.fields) > 0)
+        self.assertTrue(all(record.objectclass_id == nybb for record in schema.fields))
+
+        # the local backend builds only what the workbook lists
+        gdb = os.path.join(self.tempdir, 'nybb.gdb')
+        self.backend.generate_geodatabase_from_excel(output, gdb)
+        catalog = gdbcatalog.CatalogIndex.from_gdb(gdb)
+        self.assertEqual([item.name for item in catalog.of_type('FeatureClass', 'Table')]
+                        ,['nybb'])
+        self.assertNotIn('neighborhooddata', gdbtable.table_ids(gdb))
+
+    def test_ccopysharded(self):
+
+        gdbout = os.path.join(self.tempdir, 'out.gdb')
+        shards = [shard_loader.Shard('boroughs', None, ['nybb'], 0)
+                 ,shard_loader.Shard('neighborhoods'
+                                    ,None
+                                    ,['NEIGHBORHOODS', 'neighborhooddata']
+                                    ,0)]
+        results = shard_loader.copy_sharded(self.xlsx
+                                           ,self.samplegdb
+                                           ,gdbout
+                                           ,shards
+                                           ,workers=2)
+        self.assertEqual([result.name for result in results]
+                        ,['boroughs', 'neighborhoods'])
+        for name in ('nybb', 'NEIGHBORHOODS', 'neighborhooddata'):
+            self.assertEqual(self.backend.get_count(os.path.join(gdbout, name))
+                            ,self.backend.get_count(os.path.join(self.samplegdb, name)))
+        self.assertIn('boroughs', shard_loader.format_results(results))
+        # shard work is cleaned up
+        self.assertEqual(sorted(os.listdir(self.tempdir)), ['out.gdb', 'sample.xlsx'])
+
+    def test_dattributed(self):
+
+        # sample.gdb has no relationship classes, pretend NEIGHBORHOODS
+        # is the table of an attributed one. It is in no shard and is
+        # loaded after the relationship classes are created
+        gdbout = os.path.join(self.tempdir, 'out.gdb')
+        shards = [shard_loader.Shard('boroughs', None, ['nybb'], 0)
+                 ,shard_loader.Shard('neighborhoods', None, ['neighborhooddata'], 0)]
+        plan = relclass_plan.Plan(
+            {'NEIGHBORHOODS': {'origin_table': 'nybb'
+                              ,'destination_table': 'neighborhooddata'
+                              ,'out_relationship_class': 'NEIGHBORHOODS'
+                              ,'attributed': 'ATTRIBUTED'}})
+        with mock.patch.object(relclass_plan.Plan
+                              ,'build'
+                              ,return_value=plan):
+            shard_loader.copy_sharded(self.xlsx
+                                     ,self.samplegdb
+                                     ,gdbout
+                                     ,shards
+                                     ,workers=2)
+        self.assertEqual(list(self.backend.relationship_classes(gdbout))
+                        ,['NEIGHBORHOODS'])
+        self.assertEqual(self.backend.get_count(os.path.join(gdbout, 'NEIGHBORHOODS'))
+                        ,self.backend.get_count(os.path.join(self.samplegdb, 'NEIGHBORHOODS')))
+
+if __name__ == '__main__':
+    unittest.main()
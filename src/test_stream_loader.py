@@ -0,0 +1,157 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import filegeodatabase_manager
+import gdbbackend
+import stream_loader
+import xlsx_manager
+
+class StreamLoaderTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.samplegdb = os.path.join(self.testdatadir
+                                     ,'sample.gdb')
+
+    def setUp(self):
+
+        # local backend, the stream reads what the stand-in writes
+        self.previous = gdbbackend._current
+        gdbbackend.use('local')
+        self.tempdir = tempfile.mkdtemp()
+        self.xlsx = xlsx_manager.ExcelFile(os.path.join(self.tempdir, 'in.xlsx'))
+        self.xlsx.generate_from_geodatabase(self.samplegdb)
+
+    def tearDown(self):
+
+        gdbbackend._current = self.previous
+        shutil.rmtree(self.tempdir)
+
+    def empty(self
+             ,name
+             ,srid):
+
+        # an empty gdb in srid and its cross reference
+        gdb = os.path.join(self.tempdir, name + '.gdb')
+        xref = os.path.join(self.tempdir, name + '_xref.gdb')
+        with self.xlsx.copy(os.path.join(self.tempdir, name + '.xlsx')) as xlsx:
+            xlsx.update_all_spatial_reference(srid)
+        xlsx.generate_to_geodatabase(gdb)
+        gdbbackend.get().create_cross_reference_geodatabase(self.samplegdb
+                                                           ,gdb
+                                                           ,xref)
+        return gdb, xref
+
+    def test_astream(self):
+
+        gdb, xref = self.empty('out', 2263)
+        reports = []
+        results = stream_loader.stream_load(xref
+                                           ,self.samplegdb
+                                           ,gdb
+                                           ,batch_size=2
+                                           ,report=lambda *args: reports.append(args))
+        self.assertEqual(stream_loader.failures(results), [])
+        source = filegeodatabase_manager.LocalGDB(self.samplegdb)
+        target = filegeodatabase_manager.LocalGDB(gdb)
+        for result in results:
+            self.assertEqual(result.rows, source.count(result.name))
+            self.assertEqual(target.count(result.name), source.count(result.name))
+        self.assertIn(('nybb', 5, 5), [report[:3] for report in reports])
+        with source.table('nybb') as a, target.table('nybb') as b:
+            self.assertEqual(list(a.rows(['BoroName'])), list(b.rows(['BoroName'])))
+        np.testing.assert_allclose(target.geometries('nybb').coords
+                                  ,source.geometries('nybb').coords
+                                  ,atol=1e-3)
+
+    def test_breproject(self):
+
+        # same rows and shapes as LoadData into the same empty gdb
+        streamed, xref = self.empty('streamed', 6539)
+        loaded, loadxref = self.empty('loaded', 6539)
+        stream_loader.stream_load(xref
+                                 ,self.samplegdb
+                                 ,streamed
+                                 ,batch_size=3)
+        gdbbackend.get().load_data(loadxref
+                                  ,self.samplegdb
+                                  ,loaded)
+        streamed = filegeodatabase_manager.LocalGDB(streamed)
+        loaded = filegeodatabase_manager.LocalGDB(loaded)
+        self.assertEqual(streamed.size(), loaded.size())
+        np.testing.assert_array_equal(streamed.geometries('nybb').coords
+                                     ,loaded.geometries('nybb').coords)
+
+    def test_cfailure(self):
+
+        # a bad table fails alone, the rest load
+        gdb, xref = self.empty('out', 2263)
+        fieldmap = {'BoroName': 'nosuchfield'}
+        results = []
+        for name in ('nybb', 'neighborhooddata'):
+            try:
+                results.append(stream_loader.stream_table(self.samplegdb
+                                                         ,name
+                                                         ,gdb
+                                                         ,name
+                                                         ,fieldmap if name == 'nybb' else None))
+            except ValueError as e:
+                results.append(str(e))
+        self.assertEqual(results, ['no source for BoroName', 2])
+        self.assertEqual(filegeodatabase_manager.LocalGDB(gdb).count('nybb'), 0)
+
+    def test_dinsertfails(self):
+
+        # an insert that raises while the reader is still busy comes back
+        # as that exception, no stage is left waiting on a queue
+        gdb, _ = self.empty('out', 2263)
+        backend = gdbbackend.get()
+        inserter = backend.inserter
+        reader = stream_loader.read_batches
+
+        class Failing(object):
+            def __init__(self, target, fields):
+                self.inserter = inserter(target, fields)
+            def insert(self, rows, geometry=None):
+                raise RuntimeError('insert failed')
+            def close(self):
+                self.inserter.close()
+
+        def slow(*args):
+            for batch in reader(*args):
+                time.sleep(0.2)
+                yield batch
+
+        backend.inserter = Failing
+        stream_loader.read_batches = slow
+        outcome = []
+
+        def run():
+            try:
+                stream_loader.stream_table(self.samplegdb, 'nybb', gdb, 'nybb'
+                                          ,batch_size=1
+                                          ,queue_size=1)
+            except RuntimeError as e:
+                outcome.append(str(e))
+
+        try:
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            thread.join(10)
+        finally:
+            del backend.inserter
+            stream_loader.read_batches = reader
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(outcome, ['insert failed'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import filegeodatabase_manager
+import gdbtrash
+import table_loader
+
+class TableLoaderTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.sourcepath = os.path.join(self.testdatadir
+                                      ,'sample.gdb')
+        self.tempdir = tempfile.mkdtemp()
+
+    def setUp(self):
+
+        # same schema on both sides, the loader truncates and appends
+        self.targetpath = os.path.join(self.tempdir, 'target.gdb')
+        filegeodatabase_manager.LocalGDB(self.sourcepath).copy(self.targetpath)
+        self.target = filegeodatabase_manager.LocalGDB(self.targetpath)
+
+    def tearDown(self):
+
+        self.target.clean()
+
+    @classmethod
+    def tearDownClass(self):
+
+        # the cleaned gdbs may still be in the trash inside tempdir
+        gdbtrash.wait()
+        shutil.rmtree(self.tempdir)
+
+    def test_aschedule(self):
+
+        tasks = table_loader.schedule(self.sourcepath
+                                     ,self.targetpath
+                                     ,['neighborhooddata', 'NYBB'])
+        # nybb is the big one
+        self.assertEqual([task.name for task in tasks]
+                        ,['nybb', 'neighborhooddata'])
+        self.assertEqual(tasks[0].target
+                        ,os.path.join(self.targetpath, 'nybb'))
+        self.assertGreater(tasks[0].size, tasks[1].size)
+
+    def test_bload(self):
+
+        tasks = table_loader.schedule(self.sourcepath
+                                     ,self.targetpath
+                                     ,['nybb', 'neighborhooddata'])
+        results = table_loader.load_tables(tasks, workers=2)
+        self.assertEqual([result.name for result in results]
+                        ,[task.name for task in tasks])
+        self.assertEqual(results[0].rows, 5)
+        self.assertEqual(table_loader.failures(results), [])
+        self.assertEqual(self.target.count('nybb'), 5)
+
+    def test_cretry(self):
+
+        task = table_loader.LoadTask('missing'
+                                    ,os.path.join(self.sourcepath, 'missing')
+                                    ,os.path.join(self.targetpath, 'missing')
+                                    ,0)
+        results = table_loader.load_tables([task]
+                                          ,workers=1
+                                          ,retries=1
+                                          ,backoff=0)
+        self.assertEqual(results[0].attempts, 2)
+        self.assertIsNone(results[0].rows)
+        self.assertEqual(table_loader.failures(results), results)
+        self.assertIn('failed after 2 attempts'
+                     ,table_loader.format_results(results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+
+import filegeodatabase_manager
+import tracing
+
+class TracingTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.tempdir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(self):
+
+        shutil.rmtree(self.tempdir)
+
+    def setUp(self):
+
+        self.tracer = tracing.enable()
+        self.tracer.clear()
+
+    def tearDown(self):
+
+        tracing.disable()
+        self.tracer.clear()
+
+    def test_anesting(self):
+
+        with tracing.span('outer') as outer:
+            with tracing.span('inner', 'count', table='nybb'):
+                tracing.count(rows=5, items=1)
+            tracing.count(items=2)
+        self.assertEqual(outer.items, 2)
+        inner, outer = self.tracer.spans
+        self.assertEqual((inner.name, inner.depth, inner.rows), ('inner', 1, 5))
+        self.assertEqual(outer.depth, 0)
+        self.assertGreaterEqual(outer.wall, inner.wall)
+        self.assertIsNone(self.tracer.current())
+
+    def test_bchrometrace(self):
+
+        samplegdb = filegeodatabase_manager.LocalGDB(
+            os.path.join(self.testdatadir, 'sample.gdb'))
+        self.assertEqual(samplegdb.count('nybb'), 5)
+        path = os.path.join(self.tempdir, 'trace.json')
+        self.tracer.save(path)
+        with open(path) as f:
+            events = json.load(f)['traceEvents']
+        complete = [event for event in events if event['ph'] == 'X']
+        self.assertEqual(complete[0]['name'], 'LocalGDB.count')
+        self.assertEqual(complete[0]['cat'], 'count')
+        self.assertEqual(complete[0]['args']['rows'], 5)
+        self.assertIn('cpu_ms', complete[0]['args'])
+
+    def test_csummary(self):
+
+        for _ in range(3):
+            with tracing.span('load'):
+                tracing.count(rows=10)
+        with self.assertRaises(ValueError):
+            with tracing.span('fail'):
+                raise ValueError('boom')
+        summary = {row.name: row for row in self.tracer.summary()}
+        self.assertEqual(summary['load'].calls, 3)
+        self.assertEqual(summary['load'].rows, 30)
+        self.assertAlmostEqual(sum(row.share for row in summary.values()), 1.0)
+        self.assertEqual(self.tracer.spans[-1].args['error'], 'ValueError')
+        self.assertIn('load', self.tracer.format_summary())
+
+    def test_ddisabled(self):
+
+        tracing.disable()
+        with tracing.span('nothing') as span:
+            span.count(rows=1)
+        tracing.finish(tracing.start('nothing'))
+        self.assertEqual(self.tracer.spans, [])
+
+    def test_eobserver(self):
+
+        class Observer(object):
+            def __init__(self):
+                self.seen = []
+            def on_start(self, span):
+                self.seen.append(('start', span.name))
+            def on_end(self, span):
+                self.seen.append(('end', span.name))
+
+        observer = Observer()
+        self.tracer.add_observer(observer)
+        try:
+            span = tracing.start('stage')
+            tracing.finish(span)
+        finally:
+            self.tracer.remove_observer(observer)
+        self.assertEqual(observer.seen, [('start', 'stage'), ('end', 'stage')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import gdbbackend
+import workflow
+
+class WorkflowTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.testdatadir = os.path.join(os.path.dirname(os.path.abspath(__file__))
+                                       ,'testdata')
+        self.samplegdb = os.path.join(self.testdatadir
+                                     ,'sample.gdb')
+
+    def setUp(self):
+
+        self.tempdir = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.tempdir, 'checkpoint.json')
+        self.source = os.path.join(self.tempdir, 'source.txt')
+        with open(self.source, 'w') as f:
+            f.write('one')
+        self.ran = []
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tempdir)
+
+    def chain(self
+             ,fail=None):
+
+        # source.txt -> a.txt -> b.txt -> c.txt
+        steps = workflow.Workflow(self.checkpoint)
+
+        def writer(name, frompath):
+            def run():
+                self.ran.append(name)
+                if name == fail:
+                    raise RuntimeError('{0} failed'.format(name))
+                with open(frompath) as f:
+                    text = f.read()
+                with open(os.path.join(self.tempdir, name + '.txt'), 'w') as f:
+                    f.write(text + name)
+            return run
+
+        previous = self.source
+        for name in ('a', 'b', 'c'):
+            output = os.path.join(self.tempdir, name + '.txt')
+            steps.add(workflow.Step(name
+                                   ,writer(name, previous)
+                                   ,requires=[] if name == 'a' else [chr(ord(name) - 1)]
+                                   ,inputs=[self.source] if name == 'a' else []
+                                   ,outputs=[output]))
+            previous = output
+        return steps
+
+    def test_aresume(self):
+
+        results = self.chain().run()
+        self.assertEqual([result.action for result in results], ['ran'] * 3)
+        self.assertEqual(self.chain().plan(), [])
+        self.assertEqual(self.chain().plan(force=['c']), [('c', 'forced')])
+        self.chain().run()
+        self.assertEqual(self.ran, ['a', 'b', 'c'])
+
+        # an edited output reruns its step and what follows
+        with open(os.path.join(self.tempdir, 'b.txt'), 'w') as f:
+            f.write('edited')
+        self.assertEqual(self.chain().plan()
+                        ,[('b', 'output changed {0}'.format(
+                            os.path.join(self.tempdir, 'b.txt')))
+                         ,('c', 'upstream reran')])
+
+        # a changed input reruns everything
+        with open(self.source, 'w') as f:
+            f.write('two')
+        self.assertEqual([name for name, _ in self.chain().plan()], ['a', 'b', 'c'])
+
+    def test_bfailure(self):
+
+        self.chain().run()
+        with open(self.source, 'w') as f:
+            f.write('two')
+        self.ran = []
+        with self.assertRaises(RuntimeError):
+            self.chain(fail='b').run()
+        self.assertEqual(self.ran, ['a', 'b'])
+        steps = self.chain()
+        self.assertEqual(steps.status('a'), 'done')
+        self.assertEqual(steps.status('b'), 'failed')
+        self.assertIsNone(steps.status('c'))
+
+        # resume from the failed step, a is not redone
+        self.ran = []
+        results = steps.run()
+        self.assertEqual(self.ran, ['b', 'c'])
+        self.assertEqual(results[0].action, 'skipped')
+        with open(os.path.join(self.tempdir, 'c.txt')) as f:
+            self.assertEqual(f.read(), 'twoabc')
+
+    def test_crestart(self):
+
+        self.chain().run()
+        steps = self.chain(fail='c')
+        steps.steps['c'].restart = 'b'
+        steps.steps['c'].inputs = [self.source]
+        with open(self.source, 'w') as f:
+            f.write('two')
+        with self.assertRaises(RuntimeError):
+            steps.run()
+        self.assertEqual([name for name, _ in self.chain().plan()], ['b', 'c'])
+
+    def test_dreprojection(self):
+
+        # the six steps on the local backend, a failed table load resumes
+        # at the table load
+        previous = gdbbackend._current
+        gdbbackend.use('local')
+        try:
+            gdbout = os.path.join(self.tempdir, 'out.gdb')
+            steps = workflow.reprojection(self.samplegdb
+                                         ,gdbout
+                                         ,self.tempdir
+                                         ,2263
+                                         ,workers=1)
+            results = steps.run()
+            self.assertEqual([result.action for result in results], ['ran'] * 6)
+            self.assertTrue(os.path.exists(os.path.join(gdbout, 'gdb')))
+
+            steps = workflow.reprojection(self.samplegdb
+                                         ,gdbout
+                                         ,self.tempdir
+                                         ,2263
+                                         ,workers=1)
+            self.assertEqual(steps.plan(), [])
+
+            def failing():
+                raise RuntimeError('bad table')
+            steps.steps['load_tables'].run = failing
+            with self.assertRaises(RuntimeError):
+                steps.run(force=['load_tables'])
+
+            steps = workflow.reprojection(self.samplegdb
+                                         ,gdbout
+                                         ,self.tempdir
+                                         ,2263
+                                         ,workers=1)
+            self.assertEqual(steps.plan(), [('load_tables', 'failed')])
+            self.assertEqual([result.action for result in steps.run()]
+                            ,['skipped'] * 5 + ['ran'])
+
+            steps = workflow.reprojection(self.samplegdb
+                                         ,gdbout
+                                         ,self.tempdir
+                                         ,6539
+                                         ,workers=1)
+            self.assertEqual([name for name, _ in steps.plan()]
+                            ,['tweak_xlsx'
+                             ,'create_gdb'
+                             ,'load_data'
+                             ,'create_relclasses'
+                             ,'load_tables'])
+        finally:
+            gdbbackend._current = previous
+
+    def test_esourcechanges(self):
+
+        # files touched in the source rerun nothing, an edited table
+        # reruns the table load only
+        previous = gdbbackend._current
+        backend = gdbbackend.use('local')
+        try:
+            gdbin = os.path.join(self.tempdir, 'in.gdb')
+            gdbout = os.path.join(self.tempdir, 'out.gdb')
+            shutil.copytree(self.samplegdb, gdbin)
+            workflow.reprojection(gdbin, gdbout, self.tempdir, 2263, workers=1).run()
+
+            for name in os.listdir(gdbin):
+                os.utime(os.path.join(gdbin, name))
+            steps = workflow.reprojection(gdbin, gdbout, self.tempdir, 2263, workers=1)
+            self.assertEqual(steps.plan(), [])
+
+            backend.append(os.path.join(self.samplegdb, 'neighborhooddata')
+                          ,os.path.join(gdbin, 'neighborhooddata'))
+            steps = workflow.reprojection(gdbin, gdbout, self.tempdir, 2263, workers=1)
+            self.assertEqual(steps.plan(), [('load_tables', 'inputs changed')])
+            steps.run()
+            self.assertEqual(backend.get_count(os.path.join(gdbout, 'neighborhooddata'))
+                            ,backend.get_count(os.path.join(gdbin, 'neighborhooddata')))
+        finally:
+            gdbbackend._current = previous
+
+if __name__ == '__main__':
+    unittest.main()
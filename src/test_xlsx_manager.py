@@ -3,16 +3,22 @@ import os
 import openpyxl
 from pathlib import Path
 import tempfile
+from unittest import mock
 
+import filecache
 import filegeodatabase_manager
+import gdbbackend
+import relclass_plan
+import reprojection_manifest
 import xlsx_manager
+import xlsx_schema
 
 class XlsxManagerTestCase(unittest.TestCase):
 
     @classmethod
     def setUpClass(self):
 
-        self.tempdir     = Path(os.environ['TEMP'])
+        self.tempdir     = Path(tempfile.gettempdir())
         self.testdatadir = os.path.join(
             os.path.dirname(os.path.abspath(__file__))
            ,'testdata')
@@ -97,7 +103,222 @@ class XlsxManagerTestCase(unittest.TestCase):
                                      ,self.outgdb.gdb)
         self.assertTrue(self.outgdb.exists())
 
+    def test_gprojection(self):
 
+        # 2263 and 6539 share LCC parameters, origin maps to false easting
+        for srid in (2263, 6539):
+            lcc = self.testxlsx.projection(srid)
+            xy = lcc.forward([[-74.0, 40.16666666666666]])
+            self.assertAlmostEqual(xy[0][0], 984250.0, places=6)
+            self.assertAlmostEqual(xy[0][1], 0.0, places=6)
+
+    def test_hauditresolution(self):
+
+        results = self.testxlsx.audit_resolution(self.ingdb.gdb, 2263)
+        self.assertEqual(results[0].name, 'nybb')
+        self.assertEqual(results[0].collapsed, 0)
+
+    def test_isession(self):
+
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb)
+        with self.testxlsx as session:
+            session.update_all_spatial_reference(2263)
+            session.update_all_spatial_reference(6539)
+            # sample.gdb is 2263 and nothing is written yet
+            ondisk = openpyxl.load_workbook(self.testxlsxpath)
+            self.assertNotEqual(ondisk['SpatialReferences']['C2'].value, 6539)
+        ondisk = openpyxl.load_workbook(self.testxlsxpath)
+        self.assertEqual(ondisk['SpatialReferences']['C2'].value, 6539)
+
+    def test_jlazycopy(self):
+
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb)
+        outxlsx = self.testxlsx.copy(self.outxlsxpath)
+        self.assertIsNone(outxlsx._workbook)
+        self.assertIn('SpatialReferences', outxlsx.workbook.sheetnames)
+        outxlsx.delete()
+
+    def test_kstreaming(self):
+
+        # same result as the openpyxl path without parsing the workbook
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb)
+        self.testxlsx.update_all_spatial_reference(6539
+                                                  ,streaming=True)
+        self.assertIsNone(self.testxlsx._workbook)
+        ws = self.testxlsx.workbook['SpatialReferences']
+        self.assertEqual(ws['C2'].value, 6539)
+        self.assertEqual(ws['K2'].value
+                        ,'3048.006096012195121164435877261997627062')
+        self.testxlsx.generate_to_geodatabase(self.outgdb.gdb)
+        self.assertTrue(self.outgdb.exists())
+
+    def test_lschema(self):
+
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb)
+        schema = self.testxlsx.schema()
+        self.assertEqual(len(schema.objectclasses.named('nybb')), 1)
+        self.testxlsx.update_all_spatial_reference(6539)
+        schema = self.testxlsx.schema()
+        self.assertEqual(schema.spatialreferences.get(1).wkid, 6539)
+
+    def test_mgeneratecache(self):
+
+        # the second generate is a cache hit with the same bytes
+        cache = filecache.FileCache(os.path.join(self.tempdir, 'xlsxcache'))
+        cache.clear()
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb
+                                               ,cache=cache)
+        self.assertEqual(len(cache.entries()), 1)
+        with open(self.testxlsxpath, 'rb') as f:
+            generated = f.read()
+        self.testxlsx.delete()
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb
+                                               ,cache=cache)
+        with open(self.testxlsxpath, 'rb') as f:
+            self.assertEqual(f.read(), generated)
+        cache.clear()
+
+    def test_mgeneratecachepath(self):
+
+        # the cached workbook says nothing about where its source is,
+        # a hit from another copy of the same schema loads from that copy
+        cache = filecache.FileCache(os.path.join(self.tempdir, 'xlsxcache'))
+        cache.clear()
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb
+                                               ,cache=cache)
+        (entry, _, _), = cache.entries()
+        self.assertTrue(os.path.basename(entry).startswith(
+            gdbbackend.get().name + '-'))
+        if gdbbackend.get().name == 'local':
+            template = openpyxl.load_workbook(entry)['_LocalTemplate']
+            self.assertIsNone(template['A2'].value)
+        self.testxlsx.delete()
+        self.ingdb.copy(self.outgdbpath)
+        self.testxlsx.generate_from_geodatabase(self.outgdb.gdb
+                                               ,cache=cache)
+        self.assertEqual(len(cache.entries()), 1)
+        if gdbbackend.get().name == 'local':
+            template = openpyxl.load_workbook(self.testxlsxpath)['_LocalTemplate']
+            self.assertEqual(template['A2'].value
+                            ,os.path.abspath(self.outgdb.gdb))
+        cache.clear()
+
+    def test_nincremental(self):
+
+        # the first run is a full load, the second reloads nothing
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb)
+        manifest = reprojection_manifest.Manifest.for_gdb(self.outgdb.gdb)
+        manifest.remove()
+        self.assertIsNone(self.testxlsx.copygeodatabase(self.ingdb.gdb
+                                                       ,self.outgdb.gdb
+                                                       ,incremental=True))
+        # a regenerated workbook is the same schema in different bytes
+        generated = xlsx_schema.file_sha256(self.testxlsxpath)
+        self.testxlsx.delete()
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb)
+        wb = openpyxl.load_workbook(self.testxlsxpath)
+        wb.properties.creator = 'someone else'
+        wb.save(self.testxlsxpath)
+        self.assertNotEqual(xlsx_schema.file_sha256(self.testxlsxpath), generated)
+        self.assertEqual(self.testxlsx.copygeodatabase(self.ingdb.gdb
+                                                      ,self.outgdb.gdb
+                                                      ,incremental=True)
+                        ,[])
+        self.assertEqual(self.outgdb.count('nybb'), 5)
+        manifest.remove()
+
+    def test_nincrementalsheet(self):
+
+        # an edit to a sheet outside the schema model is a new schema
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb)
+        manifest = reprojection_manifest.Manifest.for_gdb(self.outgdb.gdb)
+        manifest.remove()
+        self.testxlsx.copygeodatabase(self.ingdb.gdb
+                                     ,self.outgdb.gdb
+                                     ,incremental=True)
+        wb = openpyxl.load_workbook(self.testxlsxpath)
+        wb.create_sheet('Subtypes').append(['ID', 'ObjectClassID', 'Code'])
+        wb.save(self.testxlsxpath)
+        self.assertIsNone(self.testxlsx.copygeodatabase(self.ingdb.gdb
+                                                       ,self.outgdb.gdb
+                                                       ,incremental=True))
+        self.assertEqual(self.outgdb.count('nybb'), 5)
+        manifest.remove()
+
+    def test_osharded(self):
+
+        # the sample has no relationship classes, the plan gets one
+        # sharded loads stream too
+        plan = relclass_plan.Plan(
+            {'nybb_neighborhooddata': {'origin_table': 'nybb'
+                                      ,'destination_table': 'neighborhooddata'
+                                      ,'out_relationship_class': 'nybb_neighborhooddata'
+                                      ,'attributed': 'NONE'}})
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb)
+        for streaming in (False, True):
+            self.outgdb.clean()
+            with mock.patch.object(relclass_plan.Plan
+                                  ,'build'
+                                  ,return_value=plan):
+                self.testxlsx.copygeodatabase(self.ingdb.gdb
+                                             ,self.outgdb.gdb
+                                             ,sharded=True
+                                             ,workers=2
+                                             ,streaming=streaming)
+            self.assertEqual(self.outgdb.count('nybb'), 5)
+            self.assertEqual(list(gdbbackend.get().relationship_classes(self.outgdb.gdb))
+                            ,['nybb_neighborhooddata'])
+
+    def test_pstreaming(self):
+
+        self.testxlsx.generate_from_geodatabase(self.ingdb.gdb)
+        self.testxlsx.update_all_spatial_reference(6539)
+        self.testxlsx.copygeodatabase(self.ingdb.gdb
+                                     ,self.outgdb.gdb
+                                     ,streaming=True)
+        self.assertEqual(self.outgdb.count('nybb'), 5)
+
+    def test_qxrefcache(self):
+
+        # the second load into the same schema reuses the cross reference
+        # even from a workbook generated again, in different bytes. Any
+        # edit to the workbook is a new schema
+        cache = filecache.FileCache(os.path.join(self.tempdir, 'xrefcache'))
+        cache.clear()
+        backend = gdbbackend.get()
+        created = []
+        create = backend.create_cross_reference_geodatabase
+        backend.create_cross_reference_geodatabase = \
+            lambda *args: created.append(args) or create(*args)
+        try:
+            for creator in ('first', 'second'):
+                self.testxlsx.delete()
+                self.testxlsx.generate_from_geodatabase(self.ingdb.gdb)
+                wb = openpyxl.load_workbook(self.testxlsxpath)
+                wb.properties.creator = creator
+                wb.save(self.testxlsxpath)
+                self.outgdb.clean()
+                self.testxlsx.generate_to_geodatabase(self.outgdb.gdb)
+                self.testxlsx.load_data(self.ingdb.gdb
+                                       ,self.outgdb.gdb
+                                       ,cache=cache)
+                self.assertEqual(self.outgdb.count('nybb'), 5)
+            self.assertEqual(len(created), 1)
+
+            # an edit to a sheet outside the schema model misses
+            wb = openpyxl.load_workbook(self.testxlsxpath)
+            wb.create_sheet('Subtypes').append(['ID', 'ObjectClassID', 'Code'])
+            wb.save(self.testxlsxpath)
+            self.outgdb.clean()
+            self.testxlsx.generate_to_geodatabase(self.outgdb.gdb)
+            self.testxlsx.load_data(self.ingdb.gdb
+                                   ,self.outgdb.gdb
+                                   ,cache=cache)
+        finally:
+            del backend.create_cross_reference_geodatabase
+        self.assertEqual(len(created), 2)
+        self.assertEqual(len(cache.entries()), 2)
+        cache.clear()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,147 @@
+import unittest
+import os
+import shutil
+import struct
+import tempfile
+import zipfile
+import openpyxl
+
+import xlsx_patcher
+
+class XlsxPatcherTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.tempdir = tempfile.mkdtemp()
+
+    def setUp(self):
+
+        # the three sheets update_all_spatial_reference touches
+        # plus one it does not, shaped like GenerateExcelFromGeodatabase output
+        self.xlsx = os.path.join(self.tempdir, 'schema.xlsx')
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = 'SpatialReferences'
+        ws.append(['ID', 'Name', 'WKID', 'WKT'])
+        ws.append([1, 'old', 2263, 'PROJCS["old"]'])
+        ws.append([2, 'older', 4326, 'GEOGCS["older"]'])
+        ws = wb.create_sheet('DatasetContainers')
+        ws.append(['ID', 'Name', 'Type', 'Alias', 'SpatialReferenceID'])
+        ws.append([1, 'fd', 'FeatureDataset', 'fd', 2])
+        ws.append([2, 'other', 'FeatureDataset', 'other', -1])
+        ws = wb.create_sheet('ObjectClasses')
+        ws.append(['ID', 'Name', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'SR'])
+        ws.append([1, 'nybb', 1, 1, 1, 1, 1, 1, 1, 2])
+        ws.append([2, 'table', 1, 1, 1, 1, 1, 1, 1, None])
+        ws = wb.create_sheet('Fields')
+        ws.append(['ID', 'Name'])
+        ws.append([1, 'BoroName'])
+        wb.save(self.xlsx)
+
+    @classmethod
+    def tearDownClass(self):
+
+        shutil.rmtree(self.tempdir)
+
+    def patch(self):
+
+        def point_at_1(value):
+            if value and value != -1:
+                return 1
+            return value
+
+        return xlsx_patcher.patch_workbook(
+            self.xlsx
+           ,{'SpatialReferences': xlsx_patcher.SheetPatch(
+                rows={'A2': 1, 'B2': 'new & "improved"', 'C2': 6539})
+            ,'DatasetContainers': xlsx_patcher.SheetPatch(
+                columns={'E': point_at_1})
+            ,'ObjectClasses': xlsx_patcher.SheetPatch(
+                columns={'J': point_at_1})})
+
+    def test_asheetpaths(self):
+
+        with zipfile.ZipFile(self.xlsx) as archive:
+            paths = xlsx_patcher.sheet_paths(archive)
+        self.assertEqual(paths['SpatialReferences'], 'xl/worksheets/sheet1.xml')
+        self.assertEqual(paths['Fields'], 'xl/worksheets/sheet4.xml')
+
+    def test_bpatch(self):
+
+        changed = self.patch()
+        self.assertEqual(changed['SpatialReferences'], 3)
+        self.assertEqual(changed['DatasetContainers'], 1)
+        self.assertEqual(changed['ObjectClasses'], 1)
+
+        wb = openpyxl.load_workbook(self.xlsx)
+        ws = wb['SpatialReferences']
+        self.assertEqual(ws['C1'].value, 'WKID')
+        self.assertEqual(ws['B2'].value, 'new & "improved"')
+        self.assertEqual(ws['C2'].value, 6539)
+        self.assertIsNone(ws['D2'].value)
+        self.assertIsNone(ws['A3'].value)
+        self.assertEqual(wb['DatasetContainers']['E2'].value, 1)
+        self.assertEqual(wb['DatasetContainers']['E3'].value, -1)
+        self.assertEqual(wb['ObjectClasses']['J2'].value, 1)
+        self.assertIsNone(wb['ObjectClasses']['J3'].value)
+
+    def test_cuntouched(self):
+
+        with zipfile.ZipFile(self.xlsx) as archive:
+            before = {name: archive.read(name) for name in archive.namelist()}
+        self.patch()
+        with zipfile.ZipFile(self.xlsx) as archive:
+            after = {name: archive.read(name) for name in archive.namelist()}
+
+        self.assertEqual(sorted(before), sorted(after))
+        for name in ('xl/worksheets/sheet4.xml'
+                    ,'xl/styles.xml'
+                    ,'xl/workbook.xml'):
+            self.assertEqual(before[name], after[name])
+        self.assertNotEqual(before['xl/worksheets/sheet1.xml']
+                           ,after['xl/worksheets/sheet1.xml'])
+
+    def test_cuntouchedraw(self):
+
+        # untouched entries keep their crc and compressed bytes
+        before = self.compressed()
+        self.patch()
+        after = self.compressed()
+        for name in ('xl/worksheets/sheet4.xml'
+                    ,'xl/styles.xml'
+                    ,'xl/workbook.xml'
+                    ,'[Content_Types].xml'):
+            self.assertEqual(before[name], after[name])
+        self.assertNotEqual(before['xl/worksheets/sheet1.xml']
+                           ,after['xl/worksheets/sheet1.xml'])
+
+    def compressed(self):
+
+        # {name: (crc, compressed bytes)} read past each local header
+        entries = {}
+        with zipfile.ZipFile(self.xlsx) as archive, \
+             open(self.xlsx, 'rb') as f:
+            for info in archive.infolist():
+                f.seek(info.header_offset + 26)
+                namelength, extralength = struct.unpack('<2H', f.read(4))
+                f.seek(namelength + extralength, os.SEEK_CUR)
+                entries[info.filename] = (info.CRC
+                                         ,f.read(info.compress_size))
+        return entries
+
+    def test_dmissingsheet(self):
+
+        with zipfile.ZipFile(self.xlsx) as archive:
+            before = archive.read('xl/worksheets/sheet1.xml')
+        with self.assertRaises(ValueError):
+            xlsx_patcher.patch_workbook(
+                self.xlsx
+               ,{'Domains': xlsx_patcher.SheetPatch(rows={})})
+        with zipfile.ZipFile(self.xlsx) as archive:
+            self.assertEqual(archive.read('xl/worksheets/sheet1.xml'), before)
+        self.assertEqual(os.listdir(self.tempdir), ['schema.xlsx'])
+
+
+if __name__ == '__main__':
+    unittest.main()
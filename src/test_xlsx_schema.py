@@ -0,0 +1,126 @@
+import unittest
+import os
+import shutil
+import pickle
+import tempfile
+import openpyxl
+
+import xlsx_schema
+
+class XlsxSchemaTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+
+        self.tempdir  = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tempdir, 'cache')
+        self.xlsx     = os.path.join(self.tempdir, 'schema.xlsx')
+
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = 'SpatialReferences'
+        ws.append(['ID', 'Name', 'WKID', 'WKT'
+                  ,'E', 'F', 'G', 'H', 'I', 'J', 'XYScale'])
+        ws.append([1, 'NAD_1983_StatePlane_New_York_Long_Island_FIPS_3104_Feet'
+                  ,2263, 'PROJCS["x"]'
+                  ,None, -1, None, None, None, None
+                  ,'3048.006096012195121164435877261997627062'])
+        ws = wb.create_sheet('DatasetContainers')
+        ws.append(['ID', 'Name', 'Type', 'Alias', 'SpatialReferenceID'])
+        ws.append([1, 'Boroughs', 'FeatureDataset', 'Boroughs', 1])
+        ws = wb.create_sheet('ObjectClasses')
+        ws.append(['ID', 'Name', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'SR'])
+        ws.append([1, 'nybb', None, None, None, None, None, None, None, 1])
+        ws.append([2, 'neighborhooddata'])
+        ws = wb.create_sheet('Fields')
+        ws.append(['ID', 'ObjectClassID', 'FieldName', 'FieldType'])
+        ws.append([1, 1, 'BoroName', 'esriFieldTypeString'])
+        ws.append([2, 2, 'BoroName', 'esriFieldTypeString'])
+        ws.append([3, 1, 'GLOBALID', 'esriFieldTypeGlobalID'])
+        wb.save(self.xlsx)
+
+    @classmethod
+    def tearDownClass(self):
+
+        shutil.rmtree(self.tempdir)
+
+    def test_amodel(self):
+
+        model = xlsx_schema.SchemaModel.from_xlsx(self.xlsx)
+        sr = model.spatialreferences.get(1)
+        self.assertEqual(sr.wkid, 2263)
+        self.assertEqual(float(sr.xyscale), 3048.006096012195)
+        # header lookup, then the fallback column (J) with no SR header
+        self.assertEqual(model.datasetcontainers.get(1).spatialreference_id, 1)
+        self.assertEqual(model.objectclasses.named('NYBB')[0].spatialreference_id
+                        ,1)
+        self.assertIsNone(model.objectclasses.get(2).spatialreference_id)
+        # Fields names come from FieldName, not column B
+        self.assertEqual(len(model.fields.named('boroname')), 2)
+        globalid = model.fields.named('GLOBALID')[0]
+        self.assertEqual(globalid.objectclass_id, 1)
+        self.assertEqual(model.fields.value(globalid, 'FieldType')
+                        ,'esriFieldTypeGlobalID')
+        # no Domains sheet
+        self.assertEqual(len(model.domains), 0)
+
+    def test_bmissingid(self):
+
+        model = xlsx_schema.SchemaModel.from_xlsx(self.xlsx)
+        with self.assertRaises(KeyError):
+            model.objectclasses.get(99)
+        self.assertEqual(model.objectclasses.named('nope'), [])
+
+    def test_ccache(self):
+
+        model = xlsx_schema.load(self.xlsx, self.cachedir)
+        cachefile = os.path.join(self.cachedir
+                                ,'{0}.pickle'.format(model.sha256))
+        self.assertTrue(os.path.exists(cachefile))
+
+        cached = xlsx_schema.load(self.xlsx, self.cachedir)
+        self.assertEqual(cached.sha256, model.sha256)
+        self.assertEqual(cached.fields.named('GLOBALID')[0].objectclass_id, 1)
+        self.assertEqual(cached.spatialreferences.get(1).wkid, 2263)
+
+    def test_dstalecache(self):
+
+        # an old cache version is rebuilt, not trusted
+        sha256 = xlsx_schema.file_sha256(self.xlsx)
+        os.makedirs(self.cachedir, exist_ok=True)
+        cachefile = os.path.join(self.cachedir, '{0}.pickle'.format(sha256))
+        with open(cachefile, 'wb') as f:
+            pickle.dump((0, sha256, {}), f)
+
+        model = xlsx_schema.load(self.xlsx, self.cachedir)
+        self.assertEqual(model.spatialreferences.get(1).wkid, 2263)
+        self.assertEqual(xlsx_schema.SchemaModel.load(cachefile).sha256, sha256)
+
+    def test_ebrokencache(self):
+
+        # any cache file that does not load is rebuilt
+        sha256 = xlsx_schema.file_sha256(self.xlsx)
+        os.makedirs(self.cachedir, exist_ok=True)
+        cachefile = os.path.join(self.cachedir, '{0}.pickle'.format(sha256))
+        with open(cachefile, 'wb') as f:
+            f.write(b'cxlsx_schema\nNoSuchClass\n.')
+
+        model = xlsx_schema.load(self.xlsx, self.cachedir)
+        self.assertEqual(model.spatialreferences.get(1).wkid, 2263)
+        self.assertEqual(xlsx_schema.SchemaModel.load(cachefile).sha256, sha256)
+
+    @unittest.skipUnless(os.name == 'posix', 'posix permissions')
+    def test_fprivatecache(self):
+
+        # the cache directory is the owner's alone, even one made before
+        cachedir = os.path.join(self.tempdir, 'shared')
+        os.makedirs(cachedir)
+        os.chmod(cachedir, 0o777)
+        xlsx_schema.load(self.xlsx, cachedir)
+        self.assertEqual(os.stat(cachedir).st_mode & 0o777, 0o700)
+        self.assertNotIn(os.path.realpath(tempfile.gettempdir())
+                        ,os.path.realpath(xlsx_schema.default_cachedir()))
+
+
+if __name__ == '__main__':
+    unittest.main()
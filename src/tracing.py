@@ -0,0 +1,346 @@
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+import contextlib
+from collections import namedtuple
+
+# where the time goes: a span is one stage of the workflow with its wall
+# time, cpu time and the rows and items it handled. Spans nest per
+# thread. A trace exports as Chrome trace json (chrome://tracing or
+# ui.perfetto.dev) and summarizes as a table
+#
+# tracing is off until enable(), or GDB_TRACE=<trace.json> which enables
+# it for the whole process and writes the trace at exit. Off, a span
+# costs a function call
+#
+# cpu time is the whole process plus finished child processes (os.times)
+# so arcpy tools that run their own threads and the table loader pool
+# count. Concurrent spans in different threads each see all of it
+
+SummaryRow = namedtuple('SummaryRow'
+                       ,['name'
+                        ,'calls'
+                        ,'wall'
+                        ,'cpu'
+                        ,'rows'
+                        ,'items'
+                        ,'share'])
+
+
+def _cpu():
+
+    times = os.times()
+    return (times.user
+          + times.system
+          + times.children_user
+          + times.children_system)
+
+
+class Span(object):
+
+    __slots__ = ('name'
+                ,'category'
+                ,'args'
+                ,'start'
+                ,'wall'
+                ,'cpu'
+                ,'rows'
+                ,'items'
+                ,'depth'
+                ,'tid'
+                ,'_cpu')
+
+    def __init__(self
+                ,name
+                ,category
+                ,args
+                ,depth):
+
+        self.name     = name
+        self.category = category
+        self.args     = args
+        self.depth    = depth
+        self.tid      = threading.get_ident()
+        self.rows     = 0
+        self.items    = 0
+        self.wall     = None
+        self.cpu      = None
+        self.start    = time.perf_counter()
+        self._cpu     = _cpu()
+
+    def count(self
+             ,rows=0
+             ,items=0):
+
+        self.rows  += rows or 0
+        self.items += items or 0
+
+    def __repr__(self):
+        return 'Span({0!r}, wall={1}, rows={2}, items={3})'.format(
+            self.name, self.wall, self.rows, self.items)
+
+
+class _NullSpan(object):
+
+    # what span() hands out while tracing is off
+
+    def count(self
+             ,rows=0
+             ,items=0):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class Tracer(object):
+
+    def __init__(self):
+
+        self.spans     = []
+        self.observers = []
+        self.origin    = time.perf_counter()
+        self._local    = threading.local()
+        self._lock     = threading.Lock()
+
+    def _stack(self):
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+
+        # innermost open span of this thread, or None
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def add_observer(self
+                    ,observer):
+
+        # observer.on_start(span) and observer.on_end(span) run in the
+        # span's thread, an exception from either propagates to the stage
+        self.observers.append(observer)
+
+    def remove_observer(self
+                       ,observer):
+
+        self.observers.remove(observer)
+
+    def start(self
+             ,name
+             ,category='stage'
+             ,**args):
+
+        # open a span, finish() closes it. A span never finished is
+        # never recorded
+        stack = self._stack()
+        span = Span(name, category, args, len(stack))
+        stack.append(span)
+        try:
+            for observer in self.observers:
+                observer.on_start(span)
+        except BaseException:
+            stack.pop()
+            raise
+        return span
+
+    def finish(self
+              ,span):
+
+        span.wall = time.perf_counter() - span.start
+        span.cpu  = _cpu() - span._cpu
+        stack = self._stack()
+        if span in stack:
+            del stack[stack.index(span):]
+        with self._lock:
+            self.spans.append(span)
+        for observer in self.observers:
+            observer.on_end(span)
+
+    @contextlib.contextmanager
+    def span(self
+            ,name
+            ,category='stage'
+            ,**args):
+
+        span = self.start(name, category, **args)
+        try:
+            yield span
+        except BaseException as e:
+            span.args['error'] = type(e).__name__
+            raise
+        finally:
+            self.finish(span)
+
+    def clear(self):
+
+        with self._lock:
+            self.spans = []
+        self.origin = time.perf_counter()
+
+    def chrome_trace(self):
+
+        # complete ('X') events, microseconds from the tracer origin
+        pid = os.getpid()
+        events = [{'name': 'process_name'
+                  ,'ph': 'M'
+                  ,'pid': pid
+                  ,'args': {'name': 'geodatabase_reproject'}}]
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        for span in spans:
+            args = dict(span.args)
+            args.update({'cpu_ms': round(span.cpu * 1000, 3)
+                        ,'rows': span.rows
+                        ,'items': span.items})
+            events.append({'name': span.name
+                          ,'cat': span.category
+                          ,'ph': 'X'
+                          ,'ts': round((span.start - self.origin) * 1e6, 3)
+                          ,'dur': round(span.wall * 1e6, 3)
+                          ,'pid': pid
+                          ,'tid': span.tid
+                          ,'args': args})
+        return {'traceEvents': events
+               ,'displayTimeUnit': 'ms'}
+
+    def save(self
+            ,path):
+
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+    def summary(self):
+
+        # SummaryRow per span name, slowest first. share is the part of
+        # the outermost spans' wall time, nested spans overlap their parent
+        with self._lock:
+            spans = list(self.spans)
+        total = sum(span.wall for span in spans if span.depth == 0)
+        rows = {}
+        for span in spans:
+            calls, wall, cpu, nrows, items = rows.get(span.name, (0, 0.0, 0.0, 0, 0))
+            rows[span.name] = (calls + 1
+                              ,wall + span.wall
+                              ,cpu + span.cpu
+                              ,nrows + span.rows
+                              ,items + span.items)
+        return sorted((SummaryRow(name
+                                 ,calls
+                                 ,wall
+                                 ,cpu
+                                 ,nrows
+                                 ,items
+                                 ,wall / total if total else 0.0)
+                       for name, (calls, wall, cpu, nrows, items) in rows.items())
+                     ,key=lambda row: -row.wall)
+
+    def format_summary(self):
+
+        lines = ['{0:<44} {1:>6} {2:>10} {3:>10} {4:>12} {5:>8} {6:>6}'.format(
+            'span', 'calls', 'wall', 'cpu', 'rows', 'items', '%')]
+        for row in self.summary():
+            lines.append('{0:<44} {1:>6} {2:>10.2f} {3:>10.2f} {4:>12} {5:>8} {6:>6.1f}'.format(
+                row.name
+               ,row.calls
+               ,row.wall
+               ,row.cpu
+               ,row.rows
+               ,row.items
+               ,row.share * 100))
+        return '\n'.join(lines)
+
+
+_tracer  = Tracer()
+_enabled = False
+
+
+def get():
+    return _tracer
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+
+    global _enabled
+    _enabled = True
+    return _tracer
+
+
+def disable():
+
+    global _enabled
+    _enabled = False
+
+
+def span(name
+        ,category='stage'
+        ,**args):
+
+    # context manager yielding the Span, count() on it adds rows and items
+    if not _enabled:
+        return contextlib.nullcontext(_NULL)
+    return _tracer.span(name, category, **args)
+
+
+def start(name
+         ,category='stage'
+         ,**args):
+
+    # for stages too long to indent under a with, finish() closes it
+    if not _enabled:
+        return _NULL
+    return _tracer.start(name, category, **args)
+
+
+def finish(span):
+
+    if span is not _NULL:
+        _tracer.finish(span)
+
+
+def count(rows=0
+         ,items=0):
+
+    # add to the innermost open span of this thread
+    if _enabled:
+        current = _tracer.current()
+        if current is not None:
+            current.count(rows, items)
+
+
+def traced(category='stage'
+          ,name=None):
+
+    # decorator, one span per call named Class.method
+    def decorate(func):
+        spanname = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _tracer.span(spanname, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _save_at_exit(path):
+
+    _tracer.save(path)
+    with open(os.path.splitext(path)[0] + '.txt', 'w') as f:
+        f.write(_tracer.format_summary() + '\n')
+
+
+if os.environ.get('GDB_TRACE'):
+    enable()
+    atexit.register(_save_at_exit, os.environ['GDB_TRACE'])
@@ -0,0 +1,418 @@
+import os
+import sys
+import json
+import time
+import hashlib
+from collections import namedtuple
+
+import filegeodatabase_manager
+import gdbbackend
+import gdbcatalog
+import gdbfingerprint
+import relclass_plan
+import reprojection_manifest
+import tracing
+import xlsx_manager
+
+# the README workflow as steps of a DAG with a checkpoint file
+# after every step the checkpoint records its status, a fingerprint of
+# its inputs and parameters, and a fingerprint of each output as the
+# step left it. A rerun skips every step that finished, whose inputs and
+# parameters are the same and whose outputs nobody touched since. The
+# first step that fails any of that reruns, and so does everything
+# downstream of it
+#
+# several steps write the same output (every step after the empty gdb
+# writes into it) so an output fingerprint belongs to the last step
+# that wrote it. A failed step records what it left behind too, steps
+# must be safe to rerun over their own partial output. LoadData is not,
+# it restarts from the empty geodatabase
+
+_CHECKPOINT_VERSION = 1
+
+StepResult = namedtuple('StepResult'
+                       ,['name'
+                        ,'action'
+                        ,'seconds'
+                        ,'reason'])
+
+
+def fingerprint(path):
+
+    # None for a missing path
+    # files hash their bytes. Directories (a .gdb) hash the name, size
+    # and mtime of every file below them, *.lock files excluded, so
+    # fingerprinting a large geodatabase reads no data
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    if not os.path.isdir(path):
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.lock'):
+                continue
+            filepath = os.path.join(root, name)
+            stat = os.stat(filepath)
+            digest.update('{0}|{1}|{2}\n'.format(
+                os.path.relpath(filepath, path).replace('\\', '/')
+               ,stat.st_size
+               ,stat.st_mtime_ns).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Step(object):
+
+    def __init__(self
+                ,name
+                ,run
+                ,requires=()
+                ,inputs=()
+                ,outputs=()
+                ,params=None
+                ,restart=None):
+
+        # run() does the work
+        # inputs and outputs are paths, params anything json can hold
+        # restart names the step to redo when this one fails partway
+        self.name     = name
+        self.run      = run
+        self.requires = list(requires)
+        self.inputs   = list(inputs)
+        self.outputs  = list(outputs)
+        self.params   = params or {}
+        self.restart  = restart or name
+
+    def key(self):
+
+        # one hash of what went in
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(self.params, sort_keys=True).encode('utf-8'))
+        for path in self.inputs:
+            digest.update('{0}|{1}\n'.format(
+                os.path.normcase(os.path.normpath(path))
+               ,fingerprint(path)).encode('utf-8'))
+        return digest.hexdigest()
+
+
+class Workflow(object):
+
+    def __init__(self
+                ,checkpoint):
+
+        # checkpoint is the json file, written after every step
+        self.checkpoint = checkpoint
+        self.steps      = {}
+        self.state      = {'steps': {}
+                          ,'outputs': {}}
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint) as f:
+                state = json.load(f)
+            if state.get('version') == _CHECKPOINT_VERSION:
+                self.state = state
+
+    def add(self
+           ,step):
+
+        for name in step.requires:
+            if name not in self.steps:
+                raise ValueError('{0} requires unknown step {1}'.format(
+                    step.name, name))
+        if step.name in self.steps:
+            raise ValueError('{0} already added'.format(step.name))
+        self.steps[step.name] = step
+        return step
+
+    def order(self):
+
+        # steps are added after what they require, so the order they
+        # were added in is already a topological order
+        return list(self.steps.values())
+
+    def downstream(self
+                  ,name):
+
+        # name and every step that requires it, directly or not
+        names = {name}
+        for step in self.order():
+            if names & set(step.requires):
+                names.add(step.name)
+        return names
+
+    def save(self):
+
+        # write then rename, a crash never leaves half a checkpoint
+        temp = self.checkpoint + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump(dict(self.state, version=_CHECKPOINT_VERSION)
+                     ,f
+                     ,indent=1
+                     ,sort_keys=True)
+        os.replace(temp, self.checkpoint)
+
+    def status(self
+              ,name):
+
+        return self.state['steps'].get(name, {}).get('status')
+
+    def _stale(self
+              ,step):
+
+        # why step must run, None when its checkpoint still holds
+        recorded = self.state['steps'].get(step.name)
+        if recorded is None:
+            return 'not run'
+        if recorded['status'] != 'done':
+            return recorded['status']
+        if recorded['key'] != step.key():
+            return 'inputs changed'
+        for path in step.outputs:
+            if self.state['outputs'].get(_normalized(path)) != fingerprint(path):
+                return 'output changed {0}'.format(path)
+        return None
+
+    def plan(self
+            ,force=()):
+
+        # [(name, reason)] for the steps a run would redo, in order
+        todo = []
+        rerun = set()
+        for step in self.order():
+            if step.name in force:
+                reason = 'forced'
+            elif rerun & set(step.requires):
+                reason = 'upstream reran'
+            else:
+                reason = self._stale(step)
+            if reason is not None:
+                todo.append((step.name, reason))
+                rerun.add(step.name)
+        return todo
+
+    def _record(self
+               ,step
+               ,status
+               ,key
+               ,seconds
+               ,error=None):
+
+        self.state['steps'][step.name] = {'status': status
+                                         ,'key': key
+                                         ,'seconds': seconds
+                                         ,'error': error}
+        for path in step.outputs:
+            self.state['outputs'][_normalized(path)] = fingerprint(path)
+        self.save()
+
+    @tracing.traced('workflow')
+    def run(self
+           ,force=()):
+
+        # StepResults in order, action is ran or skipped
+        # a failing step is recorded and its exception raised
+        todo = dict(self.plan(force))
+        results = []
+        for step in self.order():
+            if step.name not in todo:
+                results.append(StepResult(step.name, 'skipped', 0.0, None))
+                continue
+            key = step.key()
+            # downstream checkpoints are void until this one is done
+            for name in self.downstream(step.name):
+                self.state['steps'].pop(name, None)
+            start = time.perf_counter()
+            try:
+                with tracing.span(step.name, 'workflow'):
+                    step.run()
+            except BaseException as e:
+                self._record(step
+                            ,'failed'
+                            ,key
+                            ,time.perf_counter() - start
+                            ,'{0}: {1}'.format(type(e).__name__, e))
+                restart = self.state['steps'].get(step.restart)
+                if step.restart != step.name and restart is not None:
+                    restart['status'] = 'restart after {0} failed'.format(step.name)
+                    self.save()
+                raise
+            seconds = time.perf_counter() - start
+            self._record(step, 'done', key, seconds)
+            results.append(StepResult(step.name
+                                     ,'ran'
+                                     ,seconds
+                                     ,todo[step.name]))
+        return results
+
+
+def _normalized(path):
+    return os.path.normcase(os.path.normpath(path))
+
+
+def format_results(results):
+
+    lines = ['{0:<28} {1:>8} {2:>10}  {3}'.format(
+        'step', 'action', 'seconds', 'reason')]
+    for result in results:
+        lines.append('{0:<28} {1:>8} {2:>10.1f}  {3}'.format(
+            result.name
+           ,result.action
+           ,result.seconds
+           ,result.reason or ''))
+    return '\n'.join(lines)
+
+
+def source_fingerprints(gdbin
+                       ,path):
+
+    # gdbfingerprint.table_fingerprints of gdbin, kept in the json file
+    # at path so tables with the same size and mtime are not hashed again
+    previous = None
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+    fingerprints = gdbfingerprint.table_fingerprints(gdbin
+                                                    ,previous)
+    temp = path + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump(fingerprints
+                 ,f
+                 ,indent=1
+                 ,sort_keys=True)
+    os.replace(temp, path)
+    return fingerprints
+
+
+def reprojection(gdbin
+                ,gdbout
+                ,workdir
+                ,srid
+                ,tweak=None
+                ,workers=None):
+
+    # the six README steps, checkpointed in workdir
+    # tweak is an optional callable given the corrected ExcelFile, it
+    # runs after the spatial reference update, rerun with force=
+    # ('tweak_xlsx',) after changing what it does
+    original = os.path.join(workdir, 'OriginalProjection.xlsx')
+    corrected = os.path.join(workdir, 'CorrectedProjection.xlsx')
+    planpath = os.path.join(workdir, 'RelationshipClasses.plan.json')
+    workflow = Workflow(os.path.join(workdir, 'reproject.checkpoint.json'))
+
+    # the schema steps see only the source schema, LoadData its feature
+    # classes and the table load the rest. A table edited in the source
+    # reruns the table load and nothing before it
+    catalog = gdbcatalog.CatalogIndex.from_gdb(gdbin)
+    schema = gdbfingerprint.catalog_fingerprint(gdbin)
+    fingerprints = source_fingerprints(gdbin
+                                      ,os.path.join(workdir, 'source.fingerprints.json'))
+
+    def hashes(*types):
+        return {item.name: fingerprints[item.name]['hash']
+                for item in catalog.of_type(*types)
+                if item.name in fingerprints}
+
+    def generate_xlsx():
+        xlsx = xlsx_manager.ExcelFile(original)
+        xlsx.delete()
+        xlsx.generate_from_geodatabase(gdbin)
+
+    def tweak_xlsx():
+        xlsx = xlsx_manager.ExcelFile(corrected)
+        xlsx.delete()
+        with xlsx_manager.ExcelFile(original).copy(corrected) as xlsx:
+            xlsx.update_all_spatial_reference(srid)
+            if tweak is not None:
+                tweak(xlsx)
+
+    def create_gdb():
+        target = filegeodatabase_manager.LocalGDB(gdbout)
+        if target.exists():
+            target.clean()
+        xlsx_manager.ExcelFile(corrected).generate_to_geodatabase(gdbout)
+
+    def load_data():
+        xlsx_manager.ExcelFile(corrected).load_data(gdbin
+                                                   ,gdbout)
+
+    def plan():
+        return relclass_plan.Plan.load_or_build(
+            planpath
+           ,gdbin
+           ,reprojection_manifest.schema_key(gdbin, corrected))
+
+    def create_relclasses():
+        relclass_plan.execute(plan()
+                             ,gdbout
+                             ,workers=workers)
+
+    def load_tables():
+        names = [item.name for item in catalog.of_type('Table')]
+        xlsx_manager.ExcelFile(corrected).reload_tables(gdbin
+                                                       ,gdbout
+                                                       ,names + plan().attributed()
+                                                       ,workers=workers)
+
+    workflow.add(Step('generate_xlsx'
+                     ,generate_xlsx
+                     ,outputs=[original]
+                     ,params={'catalog': schema}))
+    workflow.add(Step('tweak_xlsx'
+                     ,tweak_xlsx
+                     ,requires=['generate_xlsx']
+                     ,outputs=[corrected]
+                     ,params={'srid': int(srid)}))
+    workflow.add(Step('create_gdb'
+                     ,create_gdb
+                     ,requires=['tweak_xlsx']
+                     ,outputs=[gdbout]))
+    workflow.add(Step('load_data'
+                     ,load_data
+                     ,requires=['create_gdb']
+                     ,outputs=[gdbout]
+                     ,params={'catalog': schema
+                             ,'featureclasses': hashes('FeatureClass')}
+                     ,restart='create_gdb'))
+    workflow.add(Step('create_relclasses'
+                     ,create_relclasses
+                     ,requires=['load_data']
+                     ,outputs=[gdbout]))
+    workflow.add(Step('load_tables'
+                     ,load_tables
+                     ,requires=['create_relclasses']
+                     ,outputs=[gdbout]
+                     ,params={'tables': hashes('Table', 'RelationshipClass')}))
+    return workflow
+
+
+if __name__ == '__main__':
+
+    pgdbin   = sys.argv[1]
+    pgdbout  = sys.argv[2]
+    pworkdir = sys.argv[3]
+    psrid    = 2263
+    if len(sys.argv) == 5:
+        psrid = sys.argv[4]
+
+    # aka "Topographic Production Tools"
+    # aka "ArcGIS Production Mapping"
+    requiredextension = 'Foundation'
+
+    backend = gdbbackend.get()
+    if not backend.check_extension(requiredextension):
+        print('Extension {0} is not available'.format(requiredextension))
+        sys.exit(1)
+    backend.check_out_extension(requiredextension)
+    try:
+        workflow = reprojection(pgdbin
+                               ,pgdbout
+                               ,pworkdir
+                               ,psrid)
+        for name, reason in workflow.plan():
+            print('{0}: {1}'.format(name, reason))
+        print(format_results(workflow.run()))
+    finally:
+        backend.check_in_extension(requiredextension)
@@ -1,10 +1,47 @@
 import os
-import arcpy
+import shutil
 import openpyxl
 from pathlib import Path
 import tempfile
 
+import filecache
 import filegeodatabase_manager
+import gdbbackend
+import gdbfingerprint
+import gdbtrash
+# GDB_MEMORY_BUDGET in the environment installs the budget on import
+import memory_budget
+import projection
+import reprojection_manifest
+import resolution_audit
+import shard_loader
+import stream_loader
+import table_loader
+import tracing
+import xlsx_patcher
+import xlsx_schema
+
+def _count_gdb(gdb):
+
+    # rows and items of gdb for the open span, read only while tracing
+    if tracing.enabled():
+        rows, items = filegeodatabase_manager.LocalGDB(gdb).size()
+        tracing.count(rows, items)
+
+
+# cross reference geodatabases are small, this holds a few hundred
+XREF_CACHE_BYTES = 1 << 30
+
+
+def xref_cache():
+
+    # the cross reference cache shared by every run on this machine
+    # GDB_XREF_CACHE moves it out of the temp directory
+    return filecache.FileCache(os.environ.get('GDB_XREF_CACHE'
+                                             ,os.path.join(tempfile.gettempdir()
+                                                          ,'old_to_new_cache'))
+                              ,max_bytes=XREF_CACHE_BYTES)
+
 
 class ExcelFile(object):
 
@@ -12,14 +49,49 @@ class ExcelFile(object):
                 ,excelfile):
 
         self.xlsx                 = excelfile
-        self.workbook             = None
+        self._workbook            = None
+        self._dirty               = set()
+        self._session             = False
         self._license_checked_out = False
         self._closed              = False
 
+    def __enter__(self):
+
+        # session mode: parse the workbook at most once, keep it in
+        # memory across updates, and write it to disk once on exit
+        self._session = True
+        return self
+
+    def __exit__(self
+                ,exc_type
+                ,exc_value
+                ,traceback):
+
+        self._session = False
+        if exc_type is None:
+            self._flush()
+        else:
+            # leave the file on disk as it was
+            self._workbook = None
+            self._dirty.clear()
+
+    @property
+    def workbook(self):
+
+        # parsed on first use
+        if self._workbook is None and self.exists():
+            self._workbook = openpyxl.load_workbook(self.xlsx)
+        return self._workbook
+
+    @workbook.setter
+    def workbook(self
+                ,workbook):
+        self._workbook = workbook
+
     def checkoutlicense(self):
         if not self._license_checked_out:
-            if arcpy.CheckExtension("Foundation") == "Available":
-                arcpy.CheckOutExtension("Foundation")
+            if gdbbackend.get().check_extension("Foundation"):
+                gdbbackend.get().check_out_extension("Foundation")
                 self._license_checked_out = True
             else:
                 raise RuntimeError("Foundation license not available")
@@ -27,7 +99,7 @@ class ExcelFile(object):
     def checkinlicense(self):
         if not self._closed:
             if self._license_checked_out:
-                arcpy.CheckInExtension("Foundation")
+                gdbbackend.get().check_in_extension("Foundation")
                 self._license_checked_out = False
             self._closed = True
 
@@ -39,44 +111,109 @@ class ExcelFile(object):
             return False
 
     def delete(self):
+        self._workbook = None
+        self._dirty.clear()
         try:
             os.remove(self.xlsx)
         except FileNotFoundError:
             pass
 
+    def _flush(self):
+
+        # write only when a sheet changed
+        if self._dirty:
+            self._workbook.save(self.xlsx)
+            self._dirty.clear()
+
     def _save(self):
-        self.workbook.save(self.xlsx)
+
+        # in a session the write waits for __exit__
+        if not self._session:
+            self._flush()
 
     def _open(self):
-        self.workbook = openpyxl.load_workbook(self.xlsx)
 
+        # a session keeps the workbook it already parsed
+        if self._session and self._workbook is not None:
+            return
+        self._workbook = openpyxl.load_workbook(self.xlsx)
+        self._dirty.clear()
+
+    @tracing.traced('xlsx')
     def copy(self
-            ,output_xlsx):
+            ,output_xlsx
+            ,load=False):
 
-        self._open()
-        self.workbook.save(output_xlsx)
+        # file level clone, nothing is parsed unless load=True
+        # unsaved session edits go to the copy, not to self.xlsx
+        if self._dirty:
+            self._workbook.save(output_xlsx)
+        else:
+            shutil.copyfile(self.xlsx
+                           ,output_xlsx)
         outcopy = ExcelFile(output_xlsx)
-        outcopy._open()
+        if load:
+            outcopy._open()
         return outcopy        
 
+    @tracing.traced('xlsx')
     def generate_from_geodatabase(self
-                                 ,gdb):
-
-        if not self.exists():
-            arcpy.topographic.GenerateExcelFromGeodatabase(gdb
-                                                          ,self.xlsx)
-        else:
+                                 ,gdb
+                                 ,cache=None):
+
+        # cache is an optional filecache.FileCache of generated workbooks
+        # keyed on the backend and the catalog fingerprint of gdb, same
+        # schema same xlsx. Cached workbooks are cleared of anything
+        # about where gdb is (see Backend.stamp_excel)
+        if self.exists():
             raise RuntimeError('{0} already exists'.format(self.xlsx))
 
-        self.workbook = openpyxl.load_workbook(self.xlsx)
+        backend = gdbbackend.get()
+        key = None
+        if cache is not None:
+            key = '{0}-{1}'.format(backend.name
+                                  ,gdbfingerprint.catalog_fingerprint(gdb))
+            cached = cache.get(key, '.xlsx')
+            if cached is not None:
+                shutil.copyfile(cached
+                               ,self.xlsx)
+
+        if not self.exists():
+            backend.generate_excel_from_geodatabase(gdb
+                                                   ,self.xlsx)
+            if cache is not None:
+                backend.stamp_excel(self.xlsx)
+                cache.put(key, self.xlsx, '.xlsx')
+        if cache is not None:
+            backend.stamp_excel(self.xlsx
+                               ,gdb)
+        _count_gdb(gdb)
+
+        # parsed later, on first use
+        self._workbook = None
+        self._dirty.clear()
     
+    @tracing.traced('xlsx')
     def generate_to_geodatabase(self
                                ,gdb):
 
         # this generates an empty geodatabase
         # if specified globalid columns will be ESRI-managed 
-        arcpy.topographic.GenerateGeodatabaseFromExcel(self.xlsx
-                                                      ,gdb)
+        # the tool reads the file so pending session edits go first
+        self._flush()
+        gdbbackend.get().generate_geodatabase_from_excel(self.xlsx
+                                                        ,gdb)
+        _count_gdb(gdb)
+
+    @tracing.traced('xlsx')
+    def schema(self
+              ,cachedir=None):
+
+        # compact model of the five schema sheets
+        # cached on the xlsx content hash so unchanged bytes never reparse
+        self._flush()
+        return xlsx_schema.load(self.xlsx
+                               ,cachedir)
 
     def _get_srid_dictionary(self
                             ,srid):
@@ -142,6 +279,32 @@ class ExcelFile(object):
 
         return srid_dict  
 
+    def projection(self
+                  ,srid):
+
+        # NumPy LCC engine built from the same WKT we write to the workbook
+        return projection.LambertConformalConic.from_wkt(
+            self._get_srid_dictionary(int(srid))['D2'])
+
+    @tracing.traced('xlsx')
+    def audit_resolution(self
+                        ,gdb
+                        ,srid
+                        ,tolerance=None
+                        ,workers=None):
+
+        # snap every vertex in gdb to the srid resolution grid (K2)
+        # and report moved vertices and collapsed segments
+        # cheap preview of what copygeodatabase is about to do
+        xyscale = float(self._get_srid_dictionary(int(srid))['K2'])
+        results = resolution_audit.audit_gdb(gdb
+                                            ,xyscale
+                                            ,tolerance
+                                            ,workers)
+        tracing.count(rows=sum(result.features for result in results)
+                     ,items=len(results))
+        return results
+
     def _update_dataset_containers(self):
         
         # update spatial reference in DatasetContainers sheet (col E)
@@ -151,6 +314,7 @@ class ExcelFile(object):
             for cell in row:
                 if cell.value and cell.value != -1:
                     cell.value = 1
+        self._dirty.add("DatasetContainers")
     
     def _update_object_classes(self):
 
@@ -160,6 +324,7 @@ class ExcelFile(object):
             for cell in row:
                 if cell.value and cell.value != -1:
                     cell.value = 1
+        self._dirty.add("ObjectClasses")
 
     def _update_spatial_reference(self
                                  ,srid):
@@ -173,13 +338,21 @@ class ExcelFile(object):
 
         for cell, value in self._get_srid_dictionary(srid).items(): 
             ws_sr[cell] = value
+        self._dirty.add("SpatialReferences")
 
+    @tracing.traced('xlsx')
     def update_all_spatial_reference(self
-                                    ,srid):
+                                    ,srid
+                                    ,streaming=False):
 
         # update_all_spatial_reference will associates all data
         # with one blessed srid, resolution, and tolerance
+        # streaming=True rewrites the three sheets inside the zip
+        # without parsing the workbook
         srid = int(srid)
+        if streaming:
+            return self._stream_spatial_reference(srid)
+
         self._open()        
 
         self._update_spatial_reference(srid)
@@ -188,33 +361,203 @@ class ExcelFile(object):
         
         self._save()
 
+    def _stream_spatial_reference(self
+                                 ,srid):
+
+        # pending session edits go first, the patcher reads the file
+        self._flush()
+
+        def point_at_srid_1(value):
+            if value and value != -1:
+                return 1
+            return value
+
+        changed = xlsx_patcher.patch_workbook(
+            self.xlsx
+           ,{'SpatialReferences': xlsx_patcher.SheetPatch(
+                rows=self._get_srid_dictionary(srid))
+            ,'DatasetContainers': xlsx_patcher.SheetPatch(
+                columns={'E': point_at_srid_1})
+            ,'ObjectClasses': xlsx_patcher.SheetPatch(
+                columns={'J': point_at_srid_1})})
+
+        # any parsed copy is stale now
+        self._workbook = None
+        tracing.count(items=sum(changed.values()))
+        return changed
+
+    @tracing.traced('xlsx')
+    def reload_tables(self
+                     ,gdbin
+                     ,gdbout
+                     ,names
+                     ,workers=None):
+
+        # truncate and append named tables from gdbin into an existing
+        # gdbout with the same schema, in parallel, largest first
+        # returns table_loader.LoadResults, raises if any table failed
+        results = table_loader.load_tables(
+            table_loader.schedule(gdbin, gdbout, names)
+           ,workers=workers)
+        tracing.count(rows=sum(result.rows or 0 for result in results)
+                     ,items=len(results))
+        failed = table_loader.failures(results)
+        if failed:
+            raise RuntimeError('failed to reload {0}'.format(
+                ', '.join(result.name for result in failed)))
+        return results
+
+    @tracing.traced('xlsx')
     def copygeodatabase(self
                        ,gdbin
-                       ,gdbout):
+                       ,gdbout
+                       ,incremental=False
+                       ,sharded=False
+                       ,workers=None
+                       ,streaming=False):
 
         # given an input geodatabase and this excel workbook
         # create and load an output geodatabase
-        self.generate_to_geodatabase(gdbout)
-
-        # we dont care about this thing (yet?) make it and trash it
-        object_map_gdb = filegeodatabase_manager.LocalGDB(
-            os.path.join(tempfile.gettempdir()
-                        ,'old_to_new.gdb'))
-
-        if object_map_gdb.exists():
-            object_map_gdb.clean()
-
-        arcpy.topographic.CreateCrossReferenceGeodatabase(gdbin
-                                                         ,gdbout
-                                                         ,object_map_gdb.gdb)
+        # incremental=True reloads only the tables that changed since the
+        # last run into gdbout when the schema has not changed
+        # sharded=True loads each feature dataset in its own process and
+        # creates the relationship classes (see shard_loader)
+        # streaming=True loads rows in batches instead of LoadData, in
+        # every shard when sharded
+        # returns the names of the reloaded tables, None for a full load
+        self._flush()
+
+        if incremental:
+            manifest = reprojection_manifest.Manifest.for_gdb(gdbout)
+            schema = reprojection_manifest.schema_key(gdbin
+                                                     ,self.xlsx)
+            previous = None
+            if manifest.matches(schema) and gdbbackend.get().exists(gdbout):
+                previous = manifest.tables
+            fingerprints = gdbfingerprint.table_fingerprints(gdbin
+                                                            ,previous)
+            if previous is not None:
+                changed = manifest.changed(fingerprints)
+                self.reload_tables(gdbin
+                                  ,gdbout
+                                  ,changed)
+                manifest.update(schema, fingerprints)
+                manifest.save()
+                return changed
+            manifest.remove()
+            if gdbbackend.get().exists(gdbout):
+                filegeodatabase_manager.LocalGDB(gdbout).clean()
+
+        if sharded:
+            shard_loader.copy_sharded(self.xlsx
+                                     ,gdbin
+                                     ,gdbout
+                                     ,workers=workers
+                                     ,streaming=streaming)
+        else:
+            self._load_geodatabase(gdbin
+                                  ,gdbout
+                                  ,streaming)
 
-        arcpy.topographic.LoadData(object_map_gdb.gdb
-                                  ,gdbin
-                                  ,gdbout)
+        if incremental:
+            manifest.update(schema, fingerprints)
+            manifest.save()
 
-        object_map_gdb.clean()
-        
-    
+    def _load_geodatabase(self
+                         ,gdbin
+                         ,gdbout
+                         ,streaming=False):
 
-
-        
\ No newline at end of file
+        # generate_to_geodatabase flushes any pending session edits
+        self.generate_to_geodatabase(gdbout)
+        self.load_data(gdbin
+                      ,gdbout
+                      ,streaming)
+
+    def load_data(self
+                 ,gdbin
+                 ,gdbout
+                 ,streaming=False
+                 ,batch_size=stream_loader.BATCH_SIZE
+                 ,cache=None):
+
+        # load gdbin into the empty gdbout this workbook generated
+        # streaming=True reads, reprojects and inserts batch_size rows at
+        # a time (see stream_loader) in place of LoadData
+        # the cross reference is cached (cache defaults to xref_cache())
+        # on the backend, the source schema and the content of this
+        # workbook (see reprojection_manifest.schema_key). Every run
+        # works on its own copy in its own temp directory
+        cache = xref_cache() if cache is None else cache
+        key = '{0}-{1}'.format(gdbbackend.get().name
+                              ,reprojection_manifest.schema_key(gdbin
+                                                               ,self.xlsx))
+        rundir = tempfile.mkdtemp(prefix='old_to_new')
+        object_map_gdb = filegeodatabase_manager.LocalGDB(
+            os.path.join(rundir
+                        ,'old_to_new.gdb'))
+        try:
+            self._cross_reference(gdbin
+                                 ,gdbout
+                                 ,object_map_gdb
+                                 ,cache
+                                 ,key)
+            self._load_data(gdbin
+                           ,gdbout
+                           ,object_map_gdb
+                           ,streaming
+                           ,batch_size)
+        finally:
+            # the whole run directory goes to the trash, gdb and all
+            try:
+                gdbtrash.discard(rundir)
+            except OSError:
+                shutil.rmtree(rundir, ignore_errors=True)
+
+    def _cross_reference(self
+                        ,gdbin
+                        ,gdbout
+                        ,object_map_gdb
+                        ,cache
+                        ,key):
+
+        cached = cache.get(key, '.gdb')
+        if cached is not None:
+            try:
+                with tracing.span('cross reference cache hit', 'tool'):
+                    filegeodatabase_manager.LocalGDB(cached).copy(object_map_gdb.gdb)
+                return
+            except OSError:
+                # evicted by another run while we copied
+                shutil.rmtree(object_map_gdb.gdb, ignore_errors=True)
+
+        with tracing.span('CreateCrossReferenceGeodatabase', 'tool'):
+            gdbbackend.get().create_cross_reference_geodatabase(gdbin
+                                                               ,gdbout
+                                                               ,object_map_gdb.gdb)
+        cache.put(key, object_map_gdb.gdb, '.gdb')
+
+    def _load_data(self
+                  ,gdbin
+                  ,gdbout
+                  ,object_map_gdb
+                  ,streaming
+                  ,batch_size):
+
+        if streaming:
+            results = stream_loader.stream_load(object_map_gdb.gdb
+                                               ,gdbin
+                                               ,gdbout
+                                               ,batch_size)
+            failed = stream_loader.failures(results)
+            if failed:
+                raise RuntimeError('streaming load failed - {0}'.format(
+                    '; '.join('{0} {1}'.format(result.name, result.error)
+                              for result in failed)))
+            return
+
+        with tracing.span('LoadData', 'tool'):
+            gdbbackend.get().load_data(object_map_gdb.gdb
+                                      ,gdbin
+                                      ,gdbout)
+            _count_gdb(gdbout)
@@ -0,0 +1,360 @@
+import os
+import re
+import struct
+import tempfile
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from xml.sax.saxutils import escape, quoteattr
+
+# rewrite a few columns of a few worksheets inside an xlsx without
+# loading the workbook. Each affected xl/worksheets/sheetN.xml streams
+# through an incremental (expat) parser and out to a new zip, every
+# other entry (other sheets, sharedStrings, styles) is copied through
+# as its compressed bytes, never inflated and deflated again
+
+_CHUNK = 1 << 16
+
+# zip local file header, the name and extra field lengths are last
+_LOCALHEADER = struct.Struct('<4s5H3L2H')
+# general purpose flag, crc and sizes follow the data
+_DATADESCRIPTOR = 0x08
+
+_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_DOCRELS = ('{http://schemas.openxmlformats.org/officeDocument/2006/'
+            'relationships}id')
+
+_CELLREF = re.compile(r'([A-Z]+)([0-9]+)')
+
+
+class SharedString(object):
+
+    # a t="s" cell value, we do not read sharedStrings.xml
+    # shared strings are assumed to be non-empty text
+    def __init__(self
+                ,index):
+        self.index = index
+
+    def __bool__(self):
+        return True
+
+    def __eq__(self
+              ,other):
+        return isinstance(other, SharedString) and other.index == self.index
+
+
+class SheetPatch(object):
+
+    def __init__(self
+                ,columns=None
+                ,rows=None):
+
+        # columns: {'E': function(value) -> value} applied to rows 2+
+        #          return the same value to leave a cell untouched
+        # rows:    {'A2': value, ...} drop every row 2+ and write these
+        self.columns = columns or {}
+        self.rows    = rows
+
+
+def sheet_paths(archive):
+
+    # {sheet name: zip member} from workbook.xml and its relationships
+    workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+    rels = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target')
+               for rel in rels.iter(_RELS + 'Relationship')}
+
+    paths = {}
+    for sheet in workbook.iter(_MAIN + 'sheet'):
+        target = targets[sheet.get(_DOCRELS)]
+        if target.startswith('/'):
+            paths[sheet.get('name')] = target[1:]
+        else:
+            paths[sheet.get('name')] = posixpath.normpath(
+                posixpath.join('xl', target))
+    return paths
+
+
+def _starttag(name
+             ,attrs):
+
+    return '<{0}{1}'.format(name
+                           ,''.join(' {0}={1}'.format(k, quoteattr(v))
+                                    for k, v in attrs.items()))
+
+
+def _cell(ref
+         ,value
+         ,style=None):
+
+    # serialized <c>, numbers as <v>, text as an inline string
+    style = '' if style is None else ' s={0}'.format(quoteattr(style))
+    if value is None:
+        return '<c r="{0}"{1}/>'.format(ref, style)
+    if isinstance(value, bool):
+        return '<c r="{0}"{1} t="b"><v>{2}</v></c>'.format(ref, style, int(value))
+    if isinstance(value, (int, float)):
+        return '<c r="{0}"{1}><v>{2}</v></c>'.format(ref, style, repr(value))
+    return '<c r="{0}"{1} t="inlineStr"><is><t>{2}</t></is></c>'.format(
+        ref, style, escape(str(value)))
+
+
+def _rowcells(cells):
+
+    # {'A2': 1, 'B2': 'x'} -> {2: [('A2', 1), ('B2', 'x')]} column ordered
+    def colnumber(letters):
+        n = 0
+        for letter in letters:
+            n = n * 26 + ord(letter) - 64
+        return n
+
+    rows = {}
+    for ref, value in cells.items():
+        column, row = _CELLREF.fullmatch(ref).groups()
+        rows.setdefault(int(row), []).append((colnumber(column), ref, value))
+    return {row: [(ref, value) for _, ref, value in sorted(cells)]
+            for row, cells in rows.items()}
+
+
+class _SheetRewriter(object):
+
+    def __init__(self
+                ,patch
+                ,out):
+
+        self.patch = patch
+        self.out   = out
+        self.parser = expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.ordered_attributes = False
+        self.parser.XmlDeclHandler       = self._xmldecl
+        self.parser.StartElementHandler  = self._start
+        self.parser.EndElementHandler    = self._end
+        self.parser.CharacterDataHandler = self._text
+
+        self._pending = []     # serialized output waiting for a write
+        self._opentag = False  # last start tag not yet closed with >
+        self._skip    = 0      # depth inside a dropped row
+        self._cell    = None   # buffered patched cell
+        self.changed  = 0
+
+    def feed(self
+            ,data
+            ,final=False):
+
+        self.parser.Parse(data, final)
+        if self._pending:
+            self.out.write(''.join(self._pending).encode('utf-8'))
+            self._pending = []
+
+    def _emit(self
+             ,text):
+
+        if self._cell is not None:
+            self._cell['raw'].append(text)
+        else:
+            self._pending.append(text)
+
+    def _closeopen(self):
+
+        if self._opentag:
+            self._emit('>')
+            self._opentag = False
+
+    def _xmldecl(self
+                ,version
+                ,encoding
+                ,standalone):
+
+        decl = '<?xml version="{0}" encoding="UTF-8"'.format(version)
+        if standalone != -1:
+            decl += ' standalone="{0}"'.format('yes' if standalone else 'no')
+        self._pending.append(decl + '?>\n')
+
+    def _start(self
+              ,name
+              ,attrs):
+
+        if self._skip:
+            self._skip += 1
+            return
+
+        if (name == 'row'
+        and self.patch.rows is not None
+        and int(attrs.get('r', '0')) >= 2):
+            self._skip = 1
+            return
+
+        if name == 'c' and self._cell is None:
+            column, row = _CELLREF.fullmatch(attrs['r']).groups()
+            if int(row) >= 2 and column in self.patch.columns:
+                self._closeopen()
+                self._cell = {'attrs': attrs
+                             ,'column': column
+                             ,'raw': []
+                             ,'tag': None
+                             ,'text': []}
+
+        if self._cell is not None:
+            self._cell['tag'] = name
+
+        self._closeopen()
+        self._emit(_starttag(name, attrs))
+        self._opentag = True
+
+    def _text(self
+             ,data):
+
+        if self._skip:
+            return
+        if self._cell is not None and self._cell['tag'] in ('v', 't'):
+            self._cell['text'].append(data)
+        self._closeopen()
+        self._emit(escape(data))
+
+    def _end(self
+            ,name):
+
+        if self._skip:
+            self._skip -= 1
+            return
+
+        if name == 'sheetData' and self.patch.rows is not None:
+            self._closeopen()
+            for row, cells in sorted(_rowcells(self.patch.rows).items()):
+                self._emit('<row r="{0}">{1}</row>'.format(
+                    row, ''.join(_cell(ref, value) for ref, value in cells)))
+                self.changed += len(cells)
+
+        if self._opentag:
+            self._emit('/>')
+            self._opentag = False
+        else:
+            self._emit('</{0}>'.format(name))
+
+        if name == 'c' and self._cell is not None:
+            self._finishcell()
+
+    def _finishcell(self):
+
+        cell = self._cell
+        self._cell = None
+        attrs = cell['attrs']
+        text = ''.join(cell['text'])
+        celltype = attrs.get('t', 'n')
+
+        if not text and celltype != 'inlineStr':
+            value = None
+        elif celltype == 's':
+            value = SharedString(int(text))
+        elif celltype in ('str', 'inlineStr'):
+            value = text
+        elif celltype == 'b':
+            value = text == '1'
+        else:
+            value = float(text)
+            if value.is_integer():
+                value = int(value)
+
+        newvalue = self.patch.columns[cell['column']](value)
+        if newvalue is value or newvalue == value:
+            self._pending.extend(cell['raw'])
+        else:
+            self._pending.append(_cell(attrs['r'], newvalue, attrs.get('s')))
+            self.changed += 1
+
+
+def patch_workbook(xlsx
+                  ,patches
+                  ,output=None):
+
+    # patches is {sheet name: SheetPatch}
+    # rewrites xlsx in place unless output is given
+    # returns {sheet name: number of cells changed}
+    changed = {}
+    target = output or xlsx
+    fd, temp = tempfile.mkstemp(suffix='.xlsx'
+                               ,dir=os.path.dirname(os.path.abspath(target)))
+    os.close(fd)
+
+    try:
+        with zipfile.ZipFile(xlsx) as source, \
+             zipfile.ZipFile(temp, 'w') as patched:
+
+            paths = sheet_paths(source)
+            missing = set(patches) - set(paths)
+            if missing:
+                raise ValueError('{0} has no sheet {1}'.format(
+                    xlsx, ', '.join(sorted(missing))))
+            bypath = {paths[name]: name for name in patches}
+
+            for info in source.infolist():
+                if info.filename not in bypath:
+                    _copyraw(source, info, patched)
+                    continue
+                name = bypath[info.filename]
+                with source.open(info) as src, \
+                     patched.open(_copyinfo(info), 'w') as dst:
+                    rewriter = _SheetRewriter(patches[name], dst)
+                    while True:
+                        chunk = src.read(_CHUNK)
+                        rewriter.feed(chunk, final=not chunk)
+                        if not chunk:
+                            break
+                    changed[name] = rewriter.changed
+
+        os.replace(temp, target)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+    return changed
+
+
+def _copyraw(source
+            ,info
+            ,patched):
+
+    # the compressed bytes of an untouched entry straight into patched
+    # behind a new local header with the source crc and sizes. Same as
+    # ZipFile.writestr does except for the compression
+    source.fp.seek(info.header_offset)
+    header = _LOCALHEADER.unpack(source.fp.read(_LOCALHEADER.size))
+    if header[0] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile('bad local header for {0}'.format(
+            info.filename))
+    source.fp.seek(header[-2] + header[-1], os.SEEK_CUR)
+
+    copy = _copyinfo(info)
+    copy.flag_bits = info.flag_bits & ~_DATADESCRIPTOR
+    copy.CRC = info.CRC
+    copy.compress_size = info.compress_size
+    copy.file_size = info.file_size
+    copy.header_offset = patched.fp.tell()
+    patched.fp.write(copy.FileHeader())
+
+    remaining = info.compress_size
+    while remaining:
+        chunk = source.fp.read(min(_CHUNK, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile('truncated entry {0}'.format(
+                info.filename))
+        patched.fp.write(chunk)
+        remaining -= len(chunk)
+
+    patched.filelist.append(copy)
+    patched.NameToInfo[copy.filename] = copy
+    patched.start_dir = patched.fp.tell()
+
+
+def _copyinfo(info):
+
+    # same name, timestamp and compression as the source entry
+    copy = zipfile.ZipInfo(info.filename
+                          ,date_time=info.date_time)
+    copy.compress_type = info.compress_type
+    copy.external_attr = info.external_attr
+    return copy
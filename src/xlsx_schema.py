@@ -0,0 +1,354 @@
+import os
+import uuid
+import pickle
+import hashlib
+import openpyxl
+
+# compact model of the workbook GenerateExcelFromGeodatabase writes
+# parsed once with openpyxl, then pickled to a cache file keyed on
+# the sha256 of the xlsx. Any later load of the same bytes reads the
+# pickle instead of the workbook. Unpickling runs whatever the file
+# says, so the cache lives in a directory only its owner can write
+
+# bump when the record layout changes, old cache files are ignored
+_CACHE_VERSION = 1
+
+_CHUNK = 1 << 20
+
+
+class _Record(object):
+
+    # every record keeps its full row in values, the sheet header
+    # lives once on the RecordTable. A few columns get typed slots
+    __slots__ = ('id', 'name', 'values')
+    _fields   = __slots__
+
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def __setstate__(self
+                    ,state):
+        for field, value in zip(self._fields, state):
+            setattr(self, field, value)
+
+    def __repr__(self):
+        return '{0}({1!r}, {2!r})'.format(type(self).__name__
+                                         ,self.id
+                                         ,self.name)
+
+
+class SpatialReference(_Record):
+
+    __slots__ = ('wkid', 'wkt', 'xyscale')
+    _fields   = _Record._fields + __slots__
+
+
+class DatasetContainer(_Record):
+
+    __slots__ = ('spatialreference_id',)
+    _fields   = _Record._fields + __slots__
+
+
+class ObjectClass(_Record):
+
+    __slots__ = ('spatialreference_id',)
+    _fields   = _Record._fields + __slots__
+
+
+class Field(_Record):
+
+    __slots__ = ('objectclass_id',)
+    _fields   = _Record._fields + __slots__
+
+
+class Domain(_Record):
+
+    __slots__ = ()
+
+
+# sheet -> record class and typed columns
+# each column is (header names to look for, fallback column letter)
+_SHEETS = {
+    'SpatialReferences': (SpatialReference
+                         ,{'id': (('ID',), 'A')
+                          ,'name': (('Name',), 'B')
+                          ,'wkid': (('WKID', 'FactoryCode'), 'C')
+                          ,'wkt': (('WKT',), 'D')
+                          ,'xyscale': (('XYScale', 'XYResolution'), 'K')})
+   ,'DatasetContainers': (DatasetContainer
+                         ,{'id': (('ID',), 'A')
+                          ,'name': (('Name',), 'B')
+                          ,'spatialreference_id': (('SpatialReferenceID',)
+                                                  ,'E')})
+   ,'ObjectClasses': (ObjectClass
+                     ,{'id': (('ID',), 'A')
+                      ,'name': (('Name',), 'B')
+                      ,'spatialreference_id': (('SpatialReferenceID',), 'J')})
+   ,'Fields': (Field
+              ,{'id': (('ID',), 'A')
+               ,'name': (('Name', 'FieldName'), 'B')
+               ,'objectclass_id': (('ObjectClassID',), None)})
+   ,'Domains': (Domain
+               ,{'id': (('ID',), 'A')
+                ,'name': (('Name', 'DomainName'), 'B')})
+}
+
+
+def _column_index(letter):
+
+    n = 0
+    for char in letter:
+        n = n * 26 + ord(char) - 64
+    return n - 1
+
+
+class RecordTable(object):
+
+    __slots__ = ('header', 'records', '_byid', '_byname')
+
+    def __init__(self
+                ,header
+                ,records):
+
+        self.header  = header
+        self.records = records
+        self._index()
+
+    def _index(self):
+
+        self._byid   = {r.id: r for r in self.records if r.id is not None}
+        self._byname = {}
+        for r in self.records:
+            if r.name is not None:
+                self._byname.setdefault(str(r.name).lower(), []).append(r)
+
+    def __getstate__(self):
+        # indexes are rebuilt on load, they are cheaper than the pickle
+        return (self.header, self.records)
+
+    def __setstate__(self
+                    ,state):
+        self.header, self.records = state
+        self._index()
+
+    def get(self
+           ,id):
+
+        try:
+            return self._byid[id]
+        except KeyError:
+            raise KeyError('no record with ID {0}'.format(id))
+
+    def named(self
+             ,name):
+
+        # names repeat in Fields (one per object class), so a list
+        return self._byname.get(str(name).lower(), [])
+
+    def value(self
+             ,record
+             ,column):
+
+        # any other column of a record by its header name
+        return record.values[self.header.index(column)]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+
+class SchemaModel(object):
+
+    def __init__(self
+                ,sha256
+                ,tables):
+
+        self.sha256 = sha256
+        self.tables = tables
+
+    @property
+    def spatialreferences(self):
+        return self.tables['SpatialReferences']
+
+    @property
+    def datasetcontainers(self):
+        return self.tables['DatasetContainers']
+
+    @property
+    def objectclasses(self):
+        return self.tables['ObjectClasses']
+
+    @property
+    def fields(self):
+        return self.tables['Fields']
+
+    @property
+    def domains(self):
+        return self.tables['Domains']
+
+    @classmethod
+    def from_xlsx(cls
+                 ,xlsx
+                 ,sha256=None):
+
+        # one read only pass over the five sheets, missing sheets are empty
+        tables = {}
+        wb = openpyxl.load_workbook(xlsx
+                                   ,read_only=True
+                                   ,data_only=True)
+        try:
+            for sheet, (recordclass, columns) in _SHEETS.items():
+                header = ()
+                rows = []
+                if sheet in wb.sheetnames:
+                    rowiter = wb[sheet].iter_rows(values_only=True)
+                    header = tuple(next(rowiter, ()))
+                    rows = [tuple(row) for row in rowiter
+                            if any(value is not None for value in row)]
+                tables[sheet] = RecordTable(header
+                                           ,_records(recordclass
+                                                    ,columns
+                                                    ,header
+                                                    ,rows))
+        finally:
+            wb.close()
+
+        return cls(sha256 or file_sha256(xlsx), tables)
+
+    def save(self
+            ,path):
+
+        # write then rename, readers never see a partial pickle
+        # everyone loading the same workbook writes a temp of their own
+        temp = '{0}.{1}.tmp'.format(path, uuid.uuid4().hex)
+        with open(temp, 'wb') as f:
+            pickle.dump((_CACHE_VERSION, self.sha256, self.tables)
+                       ,f
+                       ,protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls
+            ,path):
+
+        with open(path, 'rb') as f:
+            version, sha256, tables = pickle.load(f)
+        if version != _CACHE_VERSION:
+            raise ValueError('{0} is cache version {1} not {2}'.format(
+                path, version, _CACHE_VERSION))
+        return cls(sha256, tables)
+
+
+def _records(recordclass
+            ,columns
+            ,header
+            ,rows):
+
+    names = [str(h).lower() if h is not None else None for h in header]
+    positions = {}
+    for slot, (headers, fallback) in columns.items():
+        position = None
+        for h in headers:
+            if h.lower() in names:
+                position = names.index(h.lower())
+                break
+        if position is None and fallback is not None:
+            position = _column_index(fallback)
+        positions[slot] = position
+
+    records = []
+    for row in rows:
+        record = recordclass.__new__(recordclass)
+        record.values = row
+        for slot, position in positions.items():
+            if position is not None and position < len(row):
+                setattr(record, slot, row[position])
+            else:
+                setattr(record, slot, None)
+        records.append(record)
+    return records
+
+
+def file_sha256(path):
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_sha256(xlsx):
+
+    # sha256 of the header and values of every sheet in the workbook,
+    # not only the ones modeled here, and not of the file bytes. Saving
+    # the same workbook again gives the same digest
+    digest = hashlib.sha256()
+    wb = openpyxl.load_workbook(xlsx
+                               ,read_only=True
+                               ,data_only=True)
+    try:
+        for ws in wb.worksheets:
+            digest.update(repr(ws.title).encode('utf-8'))
+            for row in ws.iter_rows(values_only=True):
+                row = tuple(row)
+                while row and row[-1] is None:
+                    row = row[:-1]
+                if row:
+                    digest.update(repr(row).encode('utf-8'))
+            digest.update(b'\n')
+    finally:
+        wb.close()
+    return digest.hexdigest()
+
+
+def default_cachedir():
+
+    # per user, never the shared temp directory
+    base = (os.environ.get('LOCALAPPDATA')
+            or os.environ.get('XDG_CACHE_HOME')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base
+                       ,'geodatabase_reproject'
+                       ,'schema')
+
+
+def private_cachedir(cachedir):
+
+    # create cachedir 0700, True when it is ours and no one else can
+    # write to it. Windows profile directories are private already
+    os.makedirs(cachedir, mode=0o700, exist_ok=True)
+    if os.name != 'posix':
+        return True
+    status = os.stat(cachedir)
+    if status.st_uid != os.getuid():
+        return False
+    if status.st_mode & 0o077:
+        os.chmod(cachedir, 0o700)
+    return True
+
+
+def load(xlsx
+        ,cachedir=None):
+
+    # the model for xlsx, from the cache when these exact bytes were
+    # seen before. A cache file that does not load is rebuilt, a cache
+    # directory someone else owns is not used at all
+    cachedir = cachedir or default_cachedir()
+    sha256 = file_sha256(xlsx)
+    if not private_cachedir(cachedir):
+        return SchemaModel.from_xlsx(xlsx, sha256)
+    cachefile = os.path.join(cachedir, '{0}.pickle'.format(sha256))
+
+    if os.path.exists(cachefile):
+        try:
+            return SchemaModel.load(cachefile)
+        except Exception:
+            # truncated, another version, or classes that moved
+            pass
+
+    model = SchemaModel.from_xlsx(xlsx, sha256)
+    model.save(cachefile)
+    return model
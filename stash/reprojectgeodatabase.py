@@ -8,6 +8,14 @@ import shutil
 import stat
 
 from filegeodatabasemanager import localgdb 
+import content_verifier
+import gdbcatalog
+import gdbfingerprint
+import memory_budget
+import relclass_plan
+import reprojection_manifest
+import table_loader
+import tracing
 
 
 # arcpy.topographic
@@ -29,6 +37,12 @@ def reproject (
    ,srid
    ,input_spec_xlsx: str | None = None
    ,create_xlsx: bool = True
+   ,incremental: bool = False
+   ,load_workers: int | None = None
+   ,trace: str | None = None
+   ,memory: str | None = None
+   ,memory_action: str = 'warn'
+   ,verify: bool = True
 ) -> None:
 
     """Reproject CSCL file geodatabase
@@ -39,8 +53,21 @@ def reproject (
         input_spec_xlsx (str | None, optional): Path to intermediate Excel file (written by this function)
         object_map_fgdb (str | None, optional): Path to intermediate file geodatabase (written by this function)
         create_xlsx (bool, optional): Whether to create the intermediate Excel file from scratch. Defaults to True.
+        incremental (bool, optional): Reload only tables that changed since the last run when the schema has not. Defaults to False.
+        load_workers (int | None, optional): Processes loading tables in parallel, relationship classes are created one at a time. Defaults to one per CPU.
+        trace (str | None, optional): Write a Chrome trace of the stages here and log a timing summary. Defaults to None.
+        memory (str | None, optional): Memory budget like 6G, logs per stage memory and the biggest allocators. Defaults to None.
+        memory_action (str, optional): warn or abort when the budget is exceeded. Defaults to warn.
+        verify (bool, optional): Compare row content hashes of source and target after the counts. Defaults to True.
     """
 
+    if trace:
+        tracing.enable()
+    if memory:
+        memory_budget.install(memory
+                             ,memory_action)
+    run = tracing.start('reproject', gdbin=gdbin.gdb, gdbout=gdbout.gdb)
+
     logger.info('calling reproject on {0} to {1} with srid {2}'.format(gdbin.name
                                                                       ,gdbout.name
                                                                       ,srid))
@@ -68,10 +95,13 @@ def reproject (
         if os.path.exists(temp_xlsx):
             os.remove(temp_xlsx)
 
+        stage = tracing.start('GenerateExcelFromGeodatabase', 'tool')
         arcpy.topographic.GenerateExcelFromGeodatabase(gdbin.gdb, temp_xlsx)
+        tracing.finish(stage)
 
         # Load Excel into openpyxl and update spatial reference
         logger.info("Updating Spatial Reference in Excel file")
+        stage = tracing.start('update_spatial_reference')
         wb = openpyxl.load_workbook(temp_xlsx)
 
         # Overwrite SpatialReferences sheet
@@ -148,6 +178,7 @@ def reproject (
         if os.path.exists(input_spec_xlsx):
             os.remove(input_spec_xlsx)
         wb.save(input_spec_xlsx)
+        tracing.finish(stage)
 
     if not arcpy.Exists(gdbin.gdb):
         raise RuntimeError(f"Input Geodatabase {gdbin.gdb} not found. Cannot continue.")
@@ -155,6 +186,39 @@ def reproject (
     if not arcpy.Exists(input_spec_xlsx):
         raise RuntimeError(f"INPUT SPEC File {input_spec_xlsx} not found. Cannot continue.")
              
+    # fingerprints are taken before loading, a source edited during the
+    # load shows up as changed next time
+    stage = tracing.start('fingerprint')
+    manifest = reprojection_manifest.Manifest.for_gdb(gdbout.gdb)
+    schema = reprojection_manifest.schema_key(gdbin.gdb
+                                             ,input_spec_xlsx)
+    previous = None
+    if incremental and manifest.matches(schema) and arcpy.Exists(gdbout.gdb):
+        previous = manifest.tables
+    fingerprints = gdbfingerprint.table_fingerprints(gdbin.gdb
+                                                    ,previous)
+    stage.count(items=len(fingerprints))
+    tracing.finish(stage)
+
+    if previous is not None:
+        changed = manifest.changed(fingerprints)
+        logger.info(f"Schema unchanged, reloading {len(changed)} changed tables into {gdbout.gdb}")
+        load_results = table_loader.load_tables(table_loader.schedule(gdbin.gdb
+                                                                     ,gdbout.gdb
+                                                                     ,changed)
+                                               ,workers=load_workers)
+        logger.info("Table load results\n" + table_loader.format_results(load_results))
+        failed = table_loader.failures(load_results)
+        if failed:
+            raise RuntimeError(f"Table reloads failed - {[result.name for result in failed]}")
+        manifest.update(schema, fingerprints)
+        manifest.save()
+        logger.info("CSCL INCREMENTAL REPROJECTION COMPLETE")
+        _finish_trace(run, trace, logger)
+        return 0
+
+    # full rebuild, no manifest until it finishes
+    manifest.remove()
 
     if arcpy.Exists(gdbout.gdb): 
         gdbout.clean()
@@ -172,8 +236,10 @@ def reproject (
     # if gdbout is an enterprise geodatabase schema
     # GenerateGeodatabaseFromExcel throws
     # ERROR 087396: Not a valid SDE workspace. 
+    stage = tracing.start('GenerateGeodatabaseFromExcel', 'tool')
     arcpy.topographic.GenerateGeodatabaseFromExcel(input_spec_xlsx
                                                   ,gdbout.gdb)
+    tracing.finish(stage)
 
     logger.info(f"Creating object mapping database for data Load Process - {object_map_gdb.gdb}")
     
@@ -184,9 +250,11 @@ def reproject (
     # adding globalid as type text to gdbout does not create a globalid column in the 
     # cross reference geodatabase (object_map_gdb)
     
+    stage = tracing.start('CreateCrossReferenceGeodatabase', 'tool')
     arcpy.topographic.CreateCrossReferenceGeodatabase(gdbin.gdb
                                                      ,gdbout.gdb
                                                      ,object_map_gdb.gdb)
+    tracing.finish(stage)
 
     logger.info(f"Loading Data from {gdbin.gdb} into {gdbout.gdb}")
     
@@ -200,216 +268,87 @@ def reproject (
     #   geoprocessing environment setting.
     # ie must be enterprise geodatabase as documented 
 
+    stage = tracing.start('LoadData', 'tool')
     arcpy.topographic.LoadData(object_map_gdb.gdb
                               ,gdbin.gdb
                               ,gdbout.gdb)
+    tracing.finish(stage)
 
     # https://pro.arcgis.com/en/pro-app/latest/tool-reference/topographic-production/load-data.htm
     # LoadData row_level_errors = True (default)
     # Errors that occur during individual row-level inserts will be logged.
 
-    # Walk through the objects in the geodatabase
+    # One pass over the GDB_Items system catalog instead of
+    # arcpy.da.Walk plus a Describe per item
     logger.info("Reading GDB Items to find Tables and Relationship Classes that need to be populated")
+    stage = tracing.start('catalog')
+    catalog = gdbcatalog.CatalogIndex.from_gdb(gdbin.gdb)
+    stage.count(items=len(catalog))
+    tracing.finish(stage)
     gdb_items = {}
     tables = {}
     counts = {}
 
-    for dirpath, dirnames, filenames in arcpy.da.Walk(gdbin.gdb, topdown=True):
-        for filename in filenames:
-            # Get the full path of the object
-            object_path = os.path.join(dirpath, filename)
-
-            # Get the name of the object
-            object_name = os.path.splitext(filename)[0]
-
-            # Get the type of the object
-            object_type = arcpy.Describe(object_path).datasetType
-            logger.debug(f"FileName:{filename} - object_name:{object_name} - object_type:{object_type}")
-            dir_parts = os.path.split(dirpath)
-            logger.debug(f"DirParts = {dir_parts}")
-            if ".gdb" not in dir_parts[-1]:
-                target_gdb = os.path.join(gdbout.gdb, dir_parts[-1])
-            else:
-                target_gdb = gdbout.gdb
+    for item in catalog.of_type("FeatureClass", "Table", "RelationshipClass"):
+        filename = item.name
+        object_type = item.type
+        dirpath = catalog.container(gdbin.gdb, filename)
+        target_gdb = catalog.container(gdbout.gdb, filename)
 
-            gdb_items[filename] = (object_type, dirpath, target_gdb)
+        gdb_items[filename] = (object_type, dirpath, target_gdb)
 
-            if counts.get(object_type, False):
-                counts[object_type] += 1
-            else:
-                counts[object_type] = 1
+        if counts.get(object_type, False):
+            counts[object_type] += 1
+        else:
+            counts[object_type] = 1
 
-            #logger.debug((f"FileName:{filename} - object_name:{object_type} - object_type:{gdbout.gdb}"))
-            logger.debug((f"Name = {filename} - Type = {object_type} - TargetGDB = {target_gdb}"))
-                #f"Name = {pad_field(filename, 40)} - Type = {pad_field(object_type, 30)} - TargetGDB = {target_gdb}"
+        logger.debug((f"Name = {filename} - Type = {object_type} - TargetGDB = {target_gdb}"))
 
-            if object_type == "Table":
-                tables[filename] = (dirpath, target_gdb)
+        if object_type == "Table":
+            tables[filename] = (dirpath, target_gdb)
 
-            logger.debug(f"DIRPath: {dirpath}   Object Type: {object_type}    Object Name: {filename}")
     logger.info("-- Item counts")
     total_items = 0
     for tbl_name in counts:
-        #logger.info(f"----- {pad_field(tbl_name, 17)} - {counts[tbl_name]}")
         logger.info(f"----- {tbl_name} - {counts[tbl_name]}")
         total_items += counts[tbl_name]
     logger.info(f"-- TOTAL NUMBER OF ITEMS = {total_items}")
 
     logger.info("Creating Relationship Classes")
-    for dirpath, dirnames, filenames in arcpy.da.Walk(gdbin.gdb, datatype=["RelationshipClass"], topdown=True):
-        for filename in filenames:
-            # Get the full path of the object
-            object_path = os.path.join(dirpath, filename)
-
-            # Get the name of the object
-            object_name = os.path.splitext(filename)[0]
-
-            # Get the type of the object
-            object_type = arcpy.Describe(object_path).datasetType
-
-            dir_parts = os.path.split(dirpath)
-            logger.debug(f"DirParts = {dir_parts}")
-            if ".gdb" not in dir_parts[-1]:
-                target_gdb = os.path.join(gdbout.gdb, dir_parts[-1])
-            else:
-                target_gdb = gdbout.gdb
-
-            if object_type == "RelationshipClass":
-                logger.info(f"{filename} - {object_type} - {dirpath}  ")
-                #logger.info(f"{pad_field(filename, 50)} - {pad_field(object_type, 15)} - {dirpath}  ")
-                logger.info(f"{filename} - {object_type} - {dirpath}  ")
-                rel_class = os.path.join(dirpath, filename)
-                desc = arcpy.da.Describe(rel_class)
-                logger.info(f"--- out_relationship_class  = {desc['name']} - GDB = {target_gdb}")
-                out_relationship_class = os.path.join(target_gdb, desc["name"])
-
-                if len(desc["originClassNames"]) > 1:
-                    raise RuntimeError(
-                        f"Multiple ORIGIN TABLES encountered - Fix Processing - Assumes 1 - {desc['originClassNames']}"
-                    )
-
-                path_list = gdb_items.get(desc["originClassNames"][0], False)
-                if not path_list:
-                    raise RuntimeError(f"Origin item not found in GDB - {desc['originClassNames']}")
-                else:
-                    path = path_list[2]
-
-                logger.info(f"--- origin_table            = {desc['originClassNames'][0]} - path = {path}")
-                origin_table = os.path.join(path, desc["originClassNames"][0])
-
-                if len(desc["destinationClassNames"]) > 1:
-                    raise RuntimeError(
-                        f"Multiple DESTINATION TABLES encountered - Fix Processing - Assumes 1 - {desc['destinationClassNames']}"
-                    )
-
-                path_list = gdb_items.get(desc["destinationClassNames"][0], False)
-                if not path_list:
-                    raise RuntimeError(f"Destination item not found in GDB - {desc['destinationClassNames']}")
-                else:
-                    path = path_list[2]
-
-                logger.info(f"--- destination_table       = {desc['destinationClassNames'][0]} - path = {path}")
-                destination_table = os.path.join(path, desc["destinationClassNames"][0])
-
-                if desc["isComposite"]:
-                    rel_type = "COMPOSITE"
-                else:
-                    rel_type = "SIMPLE"
-                logger.info(f"----- relationship_type       = {rel_type}")
-                relationship_type = rel_type
-
-                logger.info(f"----- forward_label           = {desc['forwardPathLabel']}")
-                forward_label = desc["forwardPathLabel"]
-
-                logger.info(f"----- backward_label          = {desc['backwardPathLabel']}")
-                backward_label = desc["backwardPathLabel"]
-
-                logger.info(f"----- message_direction       = {desc['notification']}")
-                message_direction = desc["notification"]
-
-                if desc["cardinality"].upper() == "ONETOONE":
-                    cardinality = "ONE_TO_ONE"
-                elif desc["cardinality"].upper() == "ONETOMANY":
-                    cardinality = "ONE_TO_MANY"
-                elif desc["cardinality"].upper() == "MANYTOMANY":
-                    cardinality = "MANY_TO_MANY"
-                else:
-                    raise RuntimeError(f"Unexpected Cardinality encountered - {desc['cardinality']} - Program stopped")
-
-                if desc["isAttributed"]:
-                    # https://github.com/mattyschell/cscl-migrate/issues/39
-                    logger.info('adding attributed relclass {0} {1}'.format(str(dirpath), str(target_gdb)))
-                    tables[filename] = (dirpath, target_gdb)
-
-                logger.info(f"----- cardinality             = {cardinality}")
-
-                attributed = "ATTRIBUTED" if desc["isAttributed"] else "NONE"
-                logger.info(f"----- attributed              = {attributed}")
-
-                origin_primary = ""
-                origin_foreign = ""
-                for tbl_name in desc["originClassKeys"]:
-                    if tbl_name[1] == "OriginPrimary":
-                        origin_primary = tbl_name[0]
-                    elif tbl_name[1] == "OriginForeign":
-                        origin_foreign = tbl_name[0]
-                logger.info(f"----- origin_primary_key      = {origin_primary}")
-                origin_primary_key = origin_primary
-
-                logger.info(f"----- origin_foreign_key      = {origin_foreign}")
-                origin_foreign_key = origin_foreign
-
-                destination_primary = None
-                destination_foreign = None
-                for tbl_name in desc["destinationClassKeys"]:
-                    if tbl_name[1] == "DestinationPrimary":
-                        destination_primary = tbl_name[0]
-                    elif tbl_name[1] == "DestinationForeign":
-                        destination_foreign = tbl_name[0]
-
-                logger.info(f"----- destination_primary_key = {destination_primary}")
-                destination_primary_key = destination_primary
-
-                logger.info(f"----- destination_foreign_key = {destination_foreign}")
-                destination_foreign_key = destination_foreign
-
-                # TODO: verify that this works
-                # delete_item(out_relationship_class)
-                arcpy.management.Delete(out_relationship_class)
-                
-                arcpy.management.CreateRelationshipClass(
-                    origin_table=origin_table,
-                    destination_table=destination_table,
-                    out_relationship_class=out_relationship_class,
-                    relationship_type=relationship_type,
-                    forward_label=forward_label,
-                    backward_label=backward_label,
-                    message_direction=message_direction,
-                    cardinality=cardinality,
-                    attributed=attributed,
-                    origin_primary_key=origin_primary_key,
-                    origin_foreign_key=origin_foreign_key,
-                    destination_primary_key=destination_primary_key,
-                    destination_foreign_key=destination_foreign_key,
-                )
+    # definitions are read once per schema and kept beside the workbook
+    # relationship classes already in gdbout that match are left alone
+    plan = relclass_plan.Plan.load_or_build(os.path.join(workdir
+                                                        ,"RelationshipClasses.plan.json")
+                                           ,gdbin.gdb
+                                           ,schema)
+    for filename in plan.attributed():
+        # https://github.com/mattyschell/cscl-migrate/issues/39
+        dirpath = catalog.container(gdbin.gdb, filename)
+        target_gdb = catalog.container(gdbout.gdb, filename)
+        logger.info('adding attributed relclass {0} {1}'.format(str(dirpath), str(target_gdb)))
+        tables[filename] = (dirpath, target_gdb)
+    # one at a time, schema locks on a geodatabase do not share well
+    relclass_results = relclass_plan.execute(plan
+                                            ,gdbout.gdb)
+    logger.info("Relationship class results\n" + relclass_plan.format_results(relclass_results))
 
     logger.info("Loading Tables and attributed relationship class tables")
-    for tbl_name in tables:
-        source_gdb, target_gdb = tables[tbl_name]
-        source_ds = os.path.join(source_gdb, tbl_name)
-        target_ds = os.path.join(target_gdb, tbl_name)
-        logger.info(f"{tbl_name} - Copying {source_ds} to {target_ds}")
-
-        arcpy.management.TruncateTable(target_ds)
-        arcpy.management.Append(source_ds
-                               ,target_ds
-                               ,schema_type="TEST")
-        #arcpy.management.Append(source_ds, target_ds, schema_type="NO_TEST")
-        load_count = int(arcpy.management.GetCount(target_ds)[0])  # type: ignore
-        if load_count == 0:
-            logger.warning(f"--- {tbl_name} has no records")
+    # independent tables, one process each, largest source first
+    load_tasks = table_loader.schedule(gdbin.gdb
+                                      ,gdbout.gdb
+                                      ,list(tables))
+    load_results = table_loader.load_tables(load_tasks
+                                           ,workers=load_workers)
+    logger.info("Table load results\n" + table_loader.format_results(load_results))
+    for result in load_results:
+        if result.rows == 0:
+            logger.warning(f"--- {result.name} has no records")
+    failed = table_loader.failures(load_results)
+    if failed:
+        raise RuntimeError(f"Table loads failed - {[result.name for result in failed]}")
 
     logger.info("Counting Source and Target Feature Class records")
+    stage = tracing.start('count_feature_classes', 'count')
     num_mismatch = 0
     for tbl_name in gdb_items:
         obj_type = gdb_items[tbl_name][0]
@@ -426,19 +365,22 @@ def reproject (
             if src_count != tgt_count:
                 logger.warning(f"@@@@ Count mismatch for {tbl_name} - Source = {src_count} - Target = {tgt_count}")
                 num_mismatch += 1
+            stage.count(rows=src_count, items=1)
+    tracing.finish(stage)
     if num_mismatch == 0:
         logger.info("All Feature Class record counts match")
     else:
         logger.warning(f"@@@ {num_mismatch} Feature Class record counts don't match")
 
     logger.info("Counting Source and Target Table records")
+    stage = tracing.start('count_tables', 'count')
     num_mismatch = 0
     for tbl_name in tables:
         src_db = os.path.join(tables[tbl_name][0], tbl_name)
         tgt_db = os.path.join(tables[tbl_name][1], tbl_name)
 
-        src_count = arcpy.management.GetCount(src_db)[0]
-        tgt_count = arcpy.management.GetCount(tgt_db)[0]
+        src_count = int(arcpy.management.GetCount(src_db)[0])  # type: ignore
+        tgt_count = int(arcpy.management.GetCount(tgt_db)[0])  # type: ignore
 
         if src_count == 0:
             logger.info(f"-- Warning: {tbl_name} has no records")
@@ -446,14 +388,49 @@ def reproject (
         if src_count != tgt_count:
             logger.warning(f"@@@ Count mismatch for {tbl_name} - Source = {src_count} - Target = {tgt_count}")
             num_mismatch += 1
+        stage.count(items=1)
+    tracing.finish(stage)
     if num_mismatch == 0:
         logger.info("All Table record counts match")
     else:
         logger.warning(f"@@@ {num_mismatch} Table record counts don't match")
 
+    if verify:
+        logger.info("Comparing Source and Target row content")
+        verify_results = content_verifier.verify(gdbin.gdb
+                                                ,gdbout.gdb
+                                                ,workers=load_workers)
+        logger.info("Row content results\n" + content_verifier.format_results(verify_results))
+        num_mismatch = len(content_verifier.failures(verify_results))
+        num_unread = len(content_verifier.errors(verify_results))
+        if num_mismatch == 0 and num_unread == 0:
+            logger.info("All Feature Class and Table row content matches")
+        if num_mismatch > 0:
+            logger.warning(f"@@@ {num_mismatch} Feature Classes and Tables differ in row content")
+        if num_unread > 0:
+            logger.warning(f"@@@ {num_unread} Feature Classes and Tables could not be read, row content not verified")
+
+    manifest.update(schema, fingerprints)
+    manifest.save()
+
     logger.info("CSCL REPROJECTION COMPLETE")
+    _finish_trace(run, trace, logger)
     return 0
 
+
+def _finish_trace(run
+                 ,trace
+                 ,logger):
+
+    tracing.finish(run)
+    if trace:
+        tracing.get().save(trace)
+        logger.info(f"Stage timings, trace written to {trace}\n" + tracing.get().format_summary())
+    budget = memory_budget.installed()
+    if budget is not None:
+        logger.info("Stage memory\n" + budget.format_report())
+        memory_budget.uninstall()
+
 if __name__ == '__main__':
 
     pingdb   = sys.argv[1]
@@ -502,7 +479,10 @@ if __name__ == '__main__':
                       ,localgdbout
                       ,logger
                       ,pworkdir
-                      ,poutsrid)
+                      ,poutsrid
+                      ,trace=os.path.splitext(targetlog)[0] + '.trace.json'
+                      ,memory=os.environ.get('GDB_MEMORY_BUDGET')
+                      ,memory_action=os.environ.get('GDB_MEMORY_ACTION', 'warn'))
     
     arcpy.CheckInExtension(requiredextension)
 